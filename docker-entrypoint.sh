@@ -40,11 +40,19 @@ if [[ "$CREATE_SUPERUSER" = "1" ]]; then
     echo "Admin user created with credentials admin:admin (email: admin@example.com)"
 fi
 
+# Remove metrics of the previous server processes
+if [[ -n "$PROMETHEUS_MULTIPROC_DIR" ]]; then
+    rm -rf "${PROMETHEUS_MULTIPROC_DIR:?}"/*
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Start server
 if [[ -n "$*" ]]; then
     "$@"
 elif [[ "$DEV_SERVER" = "1" ]]; then
     python -Wd ./manage.py runserver 0.0.0.0:8080
 else
+    # uWSGI doesn't run the system checks, e.g. of the persisted queries
+    ./manage.py check --database default
     uwsgi --ini .prod/uwsgi.ini
 fi
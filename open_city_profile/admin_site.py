@@ -1,6 +1,10 @@
 from django.conf import settings
+from django.template.response import TemplateResponse
+from django.urls import path
 from helusers.admin_site import AdminSite as HelUsersAdminSite
 
+from open_city_profile.profiling import resolver_stats
+
 
 class AdminSite(HelUsersAdminSite):
     index_template = "admin/admin_index.html"
@@ -10,4 +14,24 @@ class AdminSite(HelUsersAdminSite):
         context["version"] = (
             settings.VERSION if settings.VERSION is not None else "unknown"
         )
+        context["graphql_resolver_profiling"] = settings.GRAPHQL_RESOLVER_PROFILING
         return context
+
+    def get_urls(self):
+        return [
+            path(
+                "graphql-resolver-stats/",
+                self.admin_view(self.graphql_resolver_stats_view),
+                name="graphql_resolver_stats",
+            ),
+            *super().get_urls(),
+        ]
+
+    def graphql_resolver_stats_view(self, request):
+        """Shows the resolver timings recorded by this process"""
+        context = {
+            **self.each_context(request),
+            "title": "GraphQL resolver timings",
+            "operations": resolver_stats.snapshot(),
+        }
+        return TemplateResponse(request, "admin/graphql_resolver_stats.html", context)
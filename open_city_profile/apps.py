@@ -10,6 +10,13 @@ class OpenCityProfileConfig(AppConfig):
     def ready(self) -> None:
         import open_city_profile.checks  # noqa: F401
         import open_city_profile.signals  # noqa: F401
+        from open_city_profile.db_routing import validate_replica_settings
+        from open_city_profile.persisted_queries import (
+            validate_persisted_query_settings,
+        )
+
+        validate_persisted_query_settings()
+        validate_replica_settings()
 
 
 class OpenCityProfileAdminConfig(AdminConfig):
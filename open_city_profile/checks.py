@@ -1,6 +1,29 @@
+from django.apps import apps
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.checks import Error, Tags, Warning, register
 from django.db import DatabaseError, connections
+from django.db.models import Q
+
+# The apps whose foreign keys must be indexed
+INDEXED_FOREIGN_KEY_APPS = {"open_city_profile", "profiles", "services", "users"}
+
+# The filters of the most frequent queries, as the model, the filtered fields with the
+# equality filters before the range filters, and the condition of a partial index.
+HOT_QUERY_SHAPES = [
+    ("profiles.Address", ["profile"], Q(primary=True)),
+    ("profiles.Email", ["profile"], Q(primary=True)),
+    ("profiles.Phone", ["profile"], Q(primary=True)),
+    ("profiles.ClaimToken", ["token"], None),
+    ("profiles.TemporaryReadAccessToken", ["profile", "created_at"], None),
+    (
+        "profiles.ProfileChangeNotification",
+        ["service"],
+        Q(next_attempt_at__isnull=False),
+    ),
+    ("services.ServiceConnection", ["profile", "service"], None),
+    ("services.ServiceConnection", ["service", "profile"], None),
+]
 
 
 @register(Tags.database)
@@ -63,6 +86,107 @@ def check_obsolete_contentypes(app_configs, **kwargs):
     return errors
 
 
+@register(Tags.database)
+def check_persisted_queries(app_configs, **kwargs):
+    """
+    Registered persisted queries must stay valid when the schema changes. They are
+    the only queries allowed with `GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES`, so then
+    the invalid ones are an error.
+    """
+    from open_city_profile.models import PersistedQuery
+    from open_city_profile.views import get_query_validation_errors
+
+    errors = []
+
+    try:
+        persisted_queries = list(PersistedQuery.objects.all())
+    except DatabaseError:
+        # Table for PersistedQuery is not created yet, so check can be skipped.
+        return errors
+
+    invalid_hashes = [
+        persisted_query.sha256_hash
+        for persisted_query in persisted_queries
+        if get_query_validation_errors(persisted_query.query)
+    ]
+    if invalid_hashes:
+        message_class = (
+            Error if settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES else Warning
+        )
+        errors.append(
+            message_class(
+                f"Persisted queries don't validate against the schema: {', '.join(invalid_hashes)}.",  # noqa: E501
+                hint="Register the updated queries of the clients.",
+            )
+        )
+
+    return errors
+
+
+def _get_indexes(model):
+    """Returns the indexed columns and the condition of every index of the model"""
+    opts = model._meta
+    indexes = [
+        ([field.column], None)
+        for field in opts.local_fields
+        if field.primary_key or field.unique or field.db_index
+    ]
+    indexes.extend(
+        ([opts.get_field(name).column for name in field_names], None)
+        for field_names in opts.unique_together
+    )
+    for index in [*opts.indexes, *opts.constraints]:
+        # Expression indexes and check constraints don't have fields
+        field_names = [name.lstrip("-") for name in getattr(index, "fields", ())]
+        if field_names:
+            columns = [opts.get_field(name).column for name in field_names]
+            indexes.append((columns, index.condition))
+    return indexes
+
+
+def _is_indexed(model, field_names, condition=None):
+    """
+    Whether an index of the model starts with the fields, either without a condition
+    or with the given condition.
+    """
+    columns = [model._meta.get_field(name).column for name in field_names]
+    return any(
+        index_columns[: len(columns)] == columns
+        and (index_condition is None or index_condition == condition)
+        for index_columns, index_condition in _get_indexes(model)
+    )
+
+
+@register(Tags.models)
+def check_query_shape_indexes(app_configs, **kwargs):
+    """The foreign keys and the hot query shapes must be served by an index."""
+    unindexed = []
+
+    for model in apps.get_models():
+        if model._meta.app_label not in INDEXED_FOREIGN_KEY_APPS:
+            continue
+        for field in model._meta.local_fields:
+            if field.many_to_one and not _is_indexed(model, [field.name]):
+                unindexed.append(f"{model._meta.label}({field.name})")
+
+    for label, field_names, condition in HOT_QUERY_SHAPES:
+        if not _is_indexed(apps.get_model(label), field_names, condition):
+            shape = f"{label}({', '.join(field_names)})"
+            if condition is not None:
+                shape += f" WHERE {condition}"
+            unindexed.append(shape)
+
+    if unindexed:
+        return [
+            Warning(
+                f"Queries filtering by these fields aren't served by an index: {'; '.join(unindexed)}.",  # noqa: E501
+                hint="Add an index starting with the fields.",
+                id="open_city_profile.W001",
+            )
+        ]
+    return []
+
+
 @register(Tags.security)
 def pyjwt_uses_correct_backend(app_configs, **kwargs):
     """PyJWT requires the cryptography package for asymmetric algorithms."""
@@ -8,6 +8,10 @@ TOKEN_EXPIRED_ERROR = "TOKEN_EXPIRED_ERROR"
 VALIDATION_ERROR = "VALIDATION_ERROR"
 JWT_AUTHENTICATION_ERROR = "JWT_AUTHENTICATION_ERROR"
 DATA_CONFLICT_ERROR = "DATA_CONFLICT_ERROR"
+PERSISTED_QUERY_NOT_FOUND_ERROR = "PERSISTED_QUERY_NOT_FOUND"
+PERSISTED_QUERY_NOT_ALLOWED_ERROR = "PERSISTED_QUERY_NOT_ALLOWED"
+PERSISTED_QUERY_HASH_MISMATCH_ERROR = "PERSISTED_QUERY_HASH_MISMATCH"
+QUERY_COST_LIMIT_EXCEEDED_ERROR = "QUERY_COST_LIMIT_EXCEEDED_ERROR"
 
 # Profile specific errors
 CONNECTED_SERVICE_DATA_QUERY_FAILED_ERROR = "CONNECTED_SERVICE_DATA_QUERY_FAILED_ERROR"
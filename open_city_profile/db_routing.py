@@ -0,0 +1,150 @@
+"""
+Routing of database reads to the read replicas in `DATABASE_REPLICAS`.
+
+Reads go to a replica only inside a `use_replicas` block, which the GraphQL view
+uses for query operations. Once anything is written inside the block, the rest of
+its reads go to the primary database, so that they see the writes. A user who has
+just made a mutation is kept on the primary for
+`DATABASE_REPLICA_STICKINESS_SECONDS`, so that they see their own changes even if
+the replicas lag behind. The recent writes are remembered in the default cache,
+which therefore must be shared by the server processes.
+"""
+
+import contextvars
+import random
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from open_city_profile.utils import is_cache_shared
+
+_routing_state = contextvars.ContextVar("db_routing_state", default=None)
+
+STICKINESS_CACHE_KEY_PREFIX = "db_routing_recent_write"
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class _RoutingState:
+    def __init__(self, replica):
+        self.replica = replica
+        self.pinned_to_primary = False
+
+
+@contextmanager
+def use_replicas():
+    """
+    Reads inside the block go to a replica until something is written. The replica
+    is chosen once for the block, so that the rows read aren't from replicas
+    lagging behind by different amounts.
+    """
+    replica = (
+        random.choice(settings.DATABASE_REPLICAS)
+        if settings.DATABASE_REPLICAS
+        else None
+    )
+    token = _routing_state.set(_RoutingState(replica))
+    try:
+        yield
+    finally:
+        _routing_state.reset(token)
+
+
+def get_routed_connections():
+    """The connections of the primary database and of the replicas"""
+    return [
+        connections[alias] for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)
+    ]
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Installs the execute wrapper to the primary database and the replicas"""
+    with ExitStack() as stack:
+        for connection in get_routed_connections():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if (
+            state is None
+            or state.pinned_to_primary
+            or state.replica is None
+            # The users are created on their first login, so they are always
+            # read from the primary to not create them twice.
+            or model._meta.label == settings.AUTH_USER_MODEL
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.pinned_to_primary = True
+        # Instances read from a replica would otherwise be saved to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def validate_replica_settings():
+    """
+    The recent writes of a user have to be seen by all the server processes, or
+    the user may be served from a replica which hasn't got their changes yet.
+    """
+    if (
+        settings.DATABASE_REPLICAS
+        and settings.DATABASE_REPLICA_STICKINESS_SECONDS > 0
+        and not is_cache_shared()
+    ):
+        raise ImproperlyConfigured(
+            "DATABASE_REPLICA_URLS requires a CACHE_URL which is shared by the "
+            "server processes, or DATABASE_REPLICA_STICKINESS_SECONDS set to 0."
+        )
+
+
+def _get_stickiness_cache_key(request):
+    # The user stays the same when their access token is refreshed
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return None
+    return f"{STICKINESS_CACHE_KEY_PREFIX}:{user.pk}"
+
+
+def mark_recent_write(request):
+    """Keeps the reads of the user on the primary database for a while"""
+    key = _get_stickiness_cache_key(request)
+    timeout = settings.DATABASE_REPLICA_STICKINESS_SECONDS
+    if key and timeout > 0 and settings.DATABASE_REPLICAS:
+        cache.set(key, True, timeout)
+
+
+def can_read_from_replicas(request):
+    if not settings.DATABASE_REPLICAS:
+        return False
+    key = _get_stickiness_cache_key(request)
+    return key is None or not cache.get(key)
+
+
+def get_replica_lag(alias):
+    """Returns how many seconds the replica lags behind the primary database"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
@@ -5,6 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from graphql.type import GraphQLResolveInfo
 
 from open_city_profile.exceptions import ServiceNotIdentifiedError
+from open_city_profile.permissions import requester_has_perm
 
 PERMISSION_DENIED_MESSAGE = _("You do not have permission to perform this action.")
 
@@ -56,7 +57,7 @@ def _require_service(context):
 
 def _require_permission(permission_name):
     def permission_checker(context):
-        if not context.user.has_perm(permission_name):
+        if not requester_has_perm(context, permission_name):
             raise PermissionDenied(PERMISSION_DENIED_MESSAGE)
 
     return permission_checker
@@ -66,7 +67,7 @@ def _require_service_permission(permission_name):
     def permission_checker(context):
         _require_service(context)
 
-        if not context.user.has_perm(permission_name, context.service):
+        if not requester_has_perm(context, permission_name, context.service):
             raise PermissionDenied(PERMISSION_DENIED_MESSAGE)
 
     return permission_checker
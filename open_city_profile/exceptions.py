@@ -67,6 +67,22 @@ class TokenExpiredError(ProfileGraphQLError):
     """Token has expired"""
 
 
+class PersistedQueryNotFoundError(ProfileGraphQLError):
+    """The persisted query of the given hash is not known"""
+
+
+class PersistedQueryNotAllowedError(ProfileGraphQLError):
+    """Only registered persisted queries are allowed"""
+
+
+class PersistedQueryHashMismatchError(ProfileGraphQLError):
+    """The given persisted query hash doesn't match the query"""
+
+
+class QueryCostLimitExceededError(ProfileGraphQLError):
+    """The calculated cost of the query exceeds the allowed maximum"""
+
+
 class TokenExchangeError(Exception):
     """OAuth/OIDC token exchange related exception."""
 
@@ -0,0 +1,58 @@
+import os
+
+from database_sanitizer.config import Configuration
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from sanitized_dump.utils.db import db_setting_to_db_string
+
+from sanitizers.dump import dump_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a sanitized database dump like create_sanitized_dump, sanitizing "
+        "the rows in parallel worker processes with pooled fake values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--config",
+            default=".sanitizerconfig",
+            help="Sanitizer configuration file (default: .sanitizerconfig).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes sanitizing the rows (default: number of CPUs).",  # noqa: E501
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows sanitized at a time by a worker (default: 5000).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the fake values (default: 0).",
+        )
+
+    def handle(self, *args, **options):
+        if options["verbosity"] >= 1:
+            self.stderr.write("Creating sanitized dump...")
+
+        config = Configuration.from_file(options["config"])
+        database_url = db_setting_to_db_string(settings.DATABASES)
+        try:
+            for line in dump_database(
+                database_url,
+                config,
+                workers=options["workers"],
+                batch_size=options["batch_size"],
+                seed=options["seed"],
+            ):
+                self.stdout.write(line)
+        except RuntimeError as e:
+            raise CommandError(f"Database sanitizing failed. ({e})")
@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from open_city_profile.persisted_queries import get_persisted_query_store, query_hash
+from open_city_profile.views import get_query_validation_errors
+
+
+def _read_queries(path):
+    """
+    Returns (hash, query) pairs read from the file.
+
+    A JSON file is read as an Apollo persisted query manifest, any other file is
+    read as a single GraphQL document.
+    """
+    content = Path(path).read_text()
+
+    if path.endswith(".json"):
+        try:
+            operations = json.loads(content)["operations"]
+            return [(operation["id"], operation["body"]) for operation in operations]
+        except (ValueError, KeyError, TypeError) as e:
+            raise CommandError(f"{path}: not a persisted query manifest ({e})")
+
+    return [(query_hash(content), content)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Register the GraphQL queries of clients as persisted queries. The queries "
+        "are validated against the current schema before any of them is stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="+",
+            help="GraphQL documents or Apollo persisted query manifests (.json).",
+        )
+
+    def handle(self, *args, **options):
+        queries = {}
+        errors = []
+
+        for path in options["files"]:
+            for sha256_hash, query in _read_queries(path):
+                if query_hash(query) != sha256_hash:
+                    errors.append(f"{path}: {sha256_hash} doesn't match its query")
+                    continue
+
+                for error in get_query_validation_errors(query):
+                    errors.append(f"{path}: {sha256_hash}: {error.message}")
+
+                queries[sha256_hash] = query
+
+        if errors:
+            raise CommandError("\n".join(["No queries registered."] + errors))
+
+        store = get_persisted_query_store()
+        for sha256_hash, query in queries.items():
+            store.set(sha256_hash, query)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Registered {len(queries)} persisted queries.")
+        )
@@ -0,0 +1,169 @@
+import logging
+import os
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from open_city_profile.db_routing import get_replica_lag
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "open_city_profile"
+
+GRAPHQL_OPERATION_DURATION = Histogram(
+    "graphql_operation_duration_seconds",
+    "Time spent executing a GraphQL operation",
+    ["operation_name"],
+    namespace=NAMESPACE,
+)
+
+GRAPHQL_OPERATION_COST = Histogram(
+    "graphql_operation_cost",
+    "Statically calculated cost of a GraphQL operation",
+    ["operation_name"],
+    buckets=(10, 100, 1000, 5000, 10000, 50000, 100000, 500000, 1000000),
+    namespace=NAMESPACE,
+)
+
+# Label of the operations whose names aren't tracked
+OTHER_OPERATION_NAME = "(other)"
+
+
+def operation_name_label(operation_name):
+    """
+    Returns the label of the operation in the GraphQL metrics.
+
+    The operation names come from the clients, so only the names configured in
+    `METRICS_GRAPHQL_OPERATION_NAMES` are used, or in the allow-list mode any name,
+    as the operations are then all registered persisted queries.
+    """
+    if (
+        settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES
+        or operation_name in settings.METRICS_GRAPHQL_OPERATION_NAMES
+    ):
+        return operation_name
+    return OTHER_OPERATION_NAME
+
+
+GDPR_API_REQUEST_DURATION = Histogram(
+    "gdpr_api_request_duration_seconds",
+    "Time spent in the GDPR API requests to the connected services",
+    ["service", "method"],
+    namespace=NAMESPACE,
+)
+
+PROFILE_CHANGE_WEBHOOK_REQUEST_DURATION = Histogram(
+    "profile_change_webhook_request_duration_seconds",
+    "Time spent posting profile change notifications to the webhooks of the services",
+    ["service"],
+    namespace=NAMESPACE,
+)
+
+KEYCLOAK_ADMIN_REQUEST_DURATION = Histogram(
+    "keycloak_admin_request_duration_seconds",
+    "Time spent in the Keycloak admin API requests",
+    ["method", "endpoint"],
+    namespace=NAMESPACE,
+)
+
+AUDIT_LOG_FLUSH_DURATION = Histogram(
+    "audit_log_flush_duration_seconds",
+    "Time spent writing the audit log entries of a request",
+    namespace=NAMESPACE,
+)
+
+AUDIT_LOG_FLUSH_SIZE = Histogram(
+    "audit_log_flush_size",
+    "Number of audit log entries written at the end of a request",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    namespace=NAMESPACE,
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Number of database queries made while handling a request",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    namespace=NAMESPACE,
+)
+
+
+# The caches are kept in process memory, so their hit rates are exported here
+CACHE_HITS = Counter(
+    "cache_hits",
+    "Number of lookups found in an in-process cache",
+    ["cache"],
+    namespace=NAMESPACE,
+)
+
+CACHE_MISSES = Counter(
+    "cache_misses",
+    "Number of lookups not found in an in-process cache",
+    ["cache"],
+    namespace=NAMESPACE,
+)
+
+
+class DatabaseReplicaLagCollector(Collector):
+    """Measures the lag of the database replicas when the metrics are collected"""
+
+    def describe(self):
+        # Don't query the databases when registering the collector
+        return []
+
+    def collect(self):
+        if not settings.DATABASE_REPLICAS:
+            return
+
+        lag = GaugeMetricFamily(
+            f"{NAMESPACE}_database_replica_lag_seconds",
+            "How many seconds the database replica lags behind the primary",
+            labels=["database"],
+        )
+        for alias in settings.DATABASE_REPLICAS:
+            try:
+                lag.add_metric([alias], get_replica_lag(alias))
+            except DatabaseError:
+                logger.exception("Could not measure the lag of replica %s", alias)
+        yield lag
+
+
+database_replica_lag_collector = DatabaseReplicaLagCollector()
+REGISTRY.register(database_replica_lag_collector)
+
+
+def _get_registry():
+    """
+    Returns the registry to collect the metrics from.
+
+    When running in multiple processes, e.g. uWSGI workers, the metrics of every
+    process are written in files of the `PROMETHEUS_MULTIPROC_DIR` directory by
+    prometheus_client and they are combined here.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(database_replica_lag_collector)
+    return registry
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+
+    return HttpResponse(
+        generate_latest(_get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -1,17 +1,24 @@
-from helusers.oidc import RequestJWTAuthentication
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 
+from open_city_profile.db_routing import execute_wrapper
+from open_city_profile.metrics import DB_QUERIES_PER_REQUEST
+from open_city_profile.oidc import CachedRequestJWTAuthentication
 from services.utils import set_service_to_request
+from utils.fields import decryption_cache
 
 
 class JWTAuthentication:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.authenticator = CachedRequestJWTAuthentication(
+            max_size=settings.TOKEN_AUTH_CACHE_MAX_SIZE
+        )
 
     def __call__(self, request):
         if not request.user.is_authenticated:
             try:
-                authenticator = RequestJWTAuthentication()
-                user_auth = authenticator.authenticate(request)
+                user_auth = self.authenticator.authenticate(request)
                 if user_auth is not None:
                     request.user_auth = user_auth
                     request.user = user_auth.user
@@ -20,3 +27,38 @@ class JWTAuthentication:
                 request.auth_error = e
 
         return self.get_response(request)
+
+
+class DecryptionCacheMiddleware:
+    """Memoizes decrypted field values for the duration of a request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with decryption_cache():
+            return self.get_response(request)
+
+
+class DatabaseQueryMetricsMiddleware:
+    """Records the number of database queries of every request"""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_count = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        with execute_wrapper(count_query):
+            response = self.get_response(request)
+
+        DB_QUERIES_PER_REQUEST.observe(query_count)
+        return response
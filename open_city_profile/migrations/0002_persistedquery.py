@@ -0,0 +1,26 @@
+# Generated by Django 5.2.17 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_city_profile", "0001_remove_allauth_remnants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PersistedQuery",
+            fields=[
+                (
+                    "sha256_hash",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("query", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "persisted queries",
+            },
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class PersistedQuery(models.Model):
+    """A GraphQL query registered for a client, identified by its SHA-256 hash."""
+
+    sha256_hash = models.CharField(max_length=64, primary_key=True)
+    query = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "persisted queries"
+
+    def __str__(self):
+        return self.sha256_hash
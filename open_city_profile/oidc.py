@@ -1,11 +1,21 @@
+import copy
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+
 import requests
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.functional import cached_property
+from helusers.authz import UserAuthorization
+from helusers.jwt import JWT, ValidationError
+from helusers.oidc import AuthenticationError, RequestJWTAuthentication
 from oauthlib.oauth2 import OAuth2Error
 from requests_oauthlib import OAuth2Session
 
 from open_city_profile.exceptions import TokenExchangeError
+from open_city_profile.metrics import CACHE_HITS, CACHE_MISSES
 
 
 class KeycloakTokenExchange:
@@ -87,3 +97,111 @@ class KeycloakTokenExchange:
         response = requests.get(url, headers=headers, timeout=self.timeout)
         response.raise_for_status()
         return response
+
+
+@dataclass(frozen=True)
+class TokenCacheInfo:
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class CachedRequestJWTAuthentication(RequestJWTAuthentication):
+    """
+    RequestJWTAuthentication which remembers verified tokens until they expire.
+
+    A token seen again is not verified nor is its user looked up again, only its
+    session is checked for termination. The cache is kept in process memory, keyed
+    by a digest of the token, and holds at most `max_size` tokens.
+    """
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+        self._verified_tokens = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def authenticate(self, request):
+        token = self._get_bearer_token(request)
+        if token is None or self.max_size <= 0:
+            return super().authenticate(request)
+
+        token_digest = hashlib.sha256(token.encode()).digest()
+        user = self._get_cached_user(token_digest)
+        if user is not None:
+            jwt = JWT(token)
+            try:
+                jwt.validate_session()
+            except ValidationError as e:
+                raise AuthenticationError(str(e)) from e
+            return UserAuthorization(user, jwt.claims)
+
+        user_auth = super().authenticate(request)
+        if user_auth is not None:
+            self._cache_user(token_digest, user_auth)
+        return user_auth
+
+    def cache_info(self):
+        with self._lock:
+            return TokenCacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                size=len(self._verified_tokens),
+                max_size=self.max_size,
+            )
+
+    @staticmethod
+    def _get_bearer_token(request):
+        auth_scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        token = token.strip()
+        if auth_scheme.lower() != "bearer" or not token:
+            return None
+        return token
+
+    def _get_cached_user(self, token_digest):
+        with self._lock:
+            cached = self._verified_tokens.get(token_digest)
+            if cached is not None:
+                expires_at, user = cached
+                if expires_at > time.time():
+                    self._hits += 1
+                    CACHE_HITS.labels(cache="verified_tokens").inc()
+                    # Every request gets its own copy, so that e.g. permission
+                    # caches set on the user don't leak to other requests
+                    return copy.copy(user)
+                del self._verified_tokens[token_digest]
+
+            self._misses += 1
+            CACHE_MISSES.labels(cache="verified_tokens").inc()
+            return None
+
+    def _cache_user(self, token_digest, user_auth):
+        try:
+            expires_at = float(user_auth.data["exp"])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self._lock:
+            if len(self._verified_tokens) >= self.max_size:
+                self._evict()
+            self._verified_tokens[token_digest] = (
+                expires_at,
+                copy.copy(user_auth.user),
+            )
+
+    def _evict(self):
+        """Removes expired tokens, or the oldest token if none have expired"""
+        now = time.time()
+        expired = [
+            token_digest
+            for token_digest, (expires_at, _) in self._verified_tokens.items()
+            if expires_at <= now
+        ]
+        for token_digest in expired:
+            del self._verified_tokens[token_digest]
+
+        if len(self._verified_tokens) >= self.max_size:
+            del self._verified_tokens[next(iter(self._verified_tokens))]
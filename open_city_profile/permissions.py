@@ -0,0 +1,47 @@
+from guardian.core import ObjectPermissionChecker
+
+from services.models import Service
+
+
+class RequestPermissionChecker:
+    """
+    Answers permission questions for the user of a single request.
+
+    Global permissions are checked with the user's `has_perm`, which caches them on
+    the user object. Object permissions on services are prefetched for all services
+    with a single round of queries the first time one is asked for, instead of
+    querying them again for every check.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._object_permission_checker = None
+
+    def has_perm(self, permission, obj=None):
+        if obj is None or not self.user.is_authenticated:
+            return self.user.has_perm(permission, obj)
+
+        return self._get_object_permission_checker().has_perm(permission, obj)
+
+    def _get_object_permission_checker(self):
+        if self._object_permission_checker is None:
+            checker = ObjectPermissionChecker(self.user)
+            checker.prefetch_perms(Service.objects.all())
+            self._object_permission_checker = checker
+
+        return self._object_permission_checker
+
+
+def get_permission_checker(request):
+    """Returns the `RequestPermissionChecker` of the request's current user"""
+    checker = getattr(request, "_permission_checker", None)
+
+    if checker is None or checker.user != request.user:
+        checker = RequestPermissionChecker(request.user)
+        request._permission_checker = checker
+
+    return checker
+
+
+def requester_has_perm(request, permission, obj=None):
+    return get_permission_checker(request).has_perm(permission, obj)
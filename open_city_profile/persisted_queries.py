@@ -0,0 +1,138 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from open_city_profile.exceptions import (
+    PersistedQueryHashMismatchError,
+    PersistedQueryNotAllowedError,
+    PersistedQueryNotFoundError,
+)
+from open_city_profile.models import PersistedQuery
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class CachePersistedQueryStore:
+    """Keeps the persisted queries in the default Django cache."""
+
+    key_prefix = "persisted_query:"
+
+    def get(self, sha256_hash):
+        return cache.get(self.key_prefix + sha256_hash)
+
+    def set(self, sha256_hash, query):
+        cache.set(self.key_prefix + sha256_hash, query, timeout=None)
+
+    def add_automatically(self, sha256_hash, query):
+        """Keeps a query sent by a client for a while"""
+        cache.set(
+            self.key_prefix + sha256_hash,
+            query,
+            timeout=settings.GRAPHQL_PERSISTED_QUERY_CACHE_TIMEOUT,
+        )
+
+
+class DatabasePersistedQueryStore:
+    """Keeps the persisted queries in the `PersistedQuery` table."""
+
+    def get(self, sha256_hash):
+        return (
+            PersistedQuery.objects.filter(sha256_hash=sha256_hash)
+            .values_list("query", flat=True)
+            .first()
+        )
+
+    def set(self, sha256_hash, query):
+        PersistedQuery.objects.get_or_create(
+            sha256_hash=sha256_hash, defaults={"query": query}
+        )
+
+    def add_automatically(self, sha256_hash, query):
+        """
+        The database only keeps the queries registered with the
+        `register_persisted_queries` command, so that the clients can't fill it.
+        """
+
+
+def get_persisted_query_store():
+    return import_string(settings.GRAPHQL_PERSISTED_QUERY_STORE)()
+
+
+def validate_persisted_query_settings():
+    """
+    Only the database is guaranteed to keep the registered queries and to share
+    them between the server processes, so it's required for the allow-list mode.
+    """
+    if settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES and not issubclass(
+        import_string(settings.GRAPHQL_PERSISTED_QUERY_STORE),
+        DatabasePersistedQueryStore,
+    ):
+        raise ImproperlyConfigured(
+            "GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES requires the "
+            "GRAPHQL_PERSISTED_QUERY_STORE to be "
+            "open_city_profile.persisted_queries.DatabasePersistedQueryStore."
+        )
+
+
+def _get_persisted_query_hash(request, data):
+    extensions = request.GET.get("extensions") or data.get("extensions")
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+
+    if not isinstance(extensions, dict):
+        return None
+
+    persisted_query = extensions.get("persistedQuery")
+    if not isinstance(persisted_query, dict):
+        return None
+
+    return persisted_query.get("sha256Hash")
+
+
+def resolve_persisted_query(request, data, query):
+    """
+    Returns the query to execute for a request using Automatic Persisted Queries.
+
+    A request may contain only the SHA-256 hash of the query in
+    `extensions.persistedQuery.sha256Hash`, in which case the query is looked up
+    from the store. When the request contains both the query and the hash, a valid
+    query is added to the cache store for a while, unless only registered queries
+    are allowed with the `GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES` setting.
+    """
+    # The view module imports this one
+    from open_city_profile.views import get_query_validation_errors
+
+    sha256_hash = _get_persisted_query_hash(request, data)
+    allow_only_persisted = settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES
+
+    if not sha256_hash:
+        if allow_only_persisted and query:
+            raise PersistedQueryNotAllowedError("PersistedQueryNotAllowed")
+        return query
+
+    store = get_persisted_query_store()
+    persisted_query = store.get(sha256_hash)
+    if persisted_query is not None:
+        return persisted_query
+
+    if not query:
+        raise PersistedQueryNotFoundError("PersistedQueryNotFound")
+
+    if allow_only_persisted:
+        raise PersistedQueryNotAllowedError("PersistedQueryNotAllowed")
+
+    if query_hash(query) != sha256_hash:
+        raise PersistedQueryHashMismatchError("provided sha does not match query")
+
+    if not get_query_validation_errors(query):
+        store.add_automatically(sha256_hash, query)
+    return query
@@ -0,0 +1,144 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from open_city_profile.db_routing import execute_wrapper
+
+
+@dataclass
+class ResolverTiming:
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    queries: int = 0
+    query_time: float = 0.0
+
+    def add(self, wall_time, queries, query_time):
+        self.calls += 1
+        self.total_time += wall_time
+        self.max_time = max(self.max_time, wall_time)
+        self.queries += queries
+        self.query_time += query_time
+
+
+class ResolverStats:
+    """
+    Per process aggregate of resolver timings, keyed by operation name and by
+    field path.
+
+    The operation names and the field paths, which contain the aliases, come from
+    the clients. So at most `GRAPHQL_RESOLVER_PROFILING_MAX_KEYS` of them are kept
+    and the timings of the rest are aggregated under `OTHER_KEY`.
+    """
+
+    OTHER_KEY = ("(other)", "(other)")
+
+    def __init__(self):
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation_name, path, wall_time, queries, query_time):
+        key = (operation_name, path)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                if len(self._timings) >= settings.GRAPHQL_RESOLVER_PROFILING_MAX_KEYS:
+                    key = self.OTHER_KEY
+                timing = self._timings.setdefault(key, ResolverTiming())
+            timing.add(wall_time, queries, query_time)
+
+    def snapshot(self):
+        """Returns a copy of the timings, slowest resolvers of each operation first"""
+        with self._lock:
+            items = [
+                (key, ResolverTiming(**vars(timing)))
+                for key, timing in self._timings.items()
+            ]
+
+        result = {}
+        for (operation_name, path), timing in sorted(
+            items, key=lambda item: (item[0][0], -item[1].total_time)
+        ):
+            result.setdefault(operation_name, {})[path] = timing
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._timings.clear()
+
+
+resolver_stats = ResolverStats()
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+def _field_path(info):
+    return ".".join(key for key in info.path.as_list() if isinstance(key, str))
+
+
+def _operation_name(info):
+    name = info.operation.name
+    return name.value if name else "(anonymous)"
+
+
+class ResolverProfilingMiddleware:
+    """
+    Records the wall time, the number of database queries and the time spent in
+    them for every resolver.
+
+    The timings are aggregated in `resolver_stats` by operation name and by field
+    path, e.g. `profiles.edges.node.verifiedPersonalInformation`. Only the time
+    spent in the resolver itself is measured, the fields below it are recorded
+    separately. For staff users the timings of the current request are also
+    collected to `request.graphql_resolver_trace` so that the view can return
+    them.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        query_timer = _QueryTimer()
+        start = time.perf_counter()
+        try:
+            with execute_wrapper(query_timer):
+                return next(root, info, **kwargs)
+        finally:
+            self._record(info, time.perf_counter() - start, query_timer)
+
+    @staticmethod
+    def _record(info, wall_time, query_timer):
+        resolver_stats.record(
+            _operation_name(info),
+            _field_path(info),
+            wall_time,
+            query_timer.count,
+            query_timer.time,
+        )
+
+        request = info.context
+        user = getattr(request, "user", None)
+        if not getattr(user, "is_staff", False):
+            return
+
+        if not hasattr(request, "graphql_resolver_trace"):
+            request.graphql_resolver_trace = []
+        request.graphql_resolver_trace.append(
+            {
+                "path": info.path.as_list(),
+                "duration": wall_time,
+                "queries": query_timer.count,
+                "queryDuration": query_timer.time,
+            }
+        )
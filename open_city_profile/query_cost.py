@@ -0,0 +1,137 @@
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLInt,
+    InlineFragmentNode,
+    get_named_type,
+    is_composite_type,
+    value_from_ast,
+)
+from graphql.execution.values import get_variable_values
+
+PAGINATION_ARGUMENTS = ("first", "last")
+
+# Arguments listing the objects to return, so the length of the list is the number of
+# returned objects
+LIST_SIZE_ARGUMENTS = ("userIds",)
+
+
+class QueryCostCalculator:
+    """
+    Calculates the worst case cost of a GraphQL operation without executing it.
+
+    Every object field costs its weight, one by default, and scalar fields cost
+    nothing unless they are given a weight. The cost of the selections of a
+    connection field is multiplied by its `first` or `last` argument, or by the
+    maximum page size when neither is given, so the cost grows with every nested
+    connection. The cost of a list field taking the objects to return as a list
+    argument, e.g. `userIds`, is multiplied by the length of that list.
+    """
+
+    def __init__(self, schema, document, field_weights=None):
+        self.schema = schema
+        self.variables = {}
+        self.field_weights = field_weights or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+
+    def operation_cost(self, operation, variables=None):
+        coerced_variables = get_variable_values(
+            self.schema, operation.variable_definitions, variables or {}
+        )
+        # Invalid variables fail the execution anyway, pagination variables are
+        # then counted with the maximum page size.
+        self.variables = (
+            coerced_variables if isinstance(coerced_variables, dict) else {}
+        )
+
+        root_type = self.schema.get_root_type(operation.operation)
+        return self._selection_set_cost(operation.selection_set, root_type, set())
+
+    def _selection_set_cost(self, selection_set, parent_type, visited_fragments):
+        cost = 0
+
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost += self._field_cost(selection, parent_type, visited_fragments)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(
+                        selection.type_condition.name.value
+                    )
+                cost += self._selection_set_cost(
+                    selection.selection_set, fragment_type, visited_fragments
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visited_fragments:
+                    continue
+                cost += self._selection_set_cost(
+                    fragment.selection_set,
+                    self.schema.get_type(fragment.type_condition.name.value),
+                    visited_fragments | {name},
+                )
+
+        return cost
+
+    def _field_cost(self, field_node, parent_type, visited_fragments):
+        name = field_node.name.value
+        field = getattr(parent_type, "fields", {}).get(name)
+        if field is None:
+            # Introspection fields and fields of abstract types
+            return 0
+
+        field_type = get_named_type(field.type)
+        weight = self.field_weights.get(name, 1 if is_composite_type(field_type) else 0)
+
+        if not field_node.selection_set:
+            return weight
+
+        children_cost = self._selection_set_cost(
+            field_node.selection_set, field_type, visited_fragments
+        )
+
+        list_size = self._list_size(field_node, field)
+        if list_size is not None:
+            # Every object of the list costs the weight of the field
+            return list_size * (weight + children_cost)
+
+        return weight + self._multiplier(field_node, field) * children_cost
+
+    def _list_size(self, field_node, field):
+        """Length of the list argument of the field listing the objects to return"""
+        for argument in field_node.arguments:
+            name = argument.name.value
+            if name in LIST_SIZE_ARGUMENTS and name in field.args:
+                value = value_from_ast(
+                    argument.value, field.args[name].type, self.variables
+                )
+                if isinstance(value, list):
+                    return len(value)
+
+        return None
+
+    def _multiplier(self, field_node, field):
+        arguments = {
+            argument.name.value: argument.value for argument in field_node.arguments
+        }
+
+        for argument_name in PAGINATION_ARGUMENTS:
+            if argument_name in arguments:
+                value = value_from_ast(
+                    arguments[argument_name], GraphQLInt, self.variables
+                )
+                if isinstance(value, int):
+                    return max(value, 0)
+
+        if any(argument in field.args for argument in PAGINATION_ARGUMENTS):
+            return graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 1
+
+        return 1
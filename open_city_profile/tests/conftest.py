@@ -21,6 +21,7 @@ from open_city_profile.tests.factories import (
     SystemUserFactory,
     UserFactory,
 )
+from open_city_profile.tests.query_budget import query_budget  # noqa: F401
 from open_city_profile.views import GraphQLView
 from services.models import Service
 from services.tests.factories import AllowedDataFieldFactory, ServiceFactory
@@ -0,0 +1,113 @@
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+import pytest
+from django.test.utils import CaptureQueriesContext
+
+from open_city_profile.db_routing import get_routed_connections
+
+_IGNORED_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+_NORMALIZATIONS = (
+    # String literals, including UUIDs and encrypted values
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    # Numbers which are not part of an identifier
+    (re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?\b"), "?"),
+    # Lists of values, e.g. in IN lookups and bulk inserts
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+"), "(?)"),
+)
+
+
+def query_shape(sql):
+    """Returns the SQL with its literal values replaced with placeholders"""
+    for pattern, replacement in _NORMALIZATIONS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class QueryBudgetExceededError(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    Records the SQL queries made within a block and checks them against a budget.
+
+    The check fails if more queries than `max_queries` are made, or if a query of
+    the same shape, i.e. differing only by its parameter values, is repeated more
+    than `max_repeats` times. The latter is the signature of an N+1 problem.
+    """
+
+    def __init__(self, label, max_queries, max_repeats=1):
+        self.label = label
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self._stack = ExitStack()
+        # The queries to the primary database and to every replica
+        self._contexts = []
+
+    def __enter__(self):
+        with ExitStack() as stack:
+            self._contexts = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in get_routed_connections()
+            ]
+            self._stack = stack.pop_all()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.check()
+
+    @property
+    def queries(self):
+        return [
+            query["sql"]
+            for context in self._contexts
+            for query in context.captured_queries
+            if not query["sql"].startswith(_IGNORED_STATEMENTS)
+        ]
+
+    def repeated_shapes(self):
+        counts = Counter(query_shape(sql) for sql in self.queries)
+        return {
+            shape: count for shape, count in counts.items() if count > self.max_repeats
+        }
+
+    def check(self):
+        queries = self.queries
+        repeated_shapes = self.repeated_shapes()
+        problems = []
+
+        if len(queries) > self.max_queries:
+            problems.append(
+                f"{len(queries)} queries were made, the budget is {self.max_queries}."
+            )
+        for shape, count in repeated_shapes.items():
+            problems.append(f"Possible N+1: a query was made {count} times:\n  {shape}")
+
+        if problems:
+            raise QueryBudgetExceededError(self.report(problems))
+
+    def report(self, problems):
+        lines = [f"Query budget of {self.label!r} exceeded.", *problems, "Queries:"]
+        lines.extend(f"{i:>4}. {sql}" for i, sql in enumerate(self.queries, 1))
+        return "\n".join(lines)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Checks the SQL queries made within a block against a budget.
+
+        with query_budget("profiles page", max_queries=8):
+            user_gql_client.execute(query)
+    """
+
+    def _query_budget(label, max_queries, max_repeats=1):
+        return QueryRecorder(label, max_queries, max_repeats)
+
+    return _query_budget
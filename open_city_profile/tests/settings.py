@@ -18,3 +18,12 @@ KEYCLOAK_CLIENT_ID = ""
 KEYCLOAK_CLIENT_SECRET = ""
 KEYCLOAK_GDPR_CLIENT_ID = ""
 KEYCLOAK_GDPR_CLIENT_SECRET = ""
+
+# A second database standing in for a read replica in the database routing tests.
+# It's separate from the default one so that the tests can tell where the reads
+# go. Its tables are created from the models, as the data migrations only work
+# on the default database.
+DATABASES["replica"] = {  # noqa: F405
+    **DATABASES["default"],  # noqa: F405
+    "TEST": {"NAME": f"test_{DATABASES['default']['NAME']}_replica", "MIGRATE": False},  # noqa: F405, E501
+}
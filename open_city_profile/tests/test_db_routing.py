@@ -0,0 +1,228 @@
+import json
+import random
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from open_city_profile.db_routing import (
+    can_read_from_replicas,
+    get_replica_lag,
+    mark_recent_write,
+    use_replicas,
+    validate_replica_settings,
+)
+from open_city_profile.metrics import DB_QUERIES_PER_REQUEST
+from open_city_profile.middleware import DatabaseQueryMetricsMiddleware
+from open_city_profile.views import GraphQLView
+from profiles.models import Profile
+from profiles.tests.factories import ProfileFactory
+from services.tests.factories import ServiceFactory
+
+from .factories import SuperuserFactory, UserFactory
+from .query_budget import QueryRecorder
+
+pytestmark = pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+
+
+def create_replicated_profile(**kwargs):
+    """Creates the profile in both databases, as if it had been replicated"""
+    profile = ProfileFactory(**kwargs)
+    profile.user.save(using="replica")
+    profile.save(using="replica")
+    return profile
+
+
+def test_reads_go_to_the_primary_outside_use_replicas(replica):
+    profile = ProfileFactory()
+
+    assert Profile.objects.filter(pk=profile.pk).exists()
+
+
+def test_reads_go_to_the_replicas_inside_use_replicas(replica):
+    primary_only = ProfileFactory()
+    replicated = create_replicated_profile()
+
+    with use_replicas():
+        assert list(Profile.objects.all()) == [replicated]
+        assert not Profile.objects.filter(pk=primary_only.pk).exists()
+
+
+def test_reads_of_a_use_replicas_block_go_to_the_same_replica(replica):
+    create_replicated_profile()
+
+    with mock.patch(
+        "open_city_profile.db_routing.random.choice", wraps=random.choice
+    ) as choice:
+        with use_replicas():
+            profile = Profile.objects.get()
+            list(profile.emails.all())
+            list(profile.phones.all())
+
+    choice.assert_called_once_with(["replica"])
+
+
+def test_replica_reads_are_recorded_by_the_query_budget(replica):
+    create_replicated_profile()
+
+    with QueryRecorder("replica reads", max_queries=1) as recorder, use_replicas():
+        Profile.objects.get()
+
+    assert len(recorder.queries) == 1
+
+
+def test_replica_reads_are_counted_in_the_request_metrics(replica, settings, rf):
+    settings.METRICS_ENABLED = True
+
+    def get_response(request):
+        with use_replicas():
+            return list(Profile.objects.all())
+
+    with mock.patch.object(DB_QUERIES_PER_REQUEST, "observe") as observe:
+        DatabaseQueryMetricsMiddleware(get_response)(rf.get("/"))
+
+    observe.assert_called_once_with(1)
+
+
+def test_reads_go_to_the_primary_without_replicas():
+    profile = ProfileFactory()
+
+    with use_replicas():
+        assert Profile.objects.filter(pk=profile.pk).exists()
+
+
+def test_reads_after_a_write_go_to_the_primary(replica):
+    with use_replicas():
+        profile = ProfileFactory()
+        assert Profile.objects.filter(pk=profile.pk).exists()
+
+
+def test_reads_in_a_transaction_go_to_the_primary(replica):
+    profile = ProfileFactory()
+
+    with use_replicas(), transaction.atomic():
+        assert Profile.objects.filter(pk=profile.pk).exists()
+
+
+def test_users_are_read_from_the_primary(replica):
+    user = UserFactory()
+
+    with use_replicas():
+        assert get_user_model().objects.filter(pk=user.pk).exists()
+
+
+def test_instances_read_from_a_replica_are_saved_to_the_primary(replica):
+    profile = create_replicated_profile(nickname="Old")
+
+    with use_replicas():
+        replica_profile = Profile.objects.get(pk=profile.pk)
+        replica_profile.nickname = "New"
+        replica_profile.save()
+
+    assert Profile.objects.get(pk=profile.pk).nickname == "New"
+    assert Profile.objects.using("replica").get(pk=profile.pk).nickname == "Old"
+
+
+def create_request(user, authorization):
+    request = RequestFactory().post("/graphql/", HTTP_AUTHORIZATION=authorization)
+    request.user = user
+    return request
+
+
+def test_reads_of_a_user_stay_on_the_primary_after_a_write(replica, settings):
+    settings.DATABASE_REPLICA_STICKINESS_SECONDS = 10
+    writer, other = UserFactory(), UserFactory()
+
+    mark_recent_write(create_request(writer, "Bearer token"))
+
+    # The access token of the writer may have been refreshed meanwhile
+    assert not can_read_from_replicas(create_request(writer, "Bearer refreshed"))
+    assert can_read_from_replicas(create_request(other, "Bearer token"))
+
+
+def test_replicas_require_a_shared_cache(replica, settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+    with pytest.raises(ImproperlyConfigured):
+        validate_replica_settings()
+
+    settings.DATABASE_REPLICA_STICKINESS_SECONDS = 0
+    validate_replica_settings()
+
+    settings.DATABASE_REPLICA_STICKINESS_SECONDS = 10
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}
+    }
+    validate_replica_settings()
+
+
+SERVICES_QUERY = "query { services { edges { node { name } } } }"
+MUTATION = "mutation { addServiceConnection(input: {serviceConnection: {}}) { clientMutationId } }"  # noqa: E501
+
+
+def execute_in_view(user, query):
+    """Returns the data of the response and the number of queries to the replica"""
+    request = RequestFactory().post(
+        "/graphql/", json.dumps({"query": query}), content_type="application/json"
+    )
+    request.user = user
+    with CaptureQueriesContext(connections["replica"]) as replica_queries:
+        response = GraphQLView.as_view()(request)
+    return json.loads(response.content)["data"], len(replica_queries)
+
+
+def service_names(data):
+    return [edge["node"]["name"] for edge in data["services"]["edges"]]
+
+
+def test_graphql_queries_read_from_the_replicas(replica):
+    # Not replicated yet
+    ServiceFactory()
+
+    data, replica_query_count = execute_in_view(SuperuserFactory(), SERVICES_QUERY)
+
+    assert service_names(data) == []
+    assert replica_query_count > 0
+
+
+def test_graphql_mutations_pin_the_user_to_the_primary(replica, settings):
+    settings.DATABASE_REPLICA_STICKINESS_SECONDS = 10
+    service = ServiceFactory()
+    writer, other = SuperuserFactory(), SuperuserFactory()
+
+    _, replica_query_count = execute_in_view(writer, MUTATION)
+    assert replica_query_count == 0
+
+    data, replica_query_count = execute_in_view(writer, SERVICES_QUERY)
+    assert service_names(data) == [service.name]
+    assert replica_query_count == 0
+
+    data, replica_query_count = execute_in_view(other, SERVICES_QUERY)
+    assert service_names(data) == []
+    assert replica_query_count > 0
+
+
+def test_replica_lag_of_a_database_which_is_not_a_replica_is_zero(replica):
+    assert get_replica_lag("replica") == 0
+
+
+def test_replica_lag_is_served_in_metrics(client, replica, settings):
+    settings.METRICS_ENABLED = True
+
+    content = client.get("/metrics").content.decode()
+
+    assert (
+        'open_city_profile_database_replica_lag_seconds{database="replica"} 0.0'
+        in content
+    )
@@ -4,11 +4,12 @@ from unittest.mock import Mock
 import pytest
 from graphql import get_introspection_query
 
+from open_city_profile import views
 from open_city_profile.tests.graphql_test_helpers import (
     do_graphql_call,
     do_graphql_call_as_user,
 )
-from open_city_profile.views import GraphQLView
+from open_city_profile.views import DocumentCache, GraphQLView
 from profiles.tests.factories import ProfileFactory
 
 
@@ -139,3 +140,27 @@ def test_format_error_without_original_error_attribute():
     formatted_error = view.format_error(mock_error)
 
     assert formatted_error["extensions"]["code"] == "GENERAL_ERROR"
+
+
+def test_repeated_query_is_parsed_and_validated_once(live_server, mocker):
+    views.document_cache.clear()
+    parse_spy = mocker.spy(views, "parse")
+    validate_spy = mocker.spy(views, "validate")
+
+    for _ in range(2):
+        data, errors = do_graphql_call(live_server)
+        assert type(data["_service"]["sdl"]) is str
+
+    assert parse_spy.call_count == 1
+    assert validate_spy.call_count == 1
+
+
+def test_document_cache_evicts_least_recently_used_entries():
+    cache = DocumentCache(max_size=2)
+    cache.get("a", lambda: "A")
+    cache.get("b", lambda: "B")
+    cache.get("a", lambda: "not used")
+    cache.get("c", lambda: "C")
+
+    assert cache.get("a", lambda: "not used") == "A"
+    assert cache.get("b", lambda: "new B") == "new B"
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+from prometheus_client import REGISTRY
+
+from open_city_profile.views import DocumentCache
+from profiles.audit_log import _commit_audit_logs, _thread_locals
+from profiles.tests.factories import ProfileFactory
+from utils.keycloak import KeycloakAdminClient
+
+
+def sample_value(name, **labels):
+    return REGISTRY.get_sample_value(f"open_city_profile_{name}", labels) or 0
+
+
+@pytest.fixture
+def metrics_enabled(settings):
+    settings.METRICS_ENABLED = True
+
+
+def test_metrics_are_not_served_when_disabled(client, settings):
+    settings.METRICS_ENABLED = False
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_are_served_in_prometheus_format(client, metrics_enabled):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    content = response.content.decode()
+    for name in (
+        "graphql_operation_duration_seconds",
+        "gdpr_api_request_duration_seconds",
+        "keycloak_admin_request_duration_seconds",
+        "audit_log_flush_duration_seconds",
+        "audit_log_flush_size",
+        "db_queries_per_request",
+    ):
+        assert f"# TYPE open_city_profile_{name} histogram" in content
+
+
+def test_metrics_of_multiple_processes_are_combined(
+    client, metrics_enabled, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "tracked_names,label", [(["Typename"], "Typename"), ([], "(other)")]
+)
+def test_graphql_operation_latency_is_recorded(client, settings, tracked_names, label):
+    settings.METRICS_GRAPHQL_OPERATION_NAMES = tracked_names
+    count_before = sample_value(
+        "graphql_operation_duration_seconds_count", operation_name=label
+    )
+
+    client.post(
+        "/graphql/",
+        json.dumps({"query": "query Typename { __typename }"}),
+        content_type="application/json",
+    )
+
+    assert (
+        sample_value("graphql_operation_duration_seconds_count", operation_name=label)
+        == count_before + 1
+    )
+
+
+def test_graphql_document_cache_hits_and_misses_are_recorded():
+    def counts():
+        return [
+            sample_value(f"cache_{result}_total", cache="graphql_documents")
+            for result in ("hits", "misses")
+        ]
+
+    hits_before, misses_before = counts()
+    document_cache = DocumentCache(max_size=10)
+
+    for _ in range(3):
+        document_cache.get("key", lambda: (None, []))
+
+    assert counts() == [hits_before + 2, misses_before + 1]
+
+
+def test_database_queries_per_request_are_recorded(client, metrics_enabled):
+    count_before = sample_value("db_queries_per_request_count")
+
+    client.get("/metrics")
+
+    assert sample_value("db_queries_per_request_count") == count_before + 1
+
+
+def test_keycloak_admin_request_latency_is_recorded(requests_mock):
+    server_url = "https://keycloak.example"
+    requests_mock.get(
+        f"{server_url}/realms/realm/.well-known/openid-configuration",
+        json={"token_endpoint": f"{server_url}/token"},
+    )
+    requests_mock.post(f"{server_url}/token", json={"access_token": "token"})
+    requests_mock.get(f"{server_url}/admin/realms/realm/users/abc", json={})
+    client = KeycloakAdminClient(server_url, "realm", "client-id", "secret")
+    labels = {"method": "GET", "endpoint": "users/{id}"}
+    count_before = sample_value(
+        "keycloak_admin_request_duration_seconds_count", **labels
+    )
+
+    client.get_user("abc")
+
+    assert (
+        sample_value("keycloak_admin_request_duration_seconds_count", **labels)
+        == count_before + 1
+    )
+
+
+def test_audit_log_flush_is_recorded(settings, rf):
+    settings.AUDIT_LOG_TO_DB_ENABLED = True
+    profile = ProfileFactory()
+    request = rf.get("/")
+    request._audit_loggables = {
+        profile.pk: {"profile": profile, "parts": [("READ", "Profile")] * 3}
+    }
+    _thread_locals.request = request
+    count_before = sample_value("audit_log_flush_duration_seconds_count")
+    size_before = sample_value("audit_log_flush_size_sum")
+
+    try:
+        _commit_audit_logs()
+    finally:
+        _thread_locals.__dict__.clear()
+
+    assert sample_value("audit_log_flush_duration_seconds_count") == count_before + 1
+    assert sample_value("audit_log_flush_size_sum") == size_before + 3
@@ -0,0 +1,119 @@
+import pytest
+import requests_mock
+from helusers.models import OIDCBackChannelLogoutEvent
+from helusers.oidc import AuthenticationError, RequestJWTAuthentication
+from prometheus_client import REGISTRY
+
+from open_city_profile.oidc import CachedRequestJWTAuthentication, TokenCacheInfo
+
+from .graphql_test_helpers import CONFIG_URL, CONFIGURATION, JWKS_URL, KEYS
+from .graphql_test_helpers import generate_jwt_token as _generate_jwt_token
+
+
+@pytest.fixture(autouse=True)
+def mock_jwks():
+    with requests_mock.Mocker() as mock:
+        mock.get(CONFIG_URL, json=CONFIGURATION)
+        mock.get(JWKS_URL, json=KEYS)
+        yield
+
+
+@pytest.fixture
+def verify_spy(mocker):
+    return mocker.spy(RequestJWTAuthentication, "authenticate")
+
+
+@pytest.fixture
+def request_with_token(rf):
+    def _request_with_token(token):
+        return rf.post("/graphql/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    return _request_with_token
+
+
+def generate_jwt_token(**extra_claims):
+    return _generate_jwt_token(extra_claims)
+
+
+def test_verified_token_is_remembered(request_with_token, verify_spy):
+    authenticator = CachedRequestJWTAuthentication(max_size=10)
+    claims, token = generate_jwt_token()
+
+    first = authenticator.authenticate(request_with_token(token))
+    second = authenticator.authenticate(request_with_token(token))
+
+    assert verify_spy.call_count == 1
+    assert second.data == first.data == claims
+    assert second.user == first.user
+    assert second.user is not first.user
+    assert authenticator.cache_info() == TokenCacheInfo(
+        hits=1, misses=1, size=1, max_size=10
+    )
+
+
+def test_token_cache_hits_and_misses_are_exported_as_metrics(request_with_token):
+    def counts():
+        return [
+            REGISTRY.get_sample_value(
+                f"open_city_profile_cache_{result}_total", {"cache": "verified_tokens"}
+            )
+            or 0
+            for result in ("hits", "misses")
+        ]
+
+    hits_before, misses_before = counts()
+    authenticator = CachedRequestJWTAuthentication(max_size=10)
+    _, token = generate_jwt_token()
+
+    for _ in range(3):
+        authenticator.authenticate(request_with_token(token))
+
+    assert counts() == [hits_before + 2, misses_before + 1]
+
+
+def test_token_is_forgotten_when_it_expires(request_with_token, verify_spy, mocker):
+    authenticator = CachedRequestJWTAuthentication(max_size=10)
+    claims, token = generate_jwt_token()
+    authenticator.authenticate(request_with_token(token))
+
+    mocker.patch("open_city_profile.oidc.time.time", return_value=claims["exp"])
+    authenticator.authenticate(request_with_token(token))
+
+    assert verify_spy.call_count == 2
+
+
+def test_terminated_session_of_remembered_token_is_rejected(request_with_token):
+    authenticator = CachedRequestJWTAuthentication(max_size=10)
+    claims, token = generate_jwt_token()
+    authenticator.authenticate(request_with_token(token))
+
+    OIDCBackChannelLogoutEvent.objects.create(
+        iss=claims["iss"], sid=claims["sid"], sub=claims["sub"]
+    )
+
+    with pytest.raises(AuthenticationError):
+        authenticator.authenticate(request_with_token(token))
+
+
+def test_oldest_token_is_forgotten_when_cache_is_full(request_with_token):
+    authenticator = CachedRequestJWTAuthentication(max_size=2)
+    tokens = [generate_jwt_token()[1] for _ in range(3)]
+
+    for token in tokens:
+        authenticator.authenticate(request_with_token(token))
+
+    assert authenticator.cache_info().size == 2
+    authenticator.authenticate(request_with_token(tokens[0]))
+    assert authenticator.cache_info().hits == 0
+
+
+def test_tokens_are_not_remembered_when_cache_is_disabled(
+    request_with_token, verify_spy
+):
+    authenticator = CachedRequestJWTAuthentication(max_size=0)
+    _, token = generate_jwt_token()
+
+    authenticator.authenticate(request_with_token(token))
+    authenticator.authenticate(request_with_token(token))
+
+    assert verify_spy.call_count == 2
@@ -0,0 +1,85 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.permissions import get_permission_checker, requester_has_perm
+from open_city_profile.tests.factories import (
+    GroupFactory,
+    SuperuserFactory,
+    UserFactory,
+)
+from services.tests.factories import ServiceFactory
+
+
+@pytest.fixture
+def request_for():
+    def _request_for(user):
+        request = RequestFactory().post("/graphql")
+        request.user = user
+        return request
+
+    return _request_for
+
+
+def test_service_permissions_are_fetched_once_per_request(
+    request_for, django_assert_num_queries
+):
+    user = UserFactory()
+    group = GroupFactory()
+    user.groups.add(group)
+    services = ServiceFactory.create_batch(3)
+    assign_perm("can_view_profiles", group, services[0])
+    assign_perm("can_manage_profiles", user, services[1])
+    request = request_for(user)
+
+    # Services, user permissions and group permissions
+    with django_assert_num_queries(3):
+        results = [
+            requester_has_perm(request, permission, service)
+            for permission in ("can_view_profiles", "can_manage_profiles")
+            for service in services
+        ]
+
+    assert results == [True, False, False, False, True, False]
+
+
+@pytest.mark.parametrize(
+    "user_factory,expected",
+    [
+        (lambda: SuperuserFactory(), True),
+        (lambda: UserFactory(is_active=False), False),
+        (lambda: AnonymousUser(), False),
+    ],
+)
+def test_service_permission_of_special_users(request_for, user_factory, expected):
+    user = user_factory()
+    service = ServiceFactory()
+    if user.is_authenticated:
+        assign_perm("can_view_profiles", user, service)
+
+    assert (
+        requester_has_perm(request_for(user), "can_view_profiles", service) is expected
+    )
+
+
+def test_global_permissions_are_checked(request_for):
+    user = UserFactory()
+    request = request_for(user)
+
+    assert not requester_has_perm(request, "services.view_serviceconnection")
+
+    superuser_request = request_for(SuperuserFactory())
+
+    assert requester_has_perm(superuser_request, "services.view_serviceconnection")
+
+
+def test_permission_checker_is_replaced_when_the_user_changes(request_for):
+    request = request_for(AnonymousUser())
+    anonymous_checker = get_permission_checker(request)
+
+    assert get_permission_checker(request) is anonymous_checker
+
+    request.user = UserFactory()
+
+    assert get_permission_checker(request) is not anonymous_checker
@@ -0,0 +1,205 @@
+import json
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.core.checks import ERROR, WARNING
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+
+from open_city_profile.checks import check_persisted_queries
+from open_city_profile.models import PersistedQuery
+from open_city_profile.persisted_queries import (
+    CachePersistedQueryStore,
+    DatabasePersistedQueryStore,
+    query_hash,
+    validate_persisted_query_settings,
+)
+
+QUERY = "query Typename { __typename }"
+QUERY_HASH = query_hash(QUERY)
+
+DATABASE_STORE = "open_city_profile.persisted_queries.DatabasePersistedQueryStore"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture(params=["cache", "database"])
+def store(request, settings):
+    if request.param == "database":
+        settings.GRAPHQL_PERSISTED_QUERY_STORE = DATABASE_STORE
+        return DatabasePersistedQueryStore()
+    return CachePersistedQueryStore()
+
+
+def do_persisted_query_call(client, sha256_hash, query=None, method="post"):
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": sha256_hash}}
+
+    if method == "get":
+        params = {"extensions": json.dumps(extensions)}
+        if query:
+            params["query"] = query
+        response = client.get("/graphql/", params)
+    else:
+        payload = {"extensions": extensions}
+        if query:
+            payload["query"] = query
+        response = client.post(
+            "/graphql/", json.dumps(payload), content_type="application/json"
+        )
+
+    return response.json()
+
+
+def error_code(body):
+    return body["errors"][0]["extensions"]["code"]
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_unknown_hash_asks_for_the_query(client, store, method):
+    body = do_persisted_query_call(client, QUERY_HASH, method=method)
+
+    assert body["errors"][0]["message"] == "PersistedQueryNotFound"
+    assert error_code(body) == "PERSISTED_QUERY_NOT_FOUND"
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_query_sent_with_its_hash_is_persisted_in_the_cache(client, method):
+    body = do_persisted_query_call(client, QUERY_HASH, QUERY, method=method)
+    assert body["data"] == {"__typename": "Query"}
+    assert CachePersistedQueryStore().get(QUERY_HASH) == QUERY
+
+    body = do_persisted_query_call(client, QUERY_HASH, method=method)
+    assert body["data"] == {"__typename": "Query"}
+
+
+def test_query_sent_with_its_hash_expires_from_the_cache(client, settings):
+    settings.GRAPHQL_PERSISTED_QUERY_CACHE_TIMEOUT = 60
+
+    with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+        do_persisted_query_call(client, QUERY_HASH, QUERY)
+
+    assert cache_set.call_args.kwargs["timeout"] == 60
+
+
+def test_query_sent_with_its_hash_is_not_added_to_the_database(client, settings):
+    settings.GRAPHQL_PERSISTED_QUERY_STORE = DATABASE_STORE
+
+    body = do_persisted_query_call(client, QUERY_HASH, QUERY)
+
+    assert body["data"] == {"__typename": "Query"}
+    assert not PersistedQuery.objects.exists()
+
+
+def test_invalid_query_sent_with_its_hash_is_not_persisted(client):
+    invalid_query = "query { noSuchField }"
+
+    body = do_persisted_query_call(client, query_hash(invalid_query), invalid_query)
+
+    assert "errors" in body
+    assert CachePersistedQueryStore().get(query_hash(invalid_query)) is None
+
+
+def test_query_not_matching_its_hash_is_rejected(client, store):
+    body = do_persisted_query_call(client, "0" * 64, QUERY)
+
+    assert error_code(body) == "PERSISTED_QUERY_HASH_MISMATCH"
+    assert store.get("0" * 64) is None
+
+
+def test_only_registered_queries_are_allowed_when_enabled(client, settings):
+    settings.GRAPHQL_PERSISTED_QUERY_STORE = DATABASE_STORE
+    settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES = True
+
+    body = do_persisted_query_call(client, QUERY_HASH, QUERY)
+    assert error_code(body) == "PERSISTED_QUERY_NOT_ALLOWED"
+    assert not PersistedQuery.objects.exists()
+
+    response = client.post(
+        "/graphql/", json.dumps({"query": QUERY}), content_type="application/json"
+    )
+    assert error_code(response.json()) == "PERSISTED_QUERY_NOT_ALLOWED"
+
+    PersistedQuery.objects.create(sha256_hash=QUERY_HASH, query=QUERY)
+    body = do_persisted_query_call(client, QUERY_HASH)
+    assert body["data"] == {"__typename": "Query"}
+
+
+def test_register_persisted_queries_command(tmp_path, settings):
+    settings.GRAPHQL_PERSISTED_QUERY_STORE = DATABASE_STORE
+    other_query = "query MyProfile { myProfile { id } }"
+    document = tmp_path / "typename.graphql"
+    document.write_text(QUERY)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "format": "apollo-persisted-query-manifest",
+                "version": 1,
+                "operations": [
+                    {"id": query_hash(other_query), "body": other_query},
+                ],
+            }
+        )
+    )
+
+    call_command("register_persisted_queries", str(document), str(manifest))
+
+    assert dict(PersistedQuery.objects.values_list("sha256_hash", "query")) == {
+        QUERY_HASH: QUERY,
+        query_hash(other_query): other_query,
+    }
+
+
+def test_register_persisted_queries_command_rejects_invalid_queries(tmp_path):
+    valid = tmp_path / "valid.graphql"
+    valid.write_text(QUERY)
+    invalid = tmp_path / "invalid.graphql"
+    invalid.write_text("query { noSuchField }")
+
+    with pytest.raises(CommandError, match="noSuchField"):
+        call_command("register_persisted_queries", str(valid), str(invalid))
+
+    assert CachePersistedQueryStore().get(QUERY_HASH) is None
+
+
+def test_check_reports_persisted_queries_not_valid_for_the_schema():
+    PersistedQuery.objects.create(sha256_hash=QUERY_HASH, query=QUERY)
+    assert check_persisted_queries(None) == []
+
+    invalid_query = "query { noSuchField }"
+    PersistedQuery.objects.create(
+        sha256_hash=query_hash(invalid_query), query=invalid_query
+    )
+
+    errors = check_persisted_queries(None)
+    assert len(errors) == 1
+    assert errors[0].level == WARNING
+    assert query_hash(invalid_query) in errors[0].msg
+
+
+def test_check_fails_on_invalid_persisted_queries_when_only_they_are_allowed(
+    settings,
+):
+    settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES = True
+    invalid_query = "query { noSuchField }"
+    PersistedQuery.objects.create(
+        sha256_hash=query_hash(invalid_query), query=invalid_query
+    )
+
+    errors = check_persisted_queries(None)
+
+    assert [error.level for error in errors] == [ERROR]
+
+
+def test_allowing_only_persisted_queries_requires_the_database_store(settings):
+    settings.GRAPHQL_ALLOW_ONLY_PERSISTED_QUERIES = True
+
+    with pytest.raises(ImproperlyConfigured):
+        validate_persisted_query_settings()
+
+    settings.GRAPHQL_PERSISTED_QUERY_STORE = DATABASE_STORE
+    validate_persisted_query_settings()
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from django.test import RequestFactory
+
+from open_city_profile.profiling import ResolverProfilingMiddleware, resolver_stats
+from open_city_profile.tests.factories import UserFactory
+from open_city_profile.views import GraphQLView
+from profiles.tests.factories import EmailFactory, ProfileFactory
+from services.models import Service
+from services.tests.factories import ServiceFactory
+
+QUERY = """
+    query MyProfile {
+        myProfile {
+            id
+            emails {
+                edges {
+                    node {
+                        email
+                    }
+                }
+            }
+        }
+    }
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_resolver_stats():
+    resolver_stats.clear()
+
+
+def execute_query(user, query=QUERY):
+    request = RequestFactory().post(
+        "/graphql/", json.dumps({"query": query}), content_type="application/json"
+    )
+    request.user = user
+    request.service = Service.objects.filter(
+        is_profile_service=True
+    ).first() or ServiceFactory(is_profile_service=True)
+    view = GraphQLView.as_view(middleware=[ResolverProfilingMiddleware()])
+    return json.loads(view(request).content)
+
+
+def test_resolver_timings_are_aggregated_by_operation_and_field_path():
+    profile = ProfileFactory()
+    EmailFactory.create_batch(3, profile=profile, primary=False)
+
+    execute_query(profile.user)
+    execute_query(profile.user)
+
+    timings = resolver_stats.snapshot()["MyProfile"]
+    assert timings["myProfile"].calls == 2
+    assert timings["myProfile"].queries >= 2
+    assert timings["myProfile.emails.edges.node.email"].calls == 6
+    assert timings["myProfile.emails.edges.node.email"].queries == 0
+    assert all(timing.total_time >= timing.max_time for timing in timings.values())
+
+
+def test_resolver_timings_over_the_key_limit_are_aggregated_together(settings):
+    settings.GRAPHQL_RESOLVER_PROFILING_MAX_KEYS = 2
+    user = UserFactory()
+
+    for alias in ("first", "second", "third", "fourth"):
+        execute_query(user, f"query Aliased {{ {alias}: myProfile {{ id }} }}")
+
+    timings = resolver_stats.snapshot()
+    assert set(timings["Aliased"]) == {"first", "second"}
+    assert timings["(other)"]["(other)"].calls == 2
+
+
+@pytest.mark.parametrize("is_staff", [True, False])
+def test_resolver_trace_is_returned_to_staff_users(is_staff):
+    user = UserFactory(is_staff=is_staff)
+
+    body = execute_query(user, "{ myProfile { id } }")
+
+    trace = body.get("extensions", {}).get("resolverTrace")
+    if is_staff:
+        assert [entry["path"] for entry in trace] == [["myProfile"]]
+        assert set(trace[0]) == {"path", "duration", "queries", "queryDuration"}
+    else:
+        assert trace is None
+
+
+def test_admin_view_shows_resolver_timings(admin_client, settings):
+    settings.GRAPHQL_RESOLVER_PROFILING = True
+    profile = ProfileFactory()
+    execute_query(profile.user)
+
+    response = admin_client.get("/admin/graphql-resolver-stats/")
+
+    assert response.status_code == 200
+    assert "MyProfile" in response.content.decode()
+    assert "myProfile.emails" in response.content.decode()
@@ -0,0 +1,53 @@
+import pytest
+
+from open_city_profile.tests.query_budget import (
+    QueryBudgetExceededError,
+    query_shape,
+)
+from profiles.models import Profile
+from profiles.tests.factories import ProfileFactory
+
+
+def test_query_shape_replaces_values_with_placeholders():
+    assert (
+        query_shape(
+            "SELECT * FROM t WHERE t.id = 12 AND t.name = 'O''Brien' AND t.x IN (1, 2, 3)"
+        )
+        == "SELECT * FROM t WHERE t.id = ? AND t.name = ? AND t.x IN (?)"
+    )
+
+
+def test_query_shape_keeps_numbers_in_identifiers():
+    sql = 'SELECT "t"."field_2" FROM "table_1" t LIMIT 21'
+
+    assert query_shape(sql) == 'SELECT "t"."field_2" FROM "table_1" t LIMIT ?'
+
+
+def test_queries_within_budget_pass(query_budget):
+    ProfileFactory.create_batch(3)
+
+    with query_budget("list", max_queries=1) as recorder:
+        list(Profile.objects.all())
+
+    assert len(recorder.queries) == 1
+
+
+def test_exceeding_query_count_fails_with_report(query_budget):
+    with pytest.raises(QueryBudgetExceededError) as exc_info:
+        with query_budget("counting", max_queries=1):
+            Profile.objects.count()
+            Profile.objects.exists()
+
+    report = str(exc_info.value)
+    assert "Query budget of 'counting' exceeded." in report
+    assert "2 queries were made, the budget is 1." in report
+    assert "   1. SELECT COUNT(*)" in report
+
+
+def test_repeated_queries_are_reported_as_n_plus_one(query_budget):
+    profiles = ProfileFactory.create_batch(3)
+
+    with pytest.raises(QueryBudgetExceededError, match="a query was made 3 times"):
+        with query_budget("lookups", max_queries=10):
+            for profile in profiles:
+                Profile.objects.get(pk=profile.pk)
@@ -0,0 +1,167 @@
+import json
+import uuid
+
+import pytest
+from graphene_django.settings import graphene_settings
+from graphql import get_operation_ast, parse
+
+from open_city_profile import views
+from open_city_profile.query_cost import QueryCostCalculator
+from open_city_profile.schema import schema
+
+
+def calculate_cost(query, variables=None, field_weights=None):
+    document = parse(query)
+    calculator = QueryCostCalculator(
+        schema.graphql_schema, document, field_weights=field_weights
+    )
+    return calculator.operation_cost(get_operation_ast(document), variables)
+
+
+def test_scalar_fields_cost_nothing():
+    assert calculate_cost("{ myProfile { id firstName } }") == 1
+
+
+def test_page_sizes_are_multiplied_through_nested_connections():
+    query = """
+        query {
+            profiles(first: 10) {
+                edges {
+                    node {
+                        emails(first: 5) { edges { node { email } } }
+                    }
+                }
+            }
+        }
+    """
+
+    # profiles + 10 * (edges + node + emails + 5 * (edges + node))
+    assert calculate_cost(query) == 1 + 10 * (1 + 1 + 1 + 5 * 2)
+
+
+def test_page_size_is_read_from_variables():
+    query = """
+        query ($count: Int = 20) {
+            profiles(first: $count) { edges { node { id } } }
+        }
+    """
+
+    assert calculate_cost(query) == 1 + 20 * 2
+    assert calculate_cost(query, {"count": 3}) == 1 + 3 * 2
+
+
+def test_connection_without_page_size_is_counted_with_maximum_page_size():
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+    assert calculate_cost("{ profiles { edges { node { id } } } }") == (
+        1 + max_limit * 2
+    )
+
+
+def test_fragments_are_counted():
+    query = """
+        query {
+            myProfile { ...Contacts }
+        }
+        fragment Contacts on ProfileNode {
+            primaryEmail { email }
+            ... on ProfileNode { primaryPhone { phone } }
+        }
+    """
+
+    assert calculate_cost(query) == 3
+
+
+def test_field_weights_are_used():
+    query = "{ myProfile { verifiedPersonalInformation { firstName } } }"
+
+    assert (
+        calculate_cost(query, field_weights={"verifiedPersonalInformation": 10}) == 11
+    )
+    assert calculate_cost(query, field_weights={"firstName": 5}) == 7
+
+
+def test_lists_of_user_ids_are_multiplied_by_their_length():
+    query = """
+        query ($userIds: [UUID!]!) {
+            profilesByUserIds(userIds: $userIds) { primaryEmail { email } }
+        }
+    """
+    user_ids = [str(uuid.uuid4()) for _ in range(3)]
+
+    # 3 * (profile + primaryEmail)
+    assert calculate_cost(query, {"userIds": user_ids}) == 3 * 2
+
+
+def do_graphql_post(client, query):
+    response = client.post(
+        "/graphql/", json.dumps({"query": query}), content_type="application/json"
+    )
+    return response.json()
+
+
+def test_cost_is_reported_in_extensions(client, settings):
+    settings.GRAPHQL_QUERY_COST_LIMIT = 100
+
+    body = do_graphql_post(client, "{ __typename }")
+
+    assert body["data"] == {"__typename": "Query"}
+    assert body["extensions"] == {"cost": {"requested": 0, "limit": 100}}
+
+
+@pytest.mark.parametrize("limit", [1, 2])
+def test_queries_over_the_cost_limit_are_rejected(client, settings, mocker, limit):
+    settings.GRAPHQL_QUERY_COST_LIMIT = limit
+    execute_spy = mocker.spy(views, "execute")
+
+    body = do_graphql_post(client, "{ myProfile { primaryEmail { email } } }")
+
+    assert body["extensions"]["cost"] == {"requested": 2, "limit": limit}
+    if limit == 1:
+        assert body["errors"][0]["extensions"]["code"] == (
+            "QUERY_COST_LIMIT_EXCEEDED_ERROR"
+        )
+        assert execute_spy.call_count == 0
+    else:
+        assert execute_spy.call_count == 1
+
+
+def test_cost_limit_can_be_disabled(client, settings):
+    settings.GRAPHQL_QUERY_COST_LIMIT = 0
+
+    body = do_graphql_post(client, "{ __typename }")
+
+    assert "extensions" not in body
+
+
+STAFF_PROFILE_LISTING_QUERY = """
+    query StaffProfiles {
+        profiles {
+            edges {
+                node {
+                    id
+                    firstName
+                    lastName
+                    emails { edges { node { email primary } } }
+                    phones { edges { node { phone primary } } }
+                    addresses { edges { node { address postalCode city } } }
+                }
+            }
+        }
+    }
+"""
+
+
+def test_typical_staff_listing_query_is_executed_with_the_default_limit(
+    client, settings, mocker
+):
+    assert settings.GRAPHQL_QUERY_COST_LIMIT == 0
+    # Unpaginated connections are counted with the maximum page size
+    assert calculate_cost(STAFF_PROFILE_LISTING_QUERY) == 60501
+    execute_spy = mocker.spy(views, "execute")
+    observe_spy = mocker.spy(views.GRAPHQL_OPERATION_COST.labels("(other)"), "observe")
+
+    do_graphql_post(client, STAFF_PROFILE_LISTING_QUERY)
+
+    assert execute_spy.call_count == 1
+    observe_spy.assert_called_once_with(calculate_cost(STAFF_PROFILE_LISTING_QUERY))
@@ -0,0 +1,124 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from open_city_profile import checks
+from open_city_profile.checks import check_query_shape_indexes
+from profiles.models import (
+    ClaimToken,
+    Email,
+    Profile,
+    TemporaryReadAccessToken,
+)
+from services.models import ServiceConnection
+from services.tests.factories import ServiceFactory
+
+PROFILE_COUNT = 2000
+
+
+@pytest.fixture
+def seeded_data():
+    """Profiles with contacts and tokens, connected to one of ten services"""
+    services = ServiceFactory.create_batch(10)
+    profiles = Profile.objects.bulk_create(
+        Profile(id=uuid.uuid4()) for _ in range(PROFILE_COUNT)
+    )
+    ServiceConnection.objects.bulk_create(
+        ServiceConnection(profile=profile, service=services[index % len(services)])
+        for index, profile in enumerate(profiles)
+    )
+    Email.objects.bulk_create(
+        Email(profile=profile, email=f"{index}-{primary}@example.com", primary=primary)
+        for index, profile in enumerate(profiles)
+        for primary in (True, False)
+    )
+    ClaimToken.objects.bulk_create(ClaimToken(profile=profile) for profile in profiles)
+    TemporaryReadAccessToken.objects.bulk_create(
+        TemporaryReadAccessToken(profile=profile) for profile in profiles
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return services, profiles
+
+
+def assert_uses_index(queryset, *index_names):
+    plan = queryset.explain()
+    assert any(index_name in plan for index_name in index_names), plan
+
+
+def test_the_hot_query_shapes_are_indexed():
+    assert check_query_shape_indexes(None) == []
+
+
+def test_check_reports_query_shapes_without_an_index(monkeypatch):
+    monkeypatch.setattr(
+        checks,
+        "HOT_QUERY_SHAPES",
+        [*checks.HOT_QUERY_SHAPES, ("profiles.Profile", ["contact_method"], None)],
+    )
+
+    warnings = check_query_shape_indexes(None)
+
+    assert len(warnings) == 1
+    assert warnings[0].id == "open_city_profile.W001"
+    assert "profiles.Profile(contact_method)" in warnings[0].msg
+
+
+def test_primary_contacts_are_found_with_the_partial_index(seeded_data):
+    _, profiles = seeded_data
+
+    assert_uses_index(
+        Email.objects.filter(profile_id__in=[profiles[0].pk], primary=True),
+        "profiles_email_unique_primary",
+    )
+
+
+def test_profiles_of_a_service_are_found_with_the_service_index(seeded_data):
+    services, _ = seeded_data
+
+    assert_uses_index(
+        Profile.objects.filter(service_connections__service=services[0]),
+        "services_conn_service_idx",
+    )
+
+
+def test_connection_of_a_profile_and_service_is_found_with_an_index(seeded_data):
+    services, profiles = seeded_data
+
+    # Both the unique (profile, service) and the (service, profile) index serve it
+    assert_uses_index(
+        services[0].serviceconnection_set.filter(profile=profiles[0]),
+        "services_serviceconnection_profile_id_service_id",
+        "services_conn_service_idx",
+    )
+
+
+def test_valid_read_access_tokens_are_found_with_the_profile_index(seeded_data):
+    _, profiles = seeded_data
+
+    assert_uses_index(
+        TemporaryReadAccessToken.objects.filter(
+            profile=profiles[0],
+            created_at__gt=timezone.now() - F("validity_duration"),
+        ),
+        "profiles_read_token_idx",
+    )
+    assert_uses_index(
+        TemporaryReadAccessToken.objects.filter(
+            profile=profiles[0], created_at__gt=timezone.now() - timedelta(days=1)
+        ),
+        "profiles_read_token_idx",
+    )
+
+
+def test_claim_token_is_found_with_the_token_index(seeded_data):
+    claim_token = ClaimToken.objects.first()
+
+    assert_uses_index(
+        ClaimToken.objects.filter(token=claim_token.token),
+        "profiles_claimtoken_token",
+    )
@@ -8,6 +8,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
 from graphql_sync_dataloaders import DeferredExecutionContext
 
+from open_city_profile.metrics import metrics_view
 from open_city_profile.views import GraphQLView
 
 urlpatterns = [
@@ -36,6 +37,7 @@ urlpatterns = [
         ),
         name="gdpr-api-docs",
     ),
+    path("metrics", metrics_view),
     # Kubernetes liveness & readiness probes
     path("", include("helsinki_health_endpoints.urls")),
 ]
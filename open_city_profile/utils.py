@@ -1,5 +1,12 @@
+from django.conf import settings
 from graphql.pyutils import did_you_mean
 
+# Cache backends whose entries aren't seen by the other server processes
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
 _original_max_length = None
 
 
@@ -18,3 +25,8 @@ def enable_graphql_query_suggestion(enable: bool):
         did_you_mean.__globals__["MAX_LENGTH"] = _original_max_length
     else:
         did_you_mean.__globals__["MAX_LENGTH"] = 0
+
+
+def is_cache_shared(alias="default"):
+    """Whether the entries of the cache are shared by all the server processes"""
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_CACHE_BACKENDS
@@ -1,11 +1,31 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
 import graphene_validator.errors
 import sentry_sdk
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
-from django.db import DataError
+from django.db import DataError, connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
 from graphene.validation import DisableIntrospection, depth_limit_validator
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
 from graphene_django.views import GraphQLView as BaseGraphQLView
-from graphql import ExecutionResult, parse, validate
+from graphene_django.views import HttpError
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    parse,
+    specified_rules,
+    validate,
+    validate_schema,
+)
 from helusers.oidc import AuthenticationError
 
 from open_city_profile.consts import (
@@ -21,9 +41,13 @@ from open_city_profile.consts import (
     MISSING_GDPR_API_TOKEN_ERROR,
     OBJECT_DOES_NOT_EXIST_ERROR,
     PERMISSION_DENIED_ERROR,
+    PERSISTED_QUERY_HASH_MISMATCH_ERROR,
+    PERSISTED_QUERY_NOT_ALLOWED_ERROR,
+    PERSISTED_QUERY_NOT_FOUND_ERROR,
     PROFILE_ALREADY_EXISTS_FOR_USER_ERROR,
     PROFILE_DOES_NOT_EXIST_ERROR,
     PROFILE_MUST_HAVE_PRIMARY_EMAIL,
+    QUERY_COST_LIMIT_EXCEEDED_ERROR,
     SERVICE_CONNECTION_ALREADY_EXISTS_ERROR,
     SERVICE_CONNECTION_DOES_NOT_EXIST_ERROR,
     SERVICE_DOES_NOT_EXIST_ERROR,
@@ -31,6 +55,11 @@ from open_city_profile.consts import (
     TOKEN_EXPIRED_ERROR,
     VALIDATION_ERROR,
 )
+from open_city_profile.db_routing import (
+    can_read_from_replicas,
+    mark_recent_write,
+    use_replicas,
+)
 from open_city_profile.exceptions import (
     ConnectedServiceDataQueryFailedError,
     ConnectedServiceDeletionFailedError,
@@ -40,18 +69,33 @@ from open_city_profile.exceptions import (
     InsufficientLoaError,
     InvalidEmailFormatError,
     MissingGDPRApiTokenError,
+    PersistedQueryHashMismatchError,
+    PersistedQueryNotAllowedError,
+    PersistedQueryNotFoundError,
     ProfileAlreadyExistsForUserError,
     ProfileDoesNotExistError,
     ProfileGraphQLError,
     ProfileMustHavePrimaryEmailError,
+    QueryCostLimitExceededError,
     ServiceAlreadyExistsError,
     ServiceConnectionDoesNotExistError,
     ServiceDoesNotExistError,
     ServiceNotIdentifiedError,
     TokenExpiredError,
 )
+from open_city_profile.metrics import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    GRAPHQL_OPERATION_COST,
+    GRAPHQL_OPERATION_DURATION,
+    operation_name_label,
+)
+from open_city_profile.persisted_queries import resolve_persisted_query
+from open_city_profile.query_cost import QueryCostCalculator
 from profiles.models import Profile
 
+logger = logging.getLogger(__name__)
+
 error_codes_shared = {
     Exception: GENERAL_ERROR,
     ObjectDoesNotExist: OBJECT_DOES_NOT_EXIST_ERROR,
@@ -62,6 +106,10 @@ error_codes_shared = {
     InvalidEmailFormatError: INVALID_EMAIL_FORMAT_ERROR,
     AuthenticationError: JWT_AUTHENTICATION_ERROR,
     DataConflictError: DATA_CONFLICT_ERROR,
+    PersistedQueryNotFoundError: PERSISTED_QUERY_NOT_FOUND_ERROR,
+    PersistedQueryNotAllowedError: PERSISTED_QUERY_NOT_ALLOWED_ERROR,
+    PersistedQueryHashMismatchError: PERSISTED_QUERY_HASH_MISMATCH_ERROR,
+    QueryCostLimitExceededError: QUERY_COST_LIMIT_EXCEEDED_ERROR,
 }
 
 error_codes_profile = {
@@ -90,7 +138,7 @@ sentry_ignored_errors = (
 error_codes = {**error_codes_shared, **error_codes_profile}
 
 
-def _get_error_code(exception):
+def get_error_code(exception):
     """Get the most specific error code for the exception via superclass"""
     for exc in exception.mro():
         try:
@@ -99,42 +147,246 @@ def _get_error_code(exception):
             continue
 
 
-class GraphQLView(BaseGraphQLView):
-    def _run_custom_validators(self, query):
-        result = None
+class DocumentCache:
+    """
+    LRU cache of parsed GraphQL documents together with their validation errors.
+
+    Entries are keyed by a digest of the query and by the validation settings in
+    effect, so the documents don't need to be parsed nor validated again.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, parse_and_validate):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+                CACHE_HITS.labels(cache="graphql_documents").inc()
+                return self._entries[key]
+            except KeyError:
+                pass
+
+        CACHE_MISSES.labels(cache="graphql_documents").inc()
+        entry = parse_and_validate()
+
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
 
+document_cache = DocumentCache(settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+class GraphQLView(BaseGraphQLView):
+    def _get_validation_rules(self):
         validation_rules = [
-            depth_limit_validator(max_depth=settings.GRAPHQL_QUERY_DEPTH_LIMIT)
+            *(self.validation_rules or specified_rules),
+            depth_limit_validator(max_depth=settings.GRAPHQL_QUERY_DEPTH_LIMIT),
         ]
 
         if not settings.ENABLE_GRAPHQL_INTROSPECTION:
             validation_rules.append(DisableIntrospection)
 
-        try:
-            document = parse(query)
-        except Exception:
-            # Execution will also fail in super().execute_graphql_request()
-            # when parsing the query so no need to do anything here.
-            pass
-        else:
+        return validation_rules
+
+    def _parse_and_validate(self, query):
+        """
+        Returns the parsed document of the query and its validation errors.
+
+        The standard and the custom validation rules are all run in a single pass
+        and the result is cached in `document_cache`.
+        """
+        cache_key = (
+            hashlib.sha256(query.encode()).digest(),
+            settings.GRAPHQL_QUERY_DEPTH_LIMIT,
+            settings.ENABLE_GRAPHQL_INTROSPECTION,
+        )
+
+        def parse_and_validate():
+            try:
+                document = parse(query)
+            except GraphQLError as e:
+                return None, [e]
+
             validation_errors = validate(
-                schema=self.schema.graphql_schema,
-                document_ast=document,
-                rules=validation_rules,
+                self.schema.graphql_schema,
+                document,
+                self._get_validation_rules(),
+                graphene_settings.MAX_VALIDATION_ERRORS,
             )
-            if validation_errors:
-                result = ExecutionResult(data=None, errors=validation_errors)
+            return document, validation_errors
 
-        return result
+        return document_cache.get(cache_key, parse_and_validate)
+
+    def _get_operation_name(self, query, operation_name):
+        """Name of the executed operation, using the already parsed document"""
+        document = self._parse_and_validate(query)[0] if query else None
+        operation_ast = document and get_operation_ast(document, operation_name)
+        if operation_ast and operation_ast.name:
+            return operation_ast.name.value
+
+        return "(anonymous)"
+
+    @staticmethod
+    def _add_extension(request, key, value):
+        """Adds a value to the `extensions` of the response"""
+        if not hasattr(request, "_graphql_extensions"):
+            request._graphql_extensions = {}
+        request._graphql_extensions[key] = value
+
+    def _check_query_cost(self, request, document, operation_ast, variables):
+        """
+        Calculates the cost of the operation and records it in the metrics and the
+        log. If a cost limit is set, the cost is reported in the `extensions` of the
+        response and the operation is rejected if the cost is over the limit.
+        """
+        if operation_ast is None:
+            return
 
-    def execute_graphql_request(self, request, data, query, *args, **kwargs):
+        cost = QueryCostCalculator(
+            self.schema.graphql_schema,
+            document,
+            field_weights=settings.GRAPHQL_QUERY_COST_FIELD_WEIGHTS,
+        ).operation_cost(operation_ast, variables)
+        operation_name = (
+            operation_ast.name.value if operation_ast.name else "(anonymous)"
+        )
+        GRAPHQL_OPERATION_COST.labels(
+            operation_name=operation_name_label(operation_name)
+        ).observe(cost)
+        logger.info("GraphQL operation %s cost %d", operation_name, cost)
+
+        limit = settings.GRAPHQL_QUERY_COST_LIMIT
+        if not limit:
+            return
+
+        self._add_extension(request, "cost", {"requested": cost, "limit": limit})
+
+        if cost > limit:
+            raise QueryCostLimitExceededError(
+                f"Query cost {cost} exceeds the maximum cost of {limit}."
+            )
+
+    def _execute_graphql_request(
+        self, request, query, variables, operation_name, show_graphiql
+    ):
+        """
+        Same as BaseGraphQLView.execute_graphql_request, except that the query
+        is parsed and validated with `_parse_and_validate`.
+        """
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document, validation_errors = self._parse_and_validate(query)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        if document is None:
+            return ExecutionResult(errors=validation_errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    f"Can only perform a {operation_ast.operation.value} operation "
+                    "from a POST request.",
+                )
+            )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        try:
+            self._check_query_cost(request, document, operation_ast, variables)
+        except QueryCostLimitExceededError as e:
+            return ExecutionResult(errors=[GraphQLError(e.message, original_error=e)])
+
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = (
+                    self.execution_context_class
+                )
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+            ):
+                mark_recent_write(request)
+                if (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                ):
+                    with transaction.atomic():
+                        result = execute(schema, document, **execute_options)
+                        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                            transaction.set_rollback(True)
+                    return result
+            elif can_read_from_replicas(request):
+                with use_replicas():
+                    return execute(schema, document, **execute_options)
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
         """Extract any exceptions and send some of them to Sentry"""
-        result = self._run_custom_validators(query)
+        try:
+            query = resolve_persisted_query(request, data, query)
+        except ProfileGraphQLError as e:
+            return ExecutionResult(errors=[GraphQLError(e.message, original_error=e)])
 
-        if not result:
-            result = super().execute_graphql_request(
-                request, data, query, *args, **kwargs
+        start = time.perf_counter()
+        result = self._execute_graphql_request(
+            request, query, variables, operation_name, show_graphiql
+        )
+        GRAPHQL_OPERATION_DURATION.labels(
+            operation_name=operation_name_label(
+                self._get_operation_name(query, operation_name)
             )
+        ).observe(time.perf_counter() - start)
+
+        trace = getattr(request, "graphql_resolver_trace", None)
+        if trace:
+            self._add_extension(request, "resolverTrace", trace)
 
         if result and result.errors:
             errors = [
@@ -151,6 +403,13 @@ class GraphQLView(BaseGraphQLView):
                 self._capture_sentry_exceptions(result.errors, query)
         return result
 
+    def json_encode(self, request, d, pretty=False):
+        extensions = getattr(request, "_graphql_extensions", None)
+        if extensions:
+            d = {**d, "extensions": extensions}
+
+        return super().json_encode(request, d, pretty)
+
     def _capture_sentry_exceptions(self, errors, query):
         with sentry_sdk.configure_scope() as scope:
             scope.set_extra("graphql_query", query)
@@ -169,7 +428,7 @@ class GraphQLView(BaseGraphQLView):
 
         if isinstance(formatted_error, dict):
             try:
-                error_code = _get_error_code(error.original_error.__class__)
+                error_code = get_error_code(error.original_error.__class__)
             except AttributeError:
                 error_code = GENERAL_ERROR
 
@@ -186,3 +445,9 @@ class GraphQLView(BaseGraphQLView):
                         )
 
         return formatted_error
+
+
+def get_query_validation_errors(query):
+    """Returns the errors the GraphQL endpoint would give when validating the query"""
+    _, errors = GraphQLView()._parse_and_validate(query)
+    return errors
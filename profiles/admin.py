@@ -61,7 +61,7 @@ class SensitiveDataAdminInline(admin.StackedInline):
     extra = 0
 
 
-class EmailFormSet(forms.models.BaseInlineFormSet):
+class PrimaryContactFormSet(forms.models.BaseInlineFormSet):
     def clean(self):
         count = reduce(
             lambda current, form: current + form.cleaned_data.get("primary"),
@@ -70,23 +70,39 @@ class EmailFormSet(forms.models.BaseInlineFormSet):
         )
         if count > 1:
             raise forms.ValidationError(
-                "Profile must have zero or one primary email(s)"
+                f"Profile must have zero or one primary {self.model._meta.verbose_name}(s)"  # noqa: E501
             )
 
+    def save_existing_objects(self, commit=True):
+        # The forms are saved in their order, so a contact listed above the previous
+        # primary one could become primary first and break the single primary
+        # constraint. The previous primary contact is demoted before that.
+        demoted_ids = [
+            form.instance.pk
+            for form in self.initial_forms
+            if form.initial.get("primary")
+            and (self._should_delete_form(form) or not form.cleaned_data["primary"])
+        ]
+        if commit and demoted_ids:
+            self.model.objects.filter(pk__in=demoted_ids).update(primary=False)
+        return super().save_existing_objects(commit)
+
 
 class EmailAdminInline(admin.StackedInline):
     model = Email
-    formset = EmailFormSet
+    formset = PrimaryContactFormSet
     extra = 0
 
 
 class PhoneAdminInline(admin.StackedInline):
     model = Phone
+    formset = PrimaryContactFormSet
     extra = 0
 
 
 class AddressAdminInline(admin.StackedInline):
     model = Address
+    formset = PrimaryContactFormSet
     extra = 0
 
 
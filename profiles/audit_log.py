@@ -10,6 +10,8 @@ from resilient_logger.sources.resilient_log_source import (
     StructuredResilientLogEntryData,
 )
 
+from open_city_profile.metrics import AUDIT_LOG_FLUSH_DURATION, AUDIT_LOG_FLUSH_SIZE
+
 User = get_user_model()
 
 _thread_locals = threading.local()
@@ -169,6 +171,7 @@ def _create_log_entries(current_user, service, client_id, ip_address, audit_logg
             entries.append(entry)
 
     ResilientLogSource.bulk_create_structured(entries)
+    AUDIT_LOG_FLUSH_SIZE.observe(len(entries))
 
 
 def _commit_audit_logs():
@@ -180,17 +183,22 @@ def _commit_audit_logs():
 
     del request._audit_loggables
 
-    current_user = _get_current_user()
-    service = _get_current_service()
-    client_id = _get_current_client_id()
-    ip_address = _get_original_client_ip()
-
-    profiles = [
-        log_data["profile"]
-        for log_data in audit_loggables.values()
-        if log_data["profile"].pk is not None
-    ]
-    for ids in User.objects.filter(profile__in=profiles).values("uuid", "profile__id"):
-        audit_loggables[ids["profile__id"]]["user_uuid"] = ids["uuid"]
-
-    _create_log_entries(current_user, service, client_id, ip_address, audit_loggables)
+    with AUDIT_LOG_FLUSH_DURATION.time():
+        current_user = _get_current_user()
+        service = _get_current_service()
+        client_id = _get_current_client_id()
+        ip_address = _get_original_client_ip()
+
+        profiles = [
+            log_data["profile"]
+            for log_data in audit_loggables.values()
+            if log_data["profile"].pk is not None
+        ]
+        for ids in User.objects.filter(profile__in=profiles).values(
+            "uuid", "profile__id"
+        ):
+            audit_loggables[ids["profile__id"]]["user_uuid"] = ids["uuid"]
+
+        _create_log_entries(
+            current_user, service, client_id, ip_address, audit_loggables
+        )
@@ -0,0 +1,342 @@
+"""
+Set-based creation and updating of user profiles for the `createOrUpdateUserProfiles`
+mutation.
+
+The inputs are handled like in the `createOrUpdateUserProfile` mutation, but the
+users, profiles, verified personal information and their related rows are read and
+written for all the inputs at once, with a number of queries which doesn't depend on
+the number of inputs.
+"""
+
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+
+from services.models import ServiceConnection
+
+from .enums import EmailType
+from .models import (
+    Email,
+    Profile,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+    VerifiedPersonalInformationPermanentForeignAddress,
+    VerifiedPersonalInformationTemporaryAddress,
+)
+
+User = get_user_model()
+
+ADDRESS_MODELS = (
+    VerifiedPersonalInformationPermanentAddress,
+    VerifiedPersonalInformationTemporaryAddress,
+    VerifiedPersonalInformationPermanentForeignAddress,
+)
+
+
+def _set_values(instance, values):
+    for field, value in values.items():
+        setattr(instance, field, value)
+
+
+def _bulk_update_changed(model, instances):
+    """
+    Updates the changed fields of the instances, with one query for every distinct
+    set of changed fields. Returns the updated instances.
+
+    The changes are known only of the instances loaded with `track_changes`, the
+    other instances get all their fields updated.
+    """
+    all_fields = [
+        field.name for field in model._meta.concrete_fields if not field.primary_key
+    ]
+    instances_by_fields = defaultdict(list)
+    for instance in instances:
+        changed_fields = instance.get_changed_fields()
+        if changed_fields is None:
+            changed_fields = all_fields
+        if not changed_fields:
+            continue
+
+        # bulk_update doesn't call pre_save, which e.g. converts nulls to empty
+        # strings
+        for field_name in changed_fields:
+            field = model._meta.get_field(field_name)
+            setattr(instance, field.attname, field.pre_save(instance, False))
+        instances_by_fields[tuple(changed_fields)].append(instance)
+
+    for fields, group in instances_by_fields.items():
+        model.objects.bulk_update(group, fields)
+
+    return [instance for group in instances_by_fields.values() for instance in group]
+
+
+def _get_related_or_none(instance, related_name):
+    try:
+        return getattr(instance, related_name)
+    except ObjectDoesNotExist:
+        return None
+
+
+def _upsert_users(user_ids):
+    users = {user.uuid: user for user in User.objects.filter(uuid__in=user_ids)}
+
+    new_users = []
+    for user_id in user_ids:
+        if user_id not in users:
+            user = User(uuid=user_id)
+            user.clean()
+            new_users.append(user)
+    User.objects.bulk_create(new_users)
+
+    users.update((user.uuid, user) for user in new_users)
+    return users
+
+
+def _upsert_profiles(users, profile_inputs, changes):
+    queryset = Profile.objects.track_changes().select_related(
+        *(
+            f"verified_personal_information__{model.RELATED_NAME}"
+            for model in ADDRESS_MODELS
+        )
+    )
+    profiles = {profile.user_id: profile for profile in queryset.filter(user__in=users)}
+
+    new_profiles = []
+    existing_profiles = []
+    for user, profile_input in zip(users, profile_inputs, strict=True):
+        profile = profiles.get(user.pk)
+        if profile is None:
+            profile = Profile(id=uuid.uuid4(), user=user, **profile_input)
+            profile.set_names_from_user()
+            profiles[user.pk] = profile
+            new_profiles.append(profile)
+        else:
+            profile.user = user
+            _set_values(profile, profile_input)
+            existing_profiles.append(profile)
+
+    Profile.objects.bulk_create(new_profiles)
+    updated_profiles = _bulk_update_changed(Profile, existing_profiles)
+
+    changes.extend(("CREATE", profile) for profile in new_profiles)
+    changes.extend(("UPDATE", profile) for profile in updated_profiles)
+    return [profiles[user.pk] for user in users], new_profiles
+
+
+def _upsert_verified_personal_information(
+    profiles, new_profiles, verified_personal_information_inputs, changes
+):
+    new_profile_ids = {profile.pk for profile in new_profiles}
+    new_vpis = []
+    existing_vpis = []
+    address_inputs_by_vpi = []
+    for profile, vpi_input in zip(
+        profiles, verified_personal_information_inputs, strict=True
+    ):
+        if not vpi_input:
+            continue
+
+        vpi_values = dict(vpi_input)
+        address_inputs = {
+            model: vpi_values.pop(model.RELATED_NAME, None) for model in ADDRESS_MODELS
+        }
+
+        vpi = None
+        if profile.pk not in new_profile_ids:
+            vpi = _get_related_or_none(profile, "verified_personal_information")
+
+        if vpi is None:
+            vpi = VerifiedPersonalInformation(profile=profile, **vpi_values)
+            new_vpis.append(vpi)
+        else:
+            _set_values(vpi, vpi_values)
+            existing_vpis.append(vpi)
+        address_inputs_by_vpi.append((vpi, address_inputs))
+
+    VerifiedPersonalInformation.objects.bulk_create(new_vpis)
+    updated_vpis = _bulk_update_changed(VerifiedPersonalInformation, existing_vpis)
+
+    changes.extend(("CREATE", vpi) for vpi in new_vpis)
+    changes.extend(("UPDATE", vpi) for vpi in updated_vpis)
+
+    new_vpi_ids = {vpi.pk for vpi in new_vpis}
+    for address_model in ADDRESS_MODELS:
+        new_addresses = []
+        existing_addresses = []
+        empty_address_ids = []
+        for vpi, address_inputs in address_inputs_by_vpi:
+            address_input = address_inputs[address_model]
+            if not address_input:
+                continue
+
+            address = None
+            if vpi.pk not in new_vpi_ids:
+                address = _get_related_or_none(vpi, address_model.RELATED_NAME)
+
+            if address is None:
+                address = address_model(verified_personal_information=vpi)
+                _set_values(address, address_input)
+                if not address.is_empty():
+                    new_addresses.append(address)
+            else:
+                _set_values(address, address_input)
+                if address.is_empty():
+                    empty_address_ids.append(address.pk)
+                else:
+                    existing_addresses.append(address)
+
+        address_model.objects.bulk_create(new_addresses)
+        updated_addresses = _bulk_update_changed(address_model, existing_addresses)
+        if empty_address_ids:
+            address_model.objects.filter(pk__in=empty_address_ids).delete()
+
+        changes.extend(("CREATE", address) for address in new_addresses)
+        changes.extend(("UPDATE", address) for address in updated_addresses)
+
+
+def _upsert_service_connections(profiles, services):
+    profiles_and_services = [
+        (profile, service)
+        for profile, service in zip(profiles, services, strict=True)
+        if service is not None
+    ]
+    if not profiles_and_services:
+        return
+
+    existing_connections = {
+        (connection.profile_id, connection.service_id): connection
+        for connection in ServiceConnection.objects.filter(
+            profile__in={profile for profile, service in profiles_and_services},
+            service__in={service for profile, service in profiles_and_services},
+        )
+    }
+
+    new_connections = []
+    disabled_connection_ids = []
+    for profile, service in profiles_and_services:
+        connection = existing_connections.get((profile.pk, service.pk))
+        if connection is None:
+            connection = ServiceConnection(profile=profile, service=service)
+            existing_connections[(profile.pk, service.pk)] = connection
+            new_connections.append(connection)
+        elif not connection.enabled:
+            disabled_connection_ids.append(connection.pk)
+
+    ServiceConnection.objects.bulk_create(new_connections)
+    if disabled_connection_ids:
+        ServiceConnection.objects.filter(pk__in=disabled_connection_ids).update(
+            enabled=True
+        )
+
+
+def _upsert_primary_emails(profiles, new_profiles, primary_email_inputs, changes):
+    profiles_and_inputs = [
+        (profile, email_input)
+        for profile, email_input in zip(profiles, primary_email_inputs, strict=True)
+        if email_input
+    ]
+    if not profiles_and_inputs:
+        return
+
+    new_profile_ids = {profile.pk for profile in new_profiles}
+    profiles_by_id = {profile.pk: profile for profile, _input in profiles_and_inputs}
+    emails_by_profile_id = defaultdict(list)
+    for email in Email.objects.filter(
+        profile__in=[
+            profile
+            for profile, email_input in profiles_and_inputs
+            if profile.pk not in new_profile_ids
+        ]
+    ):
+        email.profile = profiles_by_id[email.profile_id]
+        emails_by_profile_id[email.profile_id].append(email)
+
+    new_emails = []
+    emails_to_update = []
+    demoted_profile_ids = []
+    for profile, email_input in profiles_and_inputs:
+        email_address = email_input["email"]
+        verified = email_input.get("verified", False)
+
+        email = next(
+            (
+                email
+                for email in emails_by_profile_id[profile.pk]
+                if email.email == email_address
+            ),
+            None,
+        )
+        if email and email.primary:
+            if email.verified is not verified:
+                email.verified = verified
+                emails_to_update.append(email)
+            continue
+
+        if any(email.primary for email in emails_by_profile_id[profile.pk]):
+            demoted_profile_ids.append(profile.pk)
+
+        if email:
+            email.primary = True
+            email.verified = verified
+            emails_to_update.append(email)
+        else:
+            new_emails.append(
+                Email(
+                    profile=profile,
+                    email=email_address,
+                    email_type=EmailType.NONE,
+                    primary=True,
+                    verified=verified,
+                )
+            )
+
+    # Clear the flag from the previous primary emails first, so that the single
+    # primary email constraint holds.
+    if demoted_profile_ids:
+        Email.objects.filter(profile__in=demoted_profile_ids, primary=True).update(
+            primary=False
+        )
+    Email.objects.bulk_update(emails_to_update, ["primary", "verified"])
+    Email.objects.bulk_create(new_emails)
+
+    changes.extend(("UPDATE", email) for email in emails_to_update)
+    changes.extend(("CREATE", email) for email in new_emails)
+
+
+def upsert_user_profiles(inputs, services):
+    """
+    Creates or updates the users and profiles of `createOrUpdateUserProfile`
+    mutation inputs which all have a different user id. `services` are the services
+    to connect the profiles to, or None, in the order of the inputs.
+
+    The inputs aren't modified, and the primary email addresses must have been
+    validated beforehand. Returns the profiles in the order of the inputs, and the
+    `(action, instance)` pairs of the written rows for the audit log.
+    """
+    changes = []
+
+    users = _upsert_users([item["user_id"] for item in inputs])
+
+    profile_inputs = []
+    verified_personal_information_inputs = []
+    primary_email_inputs = []
+    for item in inputs:
+        profile_input = dict(item["profile"])
+        verified_personal_information_inputs.append(
+            profile_input.pop("verified_personal_information", None)
+        )
+        primary_email_inputs.append(profile_input.pop("primary_email", None))
+        profile_inputs.append(profile_input)
+
+    profiles, new_profiles = _upsert_profiles(
+        [users[item["user_id"]] for item in inputs], profile_inputs, changes
+    )
+    _upsert_verified_personal_information(
+        profiles, new_profiles, verified_personal_information_inputs, changes
+    )
+    _upsert_service_connections(profiles, services)
+    _upsert_primary_emails(profiles, new_profiles, primary_email_inputs, changes)
+
+    return profiles, changes
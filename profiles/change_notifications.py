@@ -0,0 +1,363 @@
+"""
+Notifying the connected services about profile changes through their webhooks.
+
+The changes are written to the `ProfileChangeNotification` outbox in the same
+transaction as the profile, and the `dispatch_profile_changes` management command
+posts them to the `webhook_url` of the services. The notifications of a service are
+delivered in the order they were written, and pending notifications of the same
+profile are coalesced into one. A service is dispatched by one dispatcher at a time,
+which holds an advisory lock of the service meanwhile.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import requests
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from graphene.utils.str_converters import to_camel_case
+
+from open_city_profile.metrics import PROFILE_CHANGE_WEBHOOK_REQUEST_DURATION
+from services.models import Service, ServiceConnection
+
+from .models import Profile, ProfileChangeNotification
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Profile-Signature"
+TIMESTAMP_HEADER = "X-Profile-Timestamp"
+
+# The changed part of a deleted profile
+PROFILE_DELETED = "deleted"
+# The changed part of a connection to a service being added, enabled or removed
+SERVICE_CONNECTIONS = "service_connections"
+
+# First key of the advisory locks of the services being dispatched, the second key
+# is the id of the service
+DISPATCH_LOCK_KEY = 1347571526
+
+# The changed part, i.e. the profile field, of the profile input fields
+CHANGED_PART_BY_INPUT_FIELD = {
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "nickname": "nickname",
+    "language": "language",
+    "contact_method": "contact_method",
+    "add_emails": "emails",
+    "update_emails": "emails",
+    "remove_emails": "emails",
+    "add_phones": "phones",
+    "update_phones": "phones",
+    "remove_phones": "phones",
+    "add_addresses": "addresses",
+    "update_addresses": "addresses",
+    "remove_addresses": "addresses",
+    "sensitivedata": "sensitivedata",
+    "primary_email": "emails",
+    "verified_personal_information": "verified_personal_information",
+}
+
+
+def get_changed_parts(profile_input):
+    """Returns the profile fields changed by a profile input"""
+    return sorted(
+        {
+            CHANGED_PART_BY_INPUT_FIELD[input_field]
+            for input_field in profile_input
+            if input_field in CHANGED_PART_BY_INPUT_FIELD
+        }
+    )
+
+
+def get_user_profile_changed_parts(user_profile_input):
+    """
+    Returns the profile fields changed by a `createOrUpdateUserProfile` mutation
+    input
+    """
+    changed_parts = set(get_changed_parts(user_profile_input["profile"]))
+    if user_profile_input.get("service_client_id"):
+        changed_parts.add(SERVICE_CONNECTIONS)
+    return sorted(changed_parts)
+
+
+def enqueue_profile_change(profile, changed_parts):
+    """
+    Adds a change notification of the profile for every service which has a
+    webhook and an enabled connection to the profile.
+    """
+    enqueue_profile_changes({profile.pk: changed_parts})
+
+
+def enqueue_profile_changes(changed_parts_by_profile_id):
+    """
+    Adds the change notifications of several profiles, with the same number of
+    queries regardless of the number of profiles.
+    """
+    changed_parts_by_profile_id = {
+        profile_id: list(changed_parts)
+        for profile_id, changed_parts in changed_parts_by_profile_id.items()
+        if changed_parts
+    }
+    if not changed_parts_by_profile_id:
+        return
+
+    connections = (
+        ServiceConnection.objects.filter(
+            profile_id__in=changed_parts_by_profile_id, enabled=True
+        )
+        .exclude(service__webhook_url="")
+        .order_by("pk")
+        .values_list("service_id", "profile_id")
+    )
+    ProfileChangeNotification.objects.bulk_create(
+        ProfileChangeNotification(
+            service_id=service_id,
+            profile_id=profile_id,
+            changed_parts=changed_parts_by_profile_id[profile_id],
+        )
+        for service_id, profile_id in connections
+    )
+
+
+def sign_payload(secret, timestamp, body):
+    """Returns the signature of a webhook request body sent at the timestamp"""
+    message = f"{timestamp}.".encode() + body
+    return "sha256=" + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+@dataclass
+class CoalescedChange:
+    """The pending notifications of a profile to be delivered as one"""
+
+    profile_id: object
+    notifications: list = field(default_factory=list)
+
+    def get_payload(self, service):
+        latest = self.notifications[-1]
+        changed_parts = sorted(
+            {
+                part
+                for notification in self.notifications
+                for part in notification.changed_parts
+            }
+        )
+        return {
+            "id": latest.pk,
+            "profileId": str(self.profile_id),
+            "deleted": PROFILE_DELETED in changed_parts,
+            "changedFields": [
+                to_camel_case(part)
+                for part in changed_parts
+                if part != PROFILE_DELETED
+                and Profile.is_field_allowed_for_service(part, service)
+            ],
+            "changedAt": latest.created_at.isoformat(),
+        }
+
+
+def _coalesce(notifications):
+    """
+    Groups the notifications by profile, in the order of the earliest notification
+    of each profile.
+    """
+    changes = {}
+    for notification in notifications:
+        change = changes.setdefault(
+            notification.profile_id, CoalescedChange(notification.profile_id)
+        )
+        change.notifications.append(notification)
+    return list(changes.values())
+
+
+def _post_change(session, service, change, timeout):
+    body = json.dumps(change.get_payload(service)).encode()
+    headers = {"Content-Type": "application/json"}
+    if service.webhook_secret:
+        timestamp = str(int(time.time()))
+        headers[TIMESTAMP_HEADER] = timestamp
+        headers[SIGNATURE_HEADER] = sign_payload(
+            service.webhook_secret, timestamp, body
+        )
+
+    with PROFILE_CHANGE_WEBHOOK_REQUEST_DURATION.labels(service=service.name).time():
+        response = session.post(
+            service.webhook_url, data=body, headers=headers, timeout=timeout
+        )
+    response.raise_for_status()
+
+
+def _deliver_to_service(service, changes, timeout):
+    """
+    Posts the changes to the webhook of the service one at a time. Stops at the first
+    failure, so that the later changes aren't delivered before it. Returns the
+    delivered changes, and the failed change and its error, if any.
+    """
+    delivered = []
+    with requests.Session() as session:
+        for change in changes:
+            try:
+                _post_change(session, service, change, timeout)
+            except requests.RequestException as e:
+                return delivered, (change, e)
+            delivered.append(change)
+    return delivered, None
+
+
+def _get_due_notifications(service, now, batch_size):
+    """
+    Returns the oldest pending notifications of the service, up to the first one
+    waiting for a retry.
+    """
+    due = []
+    for notification in ProfileChangeNotification.objects.filter(
+        service=service, next_attempt_at__isnull=False
+    )[:batch_size]:
+        if notification.next_attempt_at > now:
+            break
+        due.append(notification)
+    return due
+
+
+def get_retry_delay(attempts):
+    """Exponential backoff from ten seconds up to an hour"""
+    return timedelta(seconds=min(10 * 2 ** (attempts - 1), 3600))
+
+
+@dataclass
+class DispatchResult:
+    delivered: int = 0
+    failed: int = 0
+
+
+def _try_lock_service(service):
+    """
+    Takes the advisory lock of the service for the session, unless another
+    dispatcher holds it. Returns whether the lock was taken.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_try_advisory_lock(%s, %s)", [DISPATCH_LOCK_KEY, service.pk]
+        )
+        return cursor.fetchone()[0]
+
+
+def _unlock_service(service):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_unlock(%s, %s)", [DISPATCH_LOCK_KEY, service.pk]
+        )
+
+
+def dispatch_profile_changes(
+    concurrency=4, batch_size=100, max_attempts=10, timeout=10
+):
+    """
+    Delivers one batch of the due change notifications of every service. The
+    services are handled in parallel in up to `concurrency` threads, the
+    notifications of one service one at a time. The services being handled by
+    another dispatcher are skipped.
+
+    Failed notifications are retried with a growing delay, and given up after
+    `max_attempts` attempts.
+    """
+    now = timezone.now()
+    services = (
+        Service.objects.exclude(webhook_url="")
+        .filter(
+            Exists(
+                ProfileChangeNotification.objects.filter(
+                    service=OuterRef("pk"), next_attempt_at__lte=now
+                )
+            )
+        )
+        .prefetch_related("allowed_data_fields")
+    )
+    locked_services = []
+    try:
+        changes_by_service = {}
+        for service in services:
+            if not _try_lock_service(service):
+                continue
+            locked_services.append(service)
+
+            changes = _coalesce(_get_due_notifications(service, now, batch_size))
+            if changes:
+                changes_by_service[service] = changes
+
+        return _deliver(changes_by_service, concurrency, max_attempts, timeout)
+    finally:
+        for service in locked_services:
+            _unlock_service(service)
+
+
+def _deliver(changes_by_service, concurrency, max_attempts, timeout):
+    result = DispatchResult()
+    if not changes_by_service:
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            service: executor.submit(_deliver_to_service, service, changes, timeout)
+            for service, changes in changes_by_service.items()
+        }
+
+    delivered_ids = []
+    for service, future in futures.items():
+        delivered, failure = future.result()
+        for change in delivered:
+            delivered_ids.extend(
+                notification.pk for notification in change.notifications
+            )
+        result.delivered += len(delivered)
+
+        if failure:
+            change, error = failure
+            _record_failure(service, change, error, max_attempts)
+            result.failed += 1
+
+    ProfileChangeNotification.objects.filter(pk__in=delivered_ids).delete()
+    return result
+
+
+def delete_given_up_notifications(created_before):
+    """
+    Deletes the notifications which have been given up and were written before
+    `created_before`. Returns the number of deleted notifications.
+    """
+    deleted, _ = ProfileChangeNotification.objects.filter(
+        next_attempt_at__isnull=True, created_at__lt=created_before
+    ).delete()
+    return deleted
+
+
+def _record_failure(service, change, error, max_attempts):
+    failed_notifications = change.notifications
+    attempts = max(notification.attempts for notification in failed_notifications) + 1
+    if attempts >= max_attempts:
+        next_attempt_at = None
+        logger.error(
+            "Giving up the change notification of profile %s to service %s after %s attempts: %s",  # noqa: E501
+            change.profile_id,
+            service.name,
+            attempts,
+            error,
+        )
+    else:
+        next_attempt_at = timezone.now() + get_retry_delay(attempts)
+        logger.warning(
+            "Change notification of profile %s to service %s failed: %s",
+            change.profile_id,
+            service.name,
+            error,
+        )
+
+    ProfileChangeNotification.objects.filter(
+        pk__in=[notification.pk for notification in failed_notifications]
+    ).update(attempts=attempts, next_attempt_at=next_attempt_at, last_error=str(error))
@@ -13,10 +13,13 @@ from open_city_profile.exceptions import (
     ConnectedServiceDeletionNotAllowedError,
     MissingGDPRApiTokenError,
 )
+from open_city_profile.metrics import GDPR_API_REQUEST_DURATION
 from open_city_profile.oidc import KeycloakTokenExchange
 from services.models import Service
 from utils.auth import BearerAuth
 
+from .change_notifications import SERVICE_CONNECTIONS, enqueue_profile_change
+
 logger = logging.getLogger(__name__)
 
 
@@ -91,7 +94,10 @@ def download_connected_service_data(profile, authorization_code):
         try:
             url = service_connection.get_gdpr_url()
             logger.debug("GDPR URL: %s", url)
-            response = requests.get(url, auth=BearerAuth(api_token), timeout=5)
+            with GDPR_API_REQUEST_DURATION.labels(
+                service=service.name, method="GET"
+            ).time():
+                response = requests.get(url, auth=BearerAuth(api_token), timeout=5)
             logger.debug(
                 "GDPR query response for profile %s to service %s status code: %s, headers: %s, body: %s",  # noqa: E501
                 profile.id,
@@ -215,9 +221,12 @@ def _delete_service_data(
         data["dry_run"] = "true"
 
     try:
-        response = requests.delete(
-            url, auth=BearerAuth(api_token), timeout=5, params=data
-        )
+        with GDPR_API_REQUEST_DURATION.labels(
+            service=service.name, method="DELETE"
+        ).time():
+            response = requests.delete(
+                url, auth=BearerAuth(api_token), timeout=5, params=data
+            )
         logger.debug(
             "GDPR delete (dry run: %s) response for profile %s to service %s status code: %s, headers: %s, body: %s",  # noqa: E501
             dry_run,
@@ -317,6 +326,7 @@ def _delete_service_connection_and_service_data(
         result = _delete_service_data(service_connection, api_token, dry_run=dry_run)
         if result.success and not dry_run:
             service_connection.delete()
+            enqueue_profile_change(service_connection.profile, [SERVICE_CONNECTIONS])
 
         results.append(result)
 
@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from profiles.change_notifications import (
+    delete_given_up_notifications,
+    dispatch_profile_changes,
+)
+
+# Seconds between deleting the old notifications given up
+CLEANUP_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Post the pending profile change notifications to the webhooks of the "
+        "services. Runs until stopped unless --once is given. Several dispatchers "
+        "may be run, each service is handled by one of them at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when there are no more notifications to deliver.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before checking for new notifications when there "
+            "are none. Default is 5.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="How many services are posted to in parallel. Default is 4.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="How many notifications of a service are read at a time. "
+            "Default is 100.",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=10,
+            help="How many times the delivery of a notification is attempted before "
+            "giving up. Default is 10.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=10,
+            help="Timeout of the webhook requests in seconds. Default is 10.",
+        )
+        parser.add_argument(
+            "--keep-given-up-days",
+            type=int,
+            default=30,
+            help="Days the notifications given up are kept for inspection before "
+            "they're deleted. Default is 30.",
+        )
+
+    def handle(self, *args, **options):
+        cleaned_at = None
+        while True:
+            if cleaned_at is None or time.monotonic() - cleaned_at > CLEANUP_INTERVAL:
+                self.delete_given_up(options["keep_given_up_days"])
+                cleaned_at = time.monotonic()
+
+            result = dispatch_profile_changes(
+                concurrency=options["concurrency"],
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+                timeout=options["timeout"],
+            )
+            if result.delivered or result.failed:
+                self.stdout.write(
+                    f"Delivered {result.delivered} and failed {result.failed} "
+                    "profile change notifications"
+                )
+            if result.delivered:
+                continue
+
+            # Nothing to deliver, or the next attempts are waiting for a retry
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
+
+    def delete_given_up(self, keep_days):
+        deleted = delete_given_up_notifications(
+            timezone.now() - timedelta(days=keep_days)
+        )
+        if deleted:
+            self.stdout.write(
+                f"Deleted {deleted} profile change notifications given up"
+            )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from profiles.models import Address, Email, Phone
+from profiles.utils import demote_extra_primary_contacts, get_extra_primary_contacts
+
+
+class Command(BaseCommand):
+    help = (
+        "Clear the primary flag from all but the first primary email, phone and "
+        "address of each profile. A profile may only have one primary contact of "
+        "each type."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show what would be done without making actual changes.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model in (Email, Phone, Address):
+                name = model._meta.verbose_name_plural
+                if options["dry_run"]:
+                    count = get_extra_primary_contacts(model).count()
+                    self.stdout.write(f"Would clear the primary flag of {count} {name}")
+                else:
+                    count = demote_extra_primary_contacts(model)
+                    self.stdout.write(f"Cleared the primary flag of {count} {name}")
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.17 on 2026-10-19 01:52
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+from encrypted_fields.fields import SEARCH_HASH_PREFIX
+
+import profiles.models
+import utils.fields
+
+
+def _empty_value_hash():
+    value = "" + settings.SALT_NATIONAL_IDENTIFICATION_NUMBER
+    return SEARCH_HASH_PREFIX + hashlib.sha256(value.encode()).hexdigest()
+
+
+def store_empty_values_as_null(apps, schema_editor):
+    VerifiedPersonalInformation = apps.get_model(
+        "profiles", "VerifiedPersonalInformation"
+    )
+    VerifiedPersonalInformation.objects.filter(
+        national_identification_number=_empty_value_hash()
+    ).update(national_identification_number=None)
+
+
+def check_no_duplicate_values(apps, schema_editor):
+    """
+    Refuses to add the unique constraint while several profiles have the same
+    national identification number. The duplicates need to be resolved by hand, as
+    it's not known which of the profiles is the right one for the person.
+    """
+    VerifiedPersonalInformation = apps.get_model(
+        "profiles", "VerifiedPersonalInformation"
+    )
+    duplicates = (
+        VerifiedPersonalInformation.objects.filter(
+            national_identification_number__isnull=False
+        )
+        .values("national_identification_number")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("national_identification_number", flat=True)
+    )
+    profile_ids = list(
+        VerifiedPersonalInformation.objects.filter(
+            national_identification_number__in=duplicates
+        )
+        .order_by("national_identification_number", "profile_id")
+        .values_list("profile_id", flat=True)
+    )
+    if profile_ids:
+        raise RuntimeError(
+            f"{len(profile_ids)} profiles share a national identification number "
+            "with another profile, resolve the duplicates before migrating. "
+            f"Profile ids: {', '.join(str(profile_id) for profile_id in profile_ids)}"
+        )
+
+
+def store_empty_values_as_hash(apps, schema_editor):
+    VerifiedPersonalInformation = apps.get_model(
+        "profiles", "VerifiedPersonalInformation"
+    )
+    VerifiedPersonalInformation.objects.filter(
+        national_identification_number__isnull=True
+    ).update(national_identification_number=_empty_value_hash())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0059_sensitivedata_ssn_lazy_decryption__noop"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            store_empty_values_as_null, reverse_code=store_empty_values_as_hash
+        ),
+        migrations.RunPython(
+            check_no_duplicate_values, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name="verifiedpersonalinformation",
+            name="national_identification_number",
+            field=utils.fields.NullToEmptyEncryptedSearchField(
+                blank=True,
+                db_index=True,
+                encrypted_field_name="_national_identification_number_data",
+                hash_key=profiles.models.get_national_identification_number_hash_key,
+                help_text="Finnish national identification number.",
+                max_length=66,
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
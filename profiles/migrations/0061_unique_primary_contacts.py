@@ -0,0 +1,56 @@
+# Generated by Django 5.2.17 on 2026-10-19 03:43
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def demote_extra_primaries(apps, schema_editor):
+    """Clears the primary flag of all but the first primary contact of each profile"""
+    for model_name in ("Email", "Phone", "Address"):
+        model = apps.get_model("profiles", model_name)
+        first_primary_ids = (
+            model.objects.filter(primary=True)
+            .order_by()
+            .values("profile")
+            .annotate(first_id=Min("id"))
+            .values("first_id")
+        )
+        model.objects.filter(primary=True).exclude(pk__in=first_primary_ids).update(
+            primary=False
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0060_unique_national_identification_number"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            demote_extra_primaries, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="address",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("primary", True)),
+                fields=("profile",),
+                name="profiles_address_unique_primary",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="email",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("primary", True)),
+                fields=("profile",),
+                name="profiles_email_unique_primary",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="phone",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("primary", True)),
+                fields=("profile",),
+                name="profiles_phone_unique_primary",
+            ),
+        ),
+    ]
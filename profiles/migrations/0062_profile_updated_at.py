@@ -0,0 +1,136 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+# Tables whose rows refer to a profile with a profile_id column
+PROFILE_CHILD_TABLES = (
+    "profiles_email",
+    "profiles_phone",
+    "profiles_address",
+    "profiles_sensitivedata",
+    "profiles_verifiedpersonalinformation",
+    "services_serviceconnection",
+)
+
+# Tables whose rows refer to a profile through the verified personal information
+VERIFIED_PERSONAL_INFORMATION_CHILD_TABLES = (
+    "profiles_verifiedpersonalinformationpermanentaddress",
+    "profiles_verifiedpersonalinformationtemporaryaddress",
+    "profiles_verifiedpersonalinformationpermanentforeignaddress",
+)
+
+# The time of the change is always the start time of the transaction. The profiles
+# are touched once per statement, and only once per transaction, so that bulk writes
+# don't update the same profile row over and over again.
+CREATE_FUNCTIONS_SQL = """
+CREATE FUNCTION profiles_profile_set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION profiles_touch_profiles() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE profiles_profile SET updated_at = now()
+        WHERE id IN (SELECT profile_id FROM new_rows) AND updated_at <> now();
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE profiles_profile SET updated_at = now()
+        WHERE id IN (SELECT profile_id FROM old_rows) AND updated_at <> now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION profiles_touch_profiles_of_vpi() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE profiles_profile SET updated_at = now()
+        WHERE id IN (
+            SELECT vpi.profile_id
+            FROM profiles_verifiedpersonalinformation vpi
+            JOIN new_rows ON new_rows.verified_personal_information_id = vpi.id
+        ) AND updated_at <> now();
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE profiles_profile SET updated_at = now()
+        WHERE id IN (
+            SELECT vpi.profile_id
+            FROM profiles_verifiedpersonalinformation vpi
+            JOIN old_rows ON old_rows.verified_personal_information_id = vpi.id
+        ) AND updated_at <> now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER profiles_profile_set_updated_at
+BEFORE INSERT OR UPDATE ON profiles_profile
+FOR EACH ROW EXECUTE FUNCTION profiles_profile_set_updated_at();
+"""
+
+DROP_FUNCTIONS_SQL = """
+DROP TRIGGER profiles_profile_set_updated_at ON profiles_profile;
+DROP FUNCTION profiles_profile_set_updated_at();
+DROP FUNCTION profiles_touch_profiles();
+DROP FUNCTION profiles_touch_profiles_of_vpi();
+"""
+
+# Transition tables are only available to triggers of a single event. Trigger names
+# are local to their tables.
+CREATE_TRIGGERS_SQL = """
+CREATE TRIGGER touch_profile_insert
+AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+
+CREATE TRIGGER touch_profile_update
+AFTER UPDATE ON {table} REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+
+CREATE TRIGGER touch_profile_delete
+AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER touch_profile_insert ON {table};
+DROP TRIGGER touch_profile_update ON {table};
+DROP TRIGGER touch_profile_delete ON {table};
+"""
+
+
+def triggers_sql(template):
+    return [
+        template.format(table=table, function=function)
+        for tables, function in (
+            (PROFILE_CHILD_TABLES, "profiles_touch_profiles"),
+            (
+                VERIFIED_PERSONAL_INFORMATION_CHILD_TABLES,
+                "profiles_touch_profiles_of_vpi",
+            ),
+        )
+        for table in tables
+    ]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0061_unique_primary_contacts"),
+        ("services", "0028_remove_service_idp"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.RunSQL(CREATE_FUNCTIONS_SQL, reverse_sql=DROP_FUNCTIONS_SQL),
+        migrations.RunSQL(
+            triggers_sql(CREATE_TRIGGERS_SQL),
+            reverse_sql=triggers_sql(DROP_TRIGGERS_SQL),
+        ),
+    ]
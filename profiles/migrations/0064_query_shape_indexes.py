@@ -0,0 +1,75 @@
+# Generated by Django 5.2.17 on 2026-10-19 04:49
+
+import uuid
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The indexes are created and removed concurrently, so that the tables stay
+    # writable meanwhile. That can't be done in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("profiles", "0063_profilechangenotification"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="claimtoken",
+                    name="token",
+                    field=models.CharField(
+                        blank=True,
+                        db_index=True,
+                        default=uuid.uuid4,
+                        editable=False,
+                        max_length=36,
+                    ),
+                ),
+            ],
+            database_operations=[
+                # The indexes Django would create for db_index=True
+                migrations.RunSQL(
+                    sql='CREATE INDEX CONCURRENTLY "profiles_claimtoken_token_2ceff79a" ON "profiles_claimtoken" ("token")',  # noqa: E501
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "profiles_claimtoken_token_2ceff79a"',  # noqa: E501
+                ),
+                migrations.RunSQL(
+                    sql='CREATE INDEX CONCURRENTLY "profiles_claimtoken_token_2ceff79a_like" ON "profiles_claimtoken" ("token" varchar_pattern_ops)',  # noqa: E501
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "profiles_claimtoken_token_2ceff79a_like"',  # noqa: E501
+                ),
+            ],
+        ),
+        # The new index is added before the profile index it replaces is removed
+        AddIndexConcurrently(
+            model_name="temporaryreadaccesstoken",
+            index=models.Index(
+                fields=["profile", "created_at"], name="profiles_read_token_idx"
+            ),
+        ),
+        # Only the index of the foreign key is removed, AlterField would recreate
+        # the foreign key constraint too
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="temporaryreadaccesstoken",
+                    name="profile",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_access_tokens",
+                        to="profiles.profile",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql='DROP INDEX CONCURRENTLY IF EXISTS "profiles_temporaryreadaccesstoken_profile_id_b0e3c94e"',  # noqa: E501
+                    reverse_sql='CREATE INDEX CONCURRENTLY "profiles_temporaryreadaccesstoken_profile_id_b0e3c94e" ON "profiles_temporaryreadaccesstoken" ("profile_id")',  # noqa: E501
+                ),
+            ],
+        ),
+    ]
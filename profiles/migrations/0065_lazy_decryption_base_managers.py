@@ -0,0 +1,43 @@
+# Generated by Django 5.2.17 on 2026-10-19 05:36
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # The migration was first added with a "__noop" suffix in its name
+    replaces = [("profiles", "0065_lazy_decryption_base_managers__noop")]
+
+    dependencies = [
+        ("profiles", "0064_query_shape_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="sensitivedata",
+            options={"base_manager_name": "objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="verifiedpersonalinformation",
+            options={
+                "base_manager_name": "objects",
+                "permissions": [
+                    (
+                        "manage_verified_personal_information",
+                        "Can manage verified personal information",
+                    )
+                ],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="verifiedpersonalinformationpermanentaddress",
+            options={"base_manager_name": "objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="verifiedpersonalinformationpermanentforeignaddress",
+            options={"base_manager_name": "objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="verifiedpersonalinformationtemporaryaddress",
+            options={"base_manager_name": "objects"},
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The index is created concurrently, so that the profiles stay writable
+    # meanwhile. That can't be done in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("profiles", "0065_lazy_decryption_base_managers"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="profile",
+            index=models.Index(
+                fields=["updated_at", "id"], name="profiles_profile_updated_idx"
+            ),
+        ),
+    ]
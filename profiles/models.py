@@ -2,15 +2,15 @@ import uuid
 from datetime import timedelta
 
 from django.conf import settings
-from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.utils import timezone
-from encrypted_fields import fields
 from enumfields import EnumField
 
 from services.models import Service, ServiceConnection
 from users.models import User
 from utils.fields import (
+    EncryptedCharField,
+    LazyDecryptionQuerySet,
     NullToEmptyCharField,
     NullToEmptyEncryptedCharField,
     NullToEmptyEncryptedSearchField,
@@ -60,9 +60,12 @@ class AllowedDataFieldsMixin:
         if not service:
             return False
 
-        allowed_data_fields = service.allowed_data_fields.values_list(
-            "field_name", flat=True
-        )
+        # Iterate over all() instead of using values_list(), so that prefetched
+        # allowed data fields get used
+        allowed_data_fields = [
+            allowed_data_field.field_name
+            for allowed_data_field in service.allowed_data_fields.all()
+        ]
         return any(
             field_name in cls.allowed_data_fields_map.get(allowed_data_field, [])
             for allowed_data_field in allowed_data_fields
@@ -85,9 +88,17 @@ class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
         choices=settings.CONTACT_METHODS,
         default=settings.CONTACT_METHODS[0][0],
     )
+    # Set by database triggers whenever the profile or any of its contacts, sensitive
+    # data, verified personal information or service connections change.
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["updated_at", "id"], name="profiles_profile_updated_idx"
+            ),
+        ]
 
     serialize_fields = (
         {"name": "first_name"},
@@ -150,14 +161,16 @@ class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
         return self.service_connections.filter(service__is_profile_service=False)
 
     def save(self, *args, **kwargs):
-        if (
-            self._state.adding  # uuid pk forces us to do this, since self.pk is True
-            and not (self.first_name and self.last_name)
-            and self.user
-        ):
+        # uuid pk forces us to do this, since self.pk is True
+        if self._state.adding:
+            self.set_names_from_user()
+        super().save(*args, **kwargs)
+
+    def set_names_from_user(self):
+        """Takes the names from the user, unless the profile has both names"""
+        if not (self.first_name and self.last_name) and self.user:
             self.first_name = self.user.first_name or self.first_name
             self.last_name = self.user.last_name or self.last_name
-        super().save(*args, **kwargs)
 
     def __str__(self):
         if self.user:
@@ -167,6 +180,34 @@ class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
         else:
             return str(self.id)
 
+    @classmethod
+    def get_by_national_identification_numbers(cls, nins, queryset=None):
+        """
+        Returns a dict from national identification number to the profile which
+        has that number in its verified personal information. Numbers not found are
+        left out. All the numbers are looked up with a single query.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+
+        nin_field = VerifiedPersonalInformation._meta.get_field(
+            "national_identification_number"
+        )
+        nins_by_hash = nin_field.get_prep_values(nin for nin in nins if nin)
+        if not nins_by_hash:
+            return {}
+
+        profiles = queryset.filter(
+            verified_personal_information__national_identification_number__in=list(
+                nins_by_hash
+            )
+        ).annotate(
+            nin_hash=models.F(
+                "verified_personal_information__national_identification_number"
+            )
+        )
+        return {nins_by_hash[profile.nin_hash]: profile for profile in profiles}
+
     @classmethod
     @transaction.atomic
     def import_customer_data(cls, data, service):
@@ -241,6 +282,32 @@ def get_national_identification_number_hash_key():
     return settings.SALT_NATIONAL_IDENTIFICATION_NUMBER
 
 
+# Name which Django generated for the unique constraint of the national
+# identification number in migration 0060
+NATIONAL_IDENTIFICATION_NUMBER_UNIQUE_CONSTRAINT = (
+    "profiles_verifiedpersona_national_identification__818ce5bf_uniq"
+)
+
+
+def is_national_identification_number_conflict(error):
+    """
+    Tells whether the IntegrityError was caused by a national identification number
+    which is already used by another profile.
+    """
+    diag = getattr(error.__cause__, "diag", None)
+    return (
+        getattr(diag, "constraint_name", None)
+        == NATIONAL_IDENTIFICATION_NUMBER_UNIQUE_CONSTRAINT
+    )
+
+
+# Manager of the models with encrypted fields. It's also their base manager, so that
+# the related instances get their fields decrypted lazily too.
+LazyDecryptionManager = SerializableMixin.SerializableManager.from_queryset(
+    LazyDecryptionQuerySet
+)
+
+
 class VerifiedPersonalInformation(SerializableMixin, AllowedDataFieldsMixin):
     profile = models.OneToOneField(
         Profile, on_delete=models.CASCADE, related_name="verified_personal_information"
@@ -272,6 +339,7 @@ class VerifiedPersonalInformation(SerializableMixin, AllowedDataFieldsMixin):
         hash_key=get_national_identification_number_hash_key,
         encrypted_field_name="_national_identification_number_data",
         blank=True,
+        unique=True,
         help_text="Finnish national identification number.",
     )
     municipality_of_residence = NullToEmptyEncryptedCharField(
@@ -312,7 +380,10 @@ class VerifiedPersonalInformation(SerializableMixin, AllowedDataFieldsMixin):
         ),
     }
 
+    objects = LazyDecryptionManager()
+
     class Meta:
+        base_manager_name = "objects"
         permissions = [
             (
                 "manage_verified_personal_information",
@@ -338,8 +409,11 @@ class EncryptedAddress(SerializableMixin):
         {"name": "post_office"},
     )
 
+    objects = LazyDecryptionManager()
+
     class Meta:
         abstract = True
+        base_manager_name = "objects"
 
     def is_empty(self):
         return not (self.street_address or self.postal_code or self.post_office)
@@ -410,6 +484,11 @@ class VerifiedPersonalInformationPermanentForeignAddress(SerializableMixin):
     )
     audit_log = True
 
+    objects = LazyDecryptionManager()
+
+    class Meta:
+        base_manager_name = "objects"
+
     def is_empty(self):
         return not (self.street_address or self.additional_address or self.country_code)
 
@@ -419,12 +498,17 @@ class VerifiedPersonalInformationPermanentForeignAddress(SerializableMixin):
 
 class SensitiveData(SerializableMixin):
     profile = models.OneToOneField(Profile, on_delete=models.CASCADE)
-    ssn = fields.EncryptedCharField(
+    ssn = EncryptedCharField(
         max_length=11, validators=[validate_finnish_national_identification_number]
     )
     serialize_fields = ({"name": "ssn"},)
     audit_log = True
 
+    objects = LazyDecryptionManager()
+
+    class Meta:
+        base_manager_name = "objects"
+
     def resolve_profile(self):
         return self.profile if self.pk else None
 
@@ -435,6 +519,13 @@ class Contact(SerializableMixin):
 
     class Meta:
         abstract = True
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile"],
+                condition=models.Q(primary=True),
+                name="%(app_label)s_%(class)s_unique_primary",
+            )
+        ]
         ordering = ["-primary", "id"]
 
 
@@ -469,22 +560,9 @@ class Email(Contact):
         {"name": "email"},
     )
 
-    def clean(self):
-        super().clean()
-
-        if not self.primary:
-            return
-
-        existing_primary_emails = Email.objects.filter(
-            profile=self.profile, primary=True
-        )
-        if self.pk:
-            existing_primary_emails = existing_primary_emails.exclude(pk=self.pk)
-        if existing_primary_emails.exists():
-            raise ValidationError("Primary email already exists")
-
     def save(self, *args, **kwargs):
-        self.full_clean()
+        # The single primary email is enforced by the database constraint
+        self.full_clean(validate_constraints=False)
         return super().save(*args, **kwargs)
 
 
@@ -516,7 +594,7 @@ class ClaimToken(models.Model):
         Profile, related_name="claim_tokens", on_delete=models.CASCADE
     )
     token = models.CharField(
-        max_length=36, blank=True, default=uuid.uuid4, editable=False
+        max_length=36, blank=True, default=uuid.uuid4, editable=False, db_index=True
     )
     expires_at = models.DateTimeField(null=True, blank=True)
 
@@ -528,8 +606,12 @@ def _default_temporary_read_access_token_validity_duration():
 
 
 class TemporaryReadAccessToken(models.Model):
+    # Indexed by the (profile, created_at) index
     profile = models.ForeignKey(
-        Profile, on_delete=models.CASCADE, related_name="read_access_tokens"
+        Profile,
+        on_delete=models.CASCADE,
+        related_name="read_access_tokens",
+        db_index=False,
     )
     token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     created_at = models.DateTimeField(default=timezone.now, blank=False)
@@ -537,8 +619,47 @@ class TemporaryReadAccessToken(models.Model):
         default=_default_temporary_read_access_token_validity_duration, blank=False
     )
 
+    class Meta:
+        indexes = [
+            # For finding the valid tokens of a profile
+            models.Index(
+                fields=["profile", "created_at"], name="profiles_read_token_idx"
+            ),
+        ]
+
     def expires_at(self):
         return self.created_at + self.validity_duration
 
     def __str__(self):
         return f"{self.token} ({self.expires_at()})"
+
+
+class ProfileChangeNotification(models.Model):
+    """
+    Outbox of the profile changes to be posted to the webhooks of the connected
+    services. The rows are written in the same transaction as the changes and
+    removed once delivered.
+    """
+
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    # Not a foreign key, so that the notification outlives the profile
+    profile_id = models.UUIDField()
+    changed_parts = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    # None when the delivery has been given up
+    next_attempt_at = models.DateTimeField(null=True, default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["service", "id"],
+                condition=models.Q(next_attempt_at__isnull=False),
+                name="profiles_change_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.profile_id} - {self.service} ({self.created_at})"
@@ -1,14 +1,20 @@
+import copy
 import logging
+import uuid
 from collections.abc import Iterable
+from datetime import datetime, timedelta
 from itertools import chain
 
 import django.dispatch
 import graphene
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.exceptions import PermissionDenied
-from django.db import transaction
-from django.db.models import F, OuterRef, Q, Subquery
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, DataError, IntegrityError, router, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.db.models.deletion import Collector
+from django.db.models.functions import Now
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_lazy, override
@@ -23,12 +29,15 @@ from graphene import relay
 from graphene.utils.str_converters import to_snake_case
 from graphene_django import DjangoConnectionField
 from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.settings import graphene_settings
 from graphene_django.types import DjangoObjectType
 from graphene_federation import key
 from graphene_validator.decorators import validated
 from graphene_validator.errors import ValidationError as GrapheneValidationError
+from graphene_validator.errors import ValidationGraphQLError
 from graphene_validator.validation import validate
 from graphql_relay import from_global_id
+from graphql_relay.utils import base64, unbase64
 
 from open_city_profile.decorators import (
     login_and_service_required,
@@ -39,20 +48,34 @@ from open_city_profile.decorators import (
 from open_city_profile.exceptions import (
     ConnectedServiceDeletionFailedError,
     ConnectedServiceDeletionNotAllowedError,
+    DataConflictError,
     InsufficientLoaError,
     InvalidEmailFormatError,
     ProfileAlreadyExistsForUserError,
     ProfileDoesNotExistError,
+    ProfileGraphQLError,
     ProfileMustHavePrimaryEmailError,
     ServiceConnectionDoesNotExistError,
     ServiceDoesNotExistError,
     TokenExpiredError,
 )
 from open_city_profile.graphene import UUIDMultipleChoiceFilter
+from open_city_profile.permissions import requester_has_perm
+from open_city_profile.views import get_error_code
 from services.models import Service, ServiceConnection
 from services.schema import AllowedServiceType, ServiceConnectionType, ServiceNode
+from services.utils import get_service_by_client_id
 from utils.validation import model_field_validation
 
+from .audit_log import log
+from .bulk_upsert import upsert_user_profiles
+from .change_notifications import (
+    SERVICE_CONNECTIONS,
+    enqueue_profile_change,
+    enqueue_profile_changes,
+    get_changed_parts,
+    get_user_profile_changed_parts,
+)
 from .connected_services import (
     delete_connected_service_data,
     download_connected_service_data,
@@ -75,6 +98,7 @@ from .models import (
     VerifiedPersonalInformationPermanentAddress,
     VerifiedPersonalInformationPermanentForeignAddress,
     VerifiedPersonalInformationTemporaryAddress,
+    is_national_identification_number_conflict,
 )
 from .utils import (
     enum_values,
@@ -86,6 +110,10 @@ logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+NATIONAL_IDENTIFICATION_NUMBER_CONFLICT_MESSAGE = (
+    "The national identification number is already used by another profile."
+)
+
 PERMISSION_DENIED_MESSAGE = gettext_lazy(
     "You do not have permission to perform this action."
 )
@@ -109,7 +137,8 @@ LoginMethodTypeEnum = graphene.Enum.from_enum(
     LoginMethodType, description=lambda e: e.label if e else ""
 )
 
-"""Provides the updated Profile instance as a keyword argument called `instance`."""
+"""Provides the updated Profile instance as a keyword argument called `instance`, and
+the names of the changed profile fields as `changed_parts`."""
 profile_updated = django.dispatch.Signal()
 
 
@@ -120,53 +149,146 @@ def get_claimable_profile(token=None) -> Profile:
     return Profile.objects.filter(user=None).get(claim_tokens__id=claim_token.id)
 
 
-def _safely_get_item_by_global_id(node, id, profile):
-    model = node._meta.model
+def is_connected_to_service(service):
+    """
+    Filter for the profiles connected to the service. An EXISTS subquery instead of a
+    join never multiplies the profile rows.
+    """
+    return Exists(
+        ServiceConnection.objects.filter(profile=OuterRef("pk"), service=service)
+    )
 
-    try:
-        id_type, id_id = from_global_id(id)
-        if id_type != node._meta.name:
-            raise Exception()
-        id_id = int(id_id)
-    except Exception:
-        raise model.DoesNotExist(f"{model._meta.object_name} with id {id} not found")
 
-    item = model.objects.get(profile=profile, pk=id_id)
+def _decode_global_ids(node, ids):
+    """Returns the primary keys of the global ids of the node type by global id"""
+    model = node._meta.model
+    pks = {}
 
-    return item
+    for id in ids:
+        try:
+            id_type, id_id = from_global_id(id)
+            if id_type != node._meta.name:
+                raise Exception()
+            pks[id] = int(id_id)
+        except Exception:
+            raise model.DoesNotExist(
+                f"{model._meta.object_name} with id {id} not found"
+            )
 
+    return pks
 
-def _create_nested(model, profile, data):
-    for add_input in filter(None, data):
-        item = model(profile=profile)
-        for field, value in add_input.items():
-            if field == "primary" and value is True:
-                model.objects.filter(profile=profile).update(primary=False)
-            setattr(item, field, value)
 
-        item.save()
+def _apply_nested_changes(
+    node, profile, add_data, update_data, remove_data, field_callback, validate
+):
+    """
+    Applies the add, update and remove inputs of a contact type of a profile with
+    a constant number of queries.
+
+    The items to update and remove are fetched with one query. The primary flags
+    are resolved in memory to the same result as applying the inputs one by one in
+    order would give, where setting an item primary clears the flag from the
+    others. The flag is cleared from the previous primary item first, so that the
+    single primary item constraint holds after every statement. The changes are
+    then written with at most one INSERT, one UPDATE and one DELETE.
+
+    Returns True if the profile had a primary item, but doesn't have one after
+    the changes.
+    """
+    model = node._meta.model
+    add_data = list(filter(None, add_data or []))
+    update_data = list(filter(None, update_data or []))
+    remove_ids = list(filter(None, remove_data or []))
 
+    update_pks = _decode_global_ids(
+        node, [update_input["id"] for update_input in update_data]
+    )
+    remove_pks = _decode_global_ids(node, remove_ids)
 
-def _update_nested(node, profile, data, field_callback):
-    model = node._meta.model
+    existing_items = {}
+    if update_pks or remove_pks:
+        for item in model.objects.filter(
+            profile=profile, pk__in=[*update_pks.values(), *remove_pks.values()]
+        ):
+            item.profile = profile
+            existing_items[item.pk] = item
+    for id, pk in chain(update_pks.items(), remove_pks.items()):
+        if pk not in existing_items:
+            raise model.DoesNotExist(
+                f"{model._meta.object_name} with id {id} not found"
+            )
+    primary_pks = {pk for pk, item in existing_items.items() if item.primary}
 
-    for update_input in filter(None, data):
-        item_id = update_input.pop("id")
-        item = _safely_get_item_by_global_id(node, item_id, profile)
+    primary_item = None
+    new_items = []
+    for add_input in add_data:
+        item = model(profile=profile)
+        for field, value in add_input.items():
+            setattr(item, field, value)
+        if add_input.get("primary") is True:
+            primary_item = item
+        new_items.append(item)
 
+    updated_items = {}
+    for update_input in update_data:
+        item = existing_items[update_pks[update_input.pop("id")]]
         for field, value in update_input.items():
             if field_callback:
                 field_callback(item, field, value)
-            if field == "primary" and value is True:
-                model.objects.filter(profile=profile).update(primary=False)
             setattr(item, field, value)
+        if update_input.get("primary") is True:
+            primary_item = item
+        updated_items[item.pk] = item
+
+    if primary_item is not None:
+        for item in chain(new_items, existing_items.values()):
+            if item is not primary_item:
+                item.primary = False
+
+    removed_items = [existing_items[pk] for pk in set(remove_pks.values())]
+    has_primary = any(
+        item.primary
+        for item in chain(new_items, existing_items.values())
+        if item.pk not in remove_pks.values()
+    )
+
+    if validate:
+        for item in chain(updated_items.values(), new_items):
+            item.clean_fields(exclude=["profile"])
+
+    had_primary = bool(primary_pks)
+    if primary_item is not None and primary_item.pk not in primary_pks:
+        previous_primary_items = model.objects.filter(profile=profile, primary=True)
+        if primary_item.pk:
+            previous_primary_items = previous_primary_items.exclude(pk=primary_item.pk)
+        had_primary |= previous_primary_items.update(primary=False) > 0
+
+    if updated_items:
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not field.primary_key and field.name != "profile"
+        ]
+        for item in updated_items.values():
+            for field in fields:
+                field.pre_save(item, add=False)
+        model.objects.bulk_update(
+            updated_items.values(), [field.name for field in fields]
+        )
+        for item in updated_items.values():
+            log("UPDATE", item)
 
-        item.save()
+    if new_items:
+        model.objects.bulk_create(new_items)
+        for item in new_items:
+            log("CREATE", item)
 
+    if removed_items:
+        collector = Collector(using=router.db_for_write(model))
+        collector.collect(removed_items)
+        collector.delete()
 
-def _delete_nested(node, profile, data):
-    for remove_id in filter(None, data):
-        _safely_get_item_by_global_id(node, remove_id, profile).delete()
+    return had_primary and not has_primary
 
 
 def update_profile(profile, profile_data):
@@ -174,31 +296,37 @@ def update_profile(profile, profile_data):
         if field == "email" and item.email != value:
             item.verified = False
 
-    nested_to_create = [
-        (Email, profile_data.pop("add_emails", [])),
-        (Phone, profile_data.pop("add_phones", [])),
-        (Address, profile_data.pop("add_addresses", [])),
-    ]
-    nested_to_update = [
+    nested_changes = [
         (
             EmailNode,
+            profile_data.pop("add_emails", []),
             profile_data.pop("update_emails", []),
+            profile_data.pop("remove_emails", []),
             email_change_makes_it_unverified,
+            # Emails are validated when they are saved
+            True,
+        ),
+        (
+            PhoneNode,
+            profile_data.pop("add_phones", []),
+            profile_data.pop("update_phones", []),
+            profile_data.pop("remove_phones", []),
+            None,
+            False,
+        ),
+        (
+            AddressNode,
+            profile_data.pop("add_addresses", []),
+            profile_data.pop("update_addresses", []),
+            profile_data.pop("remove_addresses", []),
+            None,
+            False,
         ),
-        (PhoneNode, profile_data.pop("update_phones", []), None),
-        (AddressNode, profile_data.pop("update_addresses", []), None),
-    ]
-    nested_to_delete = [
-        (EmailNode, profile_data.pop("remove_emails", [])),
-        (PhoneNode, profile_data.pop("remove_phones", [])),
-        (AddressNode, profile_data.pop("remove_addresses", [])),
     ]
 
     # Remove image field from input. It's not supposed to do anything anymore.
     profile_data.pop("image", None)
 
-    profile_had_primary_email = bool(profile.get_primary_email_value())
-
     if language := profile_data.pop("language", None):
         profile.language = language.value
 
@@ -209,19 +337,13 @@ def update_profile(profile, profile_data):
         setattr(profile, field, value)
     profile.save()
 
-    for model, data in nested_to_create:
-        _create_nested(model, profile, data)
-
-    for node, data, field_callback in nested_to_update:
-        _update_nested(node, profile, data, field_callback)
-
-    for node, data in nested_to_delete:
-        _delete_nested(node, profile, data)
+    for node, *changes in nested_changes:
+        lost_primary = _apply_nested_changes(node, profile, *changes)
 
-    if profile_had_primary_email and not bool(profile.get_primary_email_value()):
-        raise ProfileMustHavePrimaryEmailError(
-            "Must maintain a primary email on a profile"
-        )
+        if node is EmailNode and lost_primary:
+            raise ProfileMustHavePrimaryEmailError(
+                "Must maintain a primary email on a profile"
+            )
 
 
 def update_sensitivedata(profile, sensitive_data):
@@ -231,7 +353,7 @@ def update_sensitivedata(profile, sensitive_data):
         profile_sensitivedata = SensitiveData(profile=profile)
     for field, value in sensitive_data.items():
         setattr(profile_sensitivedata, field, value)
-    profile_sensitivedata.save()
+    profile_sensitivedata.save_if_changed()
 
 
 with override("en"):
@@ -348,19 +470,29 @@ class ProfileFilter(FilterSet):
     national_identification_number = CharFilter(
         method="filter_by_nin_exact", label="Searches by full match only."
     )
-    emails__email = CharFilter(lookup_expr="icontains")
-    emails__email_type = ChoiceFilter(choices=EmailType.choices())
-    emails__primary = BooleanFilter()
-    emails__verified = BooleanFilter()
-    phones__phone = CharFilter(lookup_expr="icontains")
-    phones__phone_type = ChoiceFilter(choices=PhoneType.choices())
-    phones__primary = BooleanFilter()
-    addresses__address = CharFilter(lookup_expr="icontains")
-    addresses__postal_code = CharFilter(lookup_expr="icontains")
-    addresses__city = CharFilter(lookup_expr="icontains")
-    addresses__country_code = CharFilter(lookup_expr="icontains")
-    addresses__address_type = ChoiceFilter(choices=AddressType.choices())
-    addresses__primary = BooleanFilter()
+    emails__email = CharFilter(lookup_expr="icontains", method="filter_by_contact")
+    emails__email_type = ChoiceFilter(
+        choices=EmailType.choices(), method="filter_by_contact"
+    )
+    emails__primary = BooleanFilter(method="filter_by_contact")
+    emails__verified = BooleanFilter(method="filter_by_contact")
+    phones__phone = CharFilter(lookup_expr="icontains", method="filter_by_contact")
+    phones__phone_type = ChoiceFilter(
+        choices=PhoneType.choices(), method="filter_by_contact"
+    )
+    phones__primary = BooleanFilter(method="filter_by_contact")
+    addresses__address = CharFilter(lookup_expr="icontains", method="filter_by_contact")
+    addresses__postal_code = CharFilter(
+        lookup_expr="icontains", method="filter_by_contact"
+    )
+    addresses__city = CharFilter(lookup_expr="icontains", method="filter_by_contact")
+    addresses__country_code = CharFilter(
+        lookup_expr="icontains", method="filter_by_contact"
+    )
+    addresses__address_type = ChoiceFilter(
+        choices=AddressType.choices(), method="filter_by_contact"
+    )
+    addresses__primary = BooleanFilter(method="filter_by_contact")
     language = CharFilter()
     order_by = PrimaryContactInfoOrderingFilter(
         fields=(
@@ -371,6 +503,21 @@ class ProfileFilter(FilterSet):
         )
     )
 
+    CONTACT_MODELS = {"emails": Email, "phones": Phone, "addresses": Address}
+
+    def filter_by_contact(self, queryset, name, value):
+        """
+        Filters with an EXISTS subquery instead of a join, so that combining several
+        contact filters doesn't multiply the profile rows. Every filter matches any
+        contact of the profile, as it would with a separate join.
+        """
+        relation, field_name = name.split("__", 1)
+        lookup = f"{field_name}__{self.filters[name].lookup_expr}"
+        contacts = self.CONTACT_MODELS[relation].objects.filter(
+            profile=OuterRef("pk"), **{lookup: value}
+        )
+        return queryset.filter(Exists(contacts))
+
     def filter_by_name_icontains(self, queryset, name, value):
         name_filter = Q(**{f"{name}__icontains": value})
 
@@ -444,7 +591,8 @@ class AddressNode(ContactNode):
         user = info.context.user
 
         if service.has_connection_to_profile(address.profile) and (
-            user == address.profile.user or user.has_perm("can_view_profiles", service)
+            user == address.profile.user
+            or requester_has_perm(info.context, "can_view_profiles", service)
         ):
             return address
         else:
@@ -680,8 +828,8 @@ class ProfileNode(RestrictedProfileNode):
     def resolve_sensitivedata(self: Profile, info, **kwargs):
         service = info.context.service
 
-        if info.context.user == self.user or info.context.user.has_perm(
-            "can_view_sensitivedata", service
+        if info.context.user == self.user or requester_has_perm(
+            info.context, "can_view_sensitivedata", service
         ):
             return self.sensitivedata
         else:
@@ -713,7 +861,8 @@ class ProfileNode(RestrictedProfileNode):
         user = info.context.user
 
         if service.has_connection_to_profile(profile) and (
-            user == profile.user or user.has_perm("can_view_profiles", service)
+            user == profile.user
+            or requester_has_perm(info.context, "can_view_profiles", service)
         ):
             return profile
         else:
@@ -977,13 +1126,14 @@ class CreateProfileMutation(relay.ClientIDMutation):
         profile_data = input.get("profile")
         sensitivedata = profile_data.get("sensitivedata", None)
 
-        if sensitivedata and not info.context.user.has_perm(
-            "can_manage_sensitivedata", service
+        if sensitivedata and not requester_has_perm(
+            info.context, "can_manage_sensitivedata", service
         ):
             raise PermissionDenied(PERMISSION_DENIED_MESSAGE)
 
         validate(cls, root, info, **input)
 
+        changed_parts = [*get_changed_parts(profile_data), SERVICE_CONNECTIONS]
         profile_data.pop("sensitivedata", None)
 
         profile = Profile()
@@ -996,6 +1146,8 @@ class CreateProfileMutation(relay.ClientIDMutation):
         # create the service connection for the profile
         profile.service_connections.create(service=service)
 
+        enqueue_profile_change(profile, changed_parts)
+
         return CreateProfileMutation(profile=profile)
 
 
@@ -1182,9 +1334,11 @@ class CreateOrUpdateProfileWithVerifiedPersonalInformationMutationPayload(
 
 class CreateOrUpdateUserProfileMutationBase:
     @staticmethod
-    def _handle_address(vpi, address_name, address_model, address_input):
+    def _handle_address(vpi, address_model, address_input):
         try:
-            address = getattr(vpi, address_name)
+            address = address_model.objects.track_changes().get(
+                verified_personal_information=vpi
+            )
         except address_model.DoesNotExist:
             address = address_model(verified_personal_information=vpi)
 
@@ -1192,7 +1346,7 @@ class CreateOrUpdateUserProfileMutationBase:
             setattr(address, field, value)
 
         if not address.is_empty():
-            address.save()
+            address.save_if_changed()
         elif address.id:
             address.delete()
 
@@ -1211,20 +1365,26 @@ class CreateOrUpdateUserProfileMutationBase:
                 address_type["name"], None
             )
 
-        vpi, created = VerifiedPersonalInformation.objects.update_or_create(
-            profile=profile, defaults=verified_personal_information_input
-        )
+        try:
+            vpi, created = (
+                VerifiedPersonalInformation.objects.update_or_create_if_changed(
+                    profile=profile, defaults=verified_personal_information_input
+                )
+            )
+        except IntegrityError as err:
+            if not is_national_identification_number_conflict(err):
+                raise
+            raise DataConflictError(
+                NATIONAL_IDENTIFICATION_NUMBER_CONFLICT_MESSAGE
+            ) from err
 
         for address_type in address_types:
             address_input = address_type["input"]
             if not address_input:
                 continue
 
-            address_name = address_type["name"]
-            address_model = address_type["model"]
-
             CreateOrUpdateUserProfileMutationBase._handle_address(
-                vpi, address_name, address_model, address_input
+                vpi, address_type["model"], address_input
             )
 
     @staticmethod
@@ -1233,26 +1393,31 @@ class CreateOrUpdateUserProfileMutationBase:
         verified = primary_email_input.get("verified", False)
 
         email = profile.emails.filter(email=email_address).first()
+        if email and email.primary:
+            if email.verified is not verified:
+                email.verified = verified
+                email.save(update_fields=["verified"])
+            return
+
+        # Clear the flag from the previous primary email first, so that the single
+        # primary email constraint holds.
+        profile.emails.filter(primary=True).update(primary=False)
+
         if email:
-            profile.emails.exclude(pk=email.pk).filter(primary=True).update(
-                primary=False
-            )
+            email.primary = True
+            email.verified = verified
+            email.save(update_fields=["primary", "verified"])
         else:
-            profile.emails.filter(primary=True).update(primary=False)
-            email = profile.emails.create(
+            profile.emails.create(
                 email=email_address,
                 email_type=EmailType.NONE,
                 primary=True,
                 verified=verified,
             )
 
-        if not email.primary or email.verified is not verified:
-            email.primary = True
-            email.verified = verified
-            email.save()
-
     @staticmethod
     def _do_mutate(parent, info, input):
+        changed_parts = get_user_profile_changed_parts(input)
         user_id_input = input.pop("user_id")
         profile_input = input.pop("profile")
         verified_personal_information_input = profile_input.pop(
@@ -1262,7 +1427,7 @@ class CreateOrUpdateUserProfileMutationBase:
 
         user, created = User.objects.get_or_create(uuid=user_id_input)
 
-        profile, created = Profile.objects.update_or_create(
+        profile, created = Profile.objects.update_or_create_if_changed(
             user=user, defaults=profile_input
         )
 
@@ -1283,6 +1448,8 @@ class CreateOrUpdateUserProfileMutationBase:
                 profile, primary_email_input
             )
 
+        enqueue_profile_change(profile, changed_parts)
+
         return profile
 
 
@@ -1323,6 +1490,192 @@ class CreateOrUpdateProfileWithVerifiedPersonalInformationMutation(graphene.Muta
         )
 
 
+class CreateOrUpdateUserProfilesMutationInput(graphene.InputObjectType):
+    profiles = graphene.List(
+        graphene.NonNull(CreateOrUpdateUserProfileMutationInput),
+        required=True,
+        description="The profiles to create or update. Every input must have a different **user id**. "  # noqa: E501
+        "The number of inputs is limited, by default to 1000.",
+    )
+
+
+class CreateOrUpdateUserProfileError(graphene.ObjectType):
+    """Error code and message of an input which couldn't be handled.
+
+    The error codes are the same as the ones of the `createOrUpdateUserProfile`
+    mutation.
+    """
+
+    code = graphene.String(required=True)
+    message = graphene.String(required=True)
+
+
+class CreateOrUpdateUserProfileResult(graphene.ObjectType):
+    """Result of creating or updating the profile of one input"""
+
+    user_id = graphene.UUID(required=True, description="The **user id** of the input.")
+    profile = graphene.Field(
+        ProfileNode,
+        description="The created or updated profile. Null if there were errors.",
+    )
+    errors = graphene.List(
+        graphene.NonNull(CreateOrUpdateUserProfileError),
+        required=True,
+        description="Errors if the profile couldn't be created or updated. Nothing was saved for the input if there are errors.",  # noqa: E501
+    )
+
+
+class CreateOrUpdateUserProfilesMutationPayload(graphene.ObjectType):
+    results = graphene.List(
+        graphene.NonNull(CreateOrUpdateUserProfileResult),
+        required=True,
+        description="The results in the order of the inputs.",
+    )
+
+
+def _create_or_update_user_profile_error(error):
+    if isinstance(error, IntegrityError):
+        if not is_national_identification_number_conflict(error):
+            raise error
+        error = DataConflictError(NATIONAL_IDENTIFICATION_NUMBER_CONFLICT_MESSAGE)
+
+    if isinstance(error, DataError):
+        message = "Invalid data format."
+    elif isinstance(error, ValidationGraphQLError):
+        message = "; ".join(
+            f"{'.'.join(str(part) for part in detail.get('path', []))}: "
+            f"{detail.get('message', detail.get('code'))}"
+            for detail in error.extensions["validationErrors"]
+        )
+    elif isinstance(error, DjangoValidationError):
+        message = " ".join(error.messages)
+    else:
+        message = str(error)
+
+    return CreateOrUpdateUserProfileError(
+        code=get_error_code(error.__class__), message=message
+    )
+
+
+class CreateOrUpdateUserProfilesMutation(graphene.Mutation):
+    class Arguments:
+        input = CreateOrUpdateUserProfilesMutationInput(required=True)
+
+    Output = CreateOrUpdateUserProfilesMutationPayload
+
+    @staticmethod
+    def _validate_item(parent, info, item, user_ids, services):
+        """
+        Validates an input and returns the service to connect the profile to. The
+        services are looked up once per client id and remembered in `services`.
+        """
+        if item["user_id"] in user_ids:
+            raise DataConflictError("The user id is given in more than one input.")
+        user_ids.add(item["user_id"])
+
+        validate(CreateOrUpdateUserProfileMutation, parent, info, **item)
+
+        primary_email_input = item["profile"].get("primary_email")
+        if primary_email_input:
+            Email._meta.get_field("email").clean(primary_email_input["email"], None)
+
+        service = None
+        service_client_id = item.get("service_client_id")
+        if service_client_id:
+            if service_client_id not in services:
+                services[service_client_id] = get_service_by_client_id(
+                    service_client_id
+                )
+            service = services[service_client_id]
+            if service is None:
+                raise Service.DoesNotExist(
+                    f"Service with client id {service_client_id} not found"
+                )
+        return service
+
+    @staticmethod
+    def _handle_chunk(parent, info, chunk):
+        """
+        Creates or updates the profiles of the chunk in one transaction. If that
+        fails, the inputs are handled one by one to find out which of them fail.
+        """
+        try:
+            with transaction.atomic():
+                profiles, changes = upsert_user_profiles(
+                    [item for result, item, service in chunk],
+                    [service for result, item, service in chunk],
+                )
+                enqueue_profile_changes(
+                    {
+                        profile.pk: get_user_profile_changed_parts(item)
+                        for (_result, item, _service), profile in zip(
+                            chunk, profiles, strict=True
+                        )
+                    }
+                )
+        except (DatabaseError, DjangoValidationError):
+            for result, item, _service in chunk:
+                try:
+                    with transaction.atomic():
+                        profile = CreateOrUpdateUserProfileMutationBase._do_mutate(
+                            parent, info, copy.deepcopy(item)
+                        )
+                except (
+                    DatabaseError,
+                    DjangoValidationError,
+                    ObjectDoesNotExist,
+                    DataConflictError,
+                ) as e:
+                    result.errors.append(_create_or_update_user_profile_error(e))
+                else:
+                    result.profile = profile
+            return
+
+        for action, instance in changes:
+            log(action, instance)
+        for (result, _item, _service), profile in zip(chunk, profiles, strict=True):
+            result.profile = profile
+
+    @staticmethod
+    @permission_required("profiles.manage_verified_personal_information")
+    def mutate(parent, info, input):
+        items = input["profiles"]
+        max_inputs = settings.CREATE_OR_UPDATE_USER_PROFILES_MAX_INPUTS
+        if len(items) > max_inputs:
+            raise DjangoValidationError(
+                f"At most {max_inputs} profiles can be created or updated at once."
+            )
+
+        results = []
+        valid_inputs = []
+        user_ids = set()
+        services = {}
+        for item in items:
+            result = CreateOrUpdateUserProfileResult(user_id=item["user_id"], errors=[])
+            results.append(result)
+            try:
+                service = CreateOrUpdateUserProfilesMutation._validate_item(
+                    parent, info, item, user_ids, services
+                )
+            except (
+                ValidationGraphQLError,
+                ProfileGraphQLError,
+                DjangoValidationError,
+                ObjectDoesNotExist,
+            ) as e:
+                result.errors.append(_create_or_update_user_profile_error(e))
+            else:
+                valid_inputs.append((result, item, service))
+
+        chunk_size = settings.CREATE_OR_UPDATE_USER_PROFILES_CHUNK_SIZE
+        for start in range(0, len(valid_inputs), chunk_size):
+            CreateOrUpdateUserProfilesMutation._handle_chunk(
+                parent, info, valid_inputs[start : start + chunk_size]
+            )
+
+        return CreateOrUpdateUserProfilesMutationPayload(results=results)
+
+
 class UpdateMyProfileMutation(relay.ClientIDMutation):
     class Input:
         profile = ProfileInput(required=True)
@@ -1341,6 +1694,7 @@ class UpdateMyProfileMutation(relay.ClientIDMutation):
             validate(cls, root, info, **input)
 
             profile_data = input.pop("profile")
+            changed_parts = get_changed_parts(profile_data)
             sensitive_data = profile_data.pop("sensitivedata", None)
 
             update_profile(profile, profile_data)
@@ -1348,7 +1702,9 @@ class UpdateMyProfileMutation(relay.ClientIDMutation):
             if sensitive_data:
                 update_sensitivedata(profile, sensitive_data)
 
-            profile_updated.send(sender=profile.__class__, instance=profile)
+            profile_updated.send(
+                sender=profile.__class__, instance=profile, changed_parts=changed_parts
+            )
 
         return UpdateMyProfileMutation(profile=profile)
 
@@ -1406,13 +1762,14 @@ class UpdateProfileMutation(relay.ClientIDMutation):
 
             sensitive_data = profile_data.get("sensitivedata", None)
 
-            if sensitive_data and not info.context.user.has_perm(
-                "can_manage_sensitivedata", service
+            if sensitive_data and not requester_has_perm(
+                info.context, "can_manage_sensitivedata", service
             ):
                 raise PermissionDenied(PERMISSION_DENIED_MESSAGE)
 
             validate(cls, root, info, **input)
 
+            changed_parts = get_changed_parts(profile_data)
             profile_data.pop("sensitivedata", None)
 
             update_profile(profile, profile_data)
@@ -1420,7 +1777,9 @@ class UpdateProfileMutation(relay.ClientIDMutation):
             if sensitive_data:
                 update_sensitivedata(profile, sensitive_data)
 
-            profile_updated.send(sender=profile.__class__, instance=profile)
+            profile_updated.send(
+                sender=profile.__class__, instance=profile, changed_parts=changed_parts
+            )
 
         return UpdateProfileMutation(profile=profile)
 
@@ -1446,13 +1805,16 @@ class ClaimProfileMutation(relay.ClientIDMutation):
         else:
             with transaction.atomic():
                 # Logged-in user has no profile, let's use claimed profile
+                changed_parts = get_changed_parts(input["profile"])
                 update_profile(profile_to_claim, input["profile"])
                 profile_to_claim.user = info.context.user
                 profile_to_claim.save()
                 profile_to_claim.claim_tokens.all().delete()
 
                 profile_updated.send(
-                    sender=profile_to_claim.__class__, instance=profile_to_claim
+                    sender=profile_to_claim.__class__,
+                    instance=profile_to_claim,
+                    changed_parts=changed_parts,
                 )
 
             return ClaimProfileMutation(profile=profile_to_claim)
@@ -1665,6 +2027,76 @@ class CreateMyProfileTemporaryReadAccessTokenMutation(relay.ClientIDMutation):
         )
 
 
+def _get_service_by_client_id_or_raise(client_id):
+    service = get_service_by_client_id(client_id)
+    if service is None:
+        raise ServiceDoesNotExistError("Service not found")
+    return service
+
+
+def _validate_user_ids_count(user_ids):
+    max_inputs = settings.QUERY_BY_USER_IDS_MAX_INPUTS
+    if len(user_ids) > max_inputs:
+        raise DjangoValidationError(
+            f"At most {max_inputs} user ids can be given at once."
+        )
+
+
+def _get_service_connections_by_user_id(service, user_ids):
+    """
+    Returns a dict from user id to the connection of the user's profile to the
+    service, using one query
+    """
+    service_connections = ServiceConnection.objects.filter(
+        service=service, profile__user__uuid__in=user_ids
+    ).annotate(user_uuid=F("profile__user__uuid"))
+
+    result = {}
+    for service_connection in service_connections:
+        service_connection.service = service
+        result[service_connection.user_uuid] = service_connection
+    return result
+
+
+class ProfileChangesConnection(graphene.Connection):
+    class Meta:
+        node = ProfileNode
+
+
+PROFILE_CHANGES_CURSOR_PREFIX = "profilechanges:"
+
+
+def _get_profile_changes_cursor(profile):
+    return base64(
+        f"{PROFILE_CHANGES_CURSOR_PREFIX}{profile.updated_at.isoformat()}|{profile.pk}"
+    )
+
+
+def _parse_profile_changes_cursor(cursor):
+    """Returns the `updated_at` and the id of the profile of the cursor"""
+    value = unbase64(cursor)
+    try:
+        if not value.startswith(PROFILE_CHANGES_CURSOR_PREFIX):
+            raise ValueError
+        updated_at, profile_id = value.removeprefix(
+            PROFILE_CHANGES_CURSOR_PREFIX
+        ).split("|")
+        return datetime.fromisoformat(updated_at), uuid.UUID(profile_id)
+    except ValueError:
+        raise DjangoValidationError("Invalid cursor.") from None
+
+
+class ServiceConnectionWithUserId(graphene.ObjectType):
+    user_id = graphene.UUID(
+        required=True,
+        description="The **user id** of the user whose profile is part of the service connection.",  # noqa: E501
+    )
+    service_connection = graphene.Field(
+        ServiceConnectionType,
+        description="The service connection, or null if the user has no profile or the profile isn't connected to the service.",  # noqa: E501
+    )
+
+
 class Query(graphene.ObjectType):
     # TODO: Add missing error codes in descriptions (HP-2369)
     profile = graphene.Field(
@@ -1705,6 +2137,57 @@ class Query(graphene.ObjectType):
         "The profiles must have an active connection to the requester's service, otherwise "  # noqa: E501
         "they will not be returned.",
     )
+    profiles_by_national_identification_numbers = graphene.List(
+        graphene.NonNull(ProfileNode),
+        nins=graphene.Argument(
+            graphene.List(graphene.NonNull(graphene.String)),
+            required=True,
+            description="The national identification numbers to search by. Matches full numbers only.",  # noqa: E501
+        ),
+        description="Get profiles by their national identification numbers. The profiles are returned in the "  # noqa: E501
+        "order of the given numbers and numbers without a matching profile are left out.\n\n"  # noqa: E501
+        "Requires `staff` credentials and permission to view verified personal information "  # noqa: E501
+        "for the requester's service. The profiles must have an active connection to the "  # noqa: E501
+        "requester's service, otherwise they will not be returned.",
+    )
+    profiles_by_user_ids = graphene.List(
+        graphene.NonNull(ProfileNode),
+        user_ids=graphene.Argument(
+            graphene.List(graphene.NonNull(graphene.UUID)),
+            required=True,
+            description="The **user ids** of the users whose profiles to get. "
+            "The number of user ids is limited, by default to 1000.",
+        ),
+        description="Get profiles by the user ids of their users. The profiles are returned in the order of "  # noqa: E501
+        "the given user ids and user ids without a matching profile are left out.\n\n"  # noqa: E501
+        "Requires `staff` credentials for the requester's service. The profiles must have an "  # noqa: E501
+        "active connection to the requester's service, otherwise they will not be returned.",  # noqa: E501
+    )
+    profiles_changed_since = graphene.Field(
+        ProfileChangesConnection,
+        since=graphene.Argument(
+            graphene.DateTime,
+            required=True,
+            description="Only profiles changed at or after this time are returned.",
+        ),
+        after=graphene.String(
+            description="The `endCursor` of the previous page, to get the profiles changed after it.",  # noqa: E501
+        ),
+        first=graphene.Int(
+            description="The maximum number of profiles to return.",
+        ),
+        description="Get the profiles which have changed since the given time. A profile changes when "  # noqa: E501
+        "its own data, contact information, verified personal information or service connections "  # noqa: E501
+        "change. The profiles are returned in the order of their latest change and paged using "  # noqa: E501
+        "Relay. The `endCursor` of the last page can be used to continue from where the previous "  # noqa: E501
+        "query left off.\n\nA change is only returned once it's older than a safety lag, by default "  # noqa: E501
+        "60 seconds, so that changes committed after a later change can't be skipped. A change is "  # noqa: E501
+        "only missed if it takes longer than the lag to commit.\n\n"
+        "Requires `staff` credentials for the requester's service. The profiles "
+        "must have an active connection to the requester's service, otherwise they will not be returned.\n\n"  # noqa: E501
+        "Possible error codes:\n\n"
+        "* `VALIDATION_ERROR`: The given cursor is invalid.",
+    )
     claimable_profile = graphene.Field(
         ProfileNode,
         token=graphene.Argument(graphene.UUID, required=True),
@@ -1746,11 +2229,30 @@ class Query(graphene.ObjectType):
         "* `SERVICE_DOES_NOT_EXIST_ERROR`: No service found for the given client id argument.\n"  # noqa: E501
         "* `SERVICE_CONNECTION_DOES_NOT_EXIST_ERROR`: No service connection found with the given arguments.",  # noqa: E501
     )
+    service_connections_with_user_ids = graphene.List(
+        graphene.NonNull(ServiceConnectionWithUserId),
+        user_ids=graphene.Argument(
+            graphene.List(graphene.NonNull(graphene.UUID)),
+            required=True,
+            description="The **user ids** of the users whose profiles are part of the service connections. "  # noqa: E501
+            "The number of user ids is limited, by default to 1000.",
+        ),
+        service_client_id=graphene.Argument(
+            graphene.String,
+            required=True,
+            description="Any client id of the service to which the service connections connect.",  # noqa: E501
+        ),
+        description="Get the service connections of several users by using their user ids and a client id of the "  # noqa: E501
+        "service. One result is returned for every distinct user id, in the order of the given user ids.\n\n"  # noqa: E501
+        "Requires elevated privileges.\n\n"
+        "Possible error codes:\n\n"
+        "* `SERVICE_DOES_NOT_EXIST_ERROR`: No service found for the given client id argument.",  # noqa: E501
+    )
 
     @staff_required(required_permission="view")
     def resolve_profile(self, info, **kwargs):
         service = info.context.service
-        return Profile.objects.filter(service_connections__service=service).get(
+        return Profile.objects.filter(is_connected_to_service(service)).get(
             pk=from_global_id(kwargs["id"])[1]
         )
 
@@ -1769,7 +2271,82 @@ class Query(graphene.ObjectType):
     @staff_required(required_permission="view")
     def resolve_profiles(self, info, **kwargs):
         service = info.context.service
-        return Profile.objects.filter(service_connections__service=service)
+        return Profile.objects.filter(is_connected_to_service(service))
+
+    @staff_required(required_permission="view")
+    def resolve_profiles_by_user_ids(self, info, **kwargs):
+        _validate_user_ids_count(kwargs["user_ids"])
+        service = info.context.service
+        profiles_by_user_id = {
+            profile.user.uuid: profile
+            for profile in Profile.objects.filter(
+                is_connected_to_service(service), user__uuid__in=kwargs["user_ids"]
+            ).select_related("user")
+        }
+        return [
+            profiles_by_user_id[user_id]
+            for user_id in dict.fromkeys(kwargs["user_ids"])
+            if user_id in profiles_by_user_id
+        ]
+
+    @staff_required(required_permission="view")
+    def resolve_profiles_changed_since(self, info, **kwargs):
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        limit = kwargs.get("first")
+        if limit is None or limit > max_limit:
+            limit = max_limit
+        elif limit < 0:
+            raise DjangoValidationError("first must not be negative.")
+
+        # The change time is the start time of the transaction, so a change may be
+        # committed after later changes have already been returned. Changes are only
+        # returned after a lag, so that they have been committed by then.
+        lag = timedelta(seconds=settings.PROFILES_CHANGED_SINCE_LAG_SECONDS)
+        service = info.context.service
+        profiles = Profile.objects.filter(
+            is_connected_to_service(service),
+            updated_at__gte=kwargs["since"],
+            updated_at__lte=Now() - lag,
+        )
+        after = kwargs.get("after")
+        if after:
+            updated_at, profile_id = _parse_profile_changes_cursor(after)
+            profiles = profiles.filter(updated_at__gte=updated_at).filter(
+                Q(updated_at__gt=updated_at) | Q(id__gt=profile_id)
+            )
+        profiles = list(profiles.order_by("updated_at", "id")[: limit + 1])
+
+        edges = [
+            ProfileChangesConnection.Edge(
+                node=profile, cursor=_get_profile_changes_cursor(profile)
+            )
+            for profile in profiles[:limit]
+        ]
+        return ProfileChangesConnection(
+            edges=edges,
+            page_info=relay.PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else after,
+                has_previous_page=bool(after),
+                has_next_page=len(profiles) > limit,
+            ),
+        )
+
+    @staff_required(required_permission="view")
+    def resolve_profiles_by_national_identification_numbers(self, info, **kwargs):
+        if not requester_can_view_verified_personal_information(info.context):
+            return []
+
+        service = info.context.service
+        profiles_by_nin = Profile.get_by_national_identification_numbers(
+            kwargs["nins"],
+            queryset=Profile.objects.filter(is_connected_to_service(service)),
+        )
+        return [
+            profiles_by_nin[nin]
+            for nin in dict.fromkeys(kwargs["nins"])
+            if nin in profiles_by_nin
+        ]
 
     @login_required
     def resolve_claimable_profile(self, info, **kwargs):
@@ -1831,23 +2408,33 @@ class Query(graphene.ObjectType):
 
     @permission_required("services.view_serviceconnection")
     def resolve_service_connection_with_user_id(self, info, **kwargs):
+        service = _get_service_by_client_id_or_raise(kwargs["service_client_id"])
+        service_connections = _get_service_connections_by_user_id(
+            service, [kwargs["user_id"]]
+        )
         try:
-            profile = Profile.objects.get(user__uuid=kwargs["user_id"])
-            service = Service.objects.get(
-                client_ids__client_id=kwargs["service_client_id"]
-            )
-            return ServiceConnection.objects.select_related("service").get(
-                profile=profile, service=service
-            )
-        except Profile.DoesNotExist:
-            raise ProfileDoesNotExistError("Profile not found") from None
-        except Service.DoesNotExist:
-            raise ServiceDoesNotExistError("Service not found") from None
-        except ServiceConnection.DoesNotExist:
+            return service_connections[kwargs["user_id"]]
+        except KeyError:
+            if not Profile.objects.filter(user__uuid=kwargs["user_id"]).exists():
+                raise ProfileDoesNotExistError("Profile not found") from None
             raise ServiceConnectionDoesNotExistError(
                 "Service connection does not exist"
             ) from None
 
+    @permission_required("services.view_serviceconnection")
+    def resolve_service_connections_with_user_ids(self, info, **kwargs):
+        _validate_user_ids_count(kwargs["user_ids"])
+        service = _get_service_by_client_id_or_raise(kwargs["service_client_id"])
+        service_connections = _get_service_connections_by_user_id(
+            service, kwargs["user_ids"]
+        )
+        return [
+            ServiceConnectionWithUserId(
+                user_id=user_id, service_connection=service_connections.get(user_id)
+            )
+            for user_id in dict.fromkeys(kwargs["user_ids"])
+        ]
+
 
 class Mutation(graphene.ObjectType):
     # TODO: Add missing error codes in descriptions (HP-2369)
@@ -1883,6 +2470,26 @@ class Mutation(graphene.ObjectType):
             "The given input doesn't pass validation."
         )
     )
+    create_or_update_user_profiles = (
+        CreateOrUpdateUserProfilesMutation.Field(
+            description="Creates new or updates existing profiles for the specified users, like "  # noqa: E501
+            "`createOrUpdateUserProfile` does for one user. The inputs are handled in chunks, each in "  # noqa: E501
+            "its own transaction, and the result of every input is returned separately.\n\n"  # noqa: E501
+            "Requires elevated privileges.\n\n"
+            "Possible error codes:\n\n"
+            "* `PERMISSION_DENIED_ERROR`: "
+            "The current user doesn't have the required permissions to perform this action.\n"  # noqa: E501
+            "* `VALIDATION_ERROR`: "
+            "Too many inputs are given.\n\n"
+            "Possible error codes of the results:\n\n"
+            "* `VALIDATION_ERROR`: "
+            "The input doesn't pass validation.\n"
+            "* `OBJECT_DOES_NOT_EXIST_ERROR`: "
+            "There is no service with the given client id.\n"
+            "* `DATA_CONFLICT_ERROR`: "
+            "The user id is given more than once, or the input conflicts with existing data."  # noqa: E501
+        )
+    )
     # fmt: on
 
     update_my_profile = UpdateMyProfileMutation.Field(
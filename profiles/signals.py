@@ -1,9 +1,23 @@
+from django.db.models.signals import pre_delete
 from django.dispatch import receiver
 
+from .change_notifications import PROFILE_DELETED, enqueue_profile_change
 from .keycloak_integration import send_profile_changes_to_keycloak
+from .models import Profile
 from .schema import profile_updated
 
 
 @receiver(profile_updated)
 def _profile_updated_handler(sender, instance, **kwargs):
     send_profile_changes_to_keycloak(instance)
+
+
+@receiver(profile_updated)
+def _enqueue_profile_change_handler(sender, instance, changed_parts=(), **kwargs):
+    enqueue_profile_change(instance, changed_parts)
+
+
+@receiver(pre_delete, sender=Profile)
+def _enqueue_profile_deletion_handler(sender, instance, **kwargs):
+    # The connections are deleted with the profile, so they are read beforehand
+    enqueue_profile_change(instance, [PROFILE_DELETED])
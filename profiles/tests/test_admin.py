@@ -1,15 +1,19 @@
+import pytest
 from django.forms.models import inlineformset_factory
 from django.urls import reverse
 
-from ..admin import EmailFormSet
+from ..admin import PrimaryContactFormSet
 from ..enums import EmailType
 from ..models import Email, Profile
-from .factories import ProfileFactory
+from .factories import EmailFactory, ProfileFactory
 
 
 def test_profile_should_have_exactly_one_primary_email(profile):
     email_formset = inlineformset_factory(
-        Profile, Email, formset=EmailFormSet, fields=["email", "email_type", "primary"]
+        Profile,
+        Email,
+        formset=PrimaryContactFormSet,
+        fields=["email", "email_type", "primary"],
     )
     data = {
         "emails-TOTAL_FORMS": "1",
@@ -25,7 +29,10 @@ def test_profile_should_have_exactly_one_primary_email(profile):
 
 def test_profile_should_be_valid_with_no_primary_email(profile):
     email_formset = inlineformset_factory(
-        Profile, Email, formset=EmailFormSet, fields=["email", "email_type", "primary"]
+        Profile,
+        Email,
+        formset=PrimaryContactFormSet,
+        fields=["email", "email_type", "primary"],
     )
     data = {
         "emails-TOTAL_FORMS": "1",
@@ -41,7 +48,10 @@ def test_profile_should_be_valid_with_no_primary_email(profile):
 
 def test_profile_should_not_be_valid_with_two_or_more_primary_emails(profile):
     email_formset = inlineformset_factory(
-        Profile, Email, formset=EmailFormSet, fields=["email", "email_type", "primary"]
+        Profile,
+        Email,
+        formset=PrimaryContactFormSet,
+        fields=["email", "email_type", "primary"],
     )
     data = {
         "emails-TOTAL_FORMS": "2",
@@ -58,6 +68,52 @@ def test_profile_should_not_be_valid_with_two_or_more_primary_emails(profile):
     assert not formset.is_valid()
 
 
+@pytest.mark.parametrize("new_primary_index", [0, 1])
+@pytest.mark.parametrize("delete_old_primary", [False, True])
+def test_primary_email_can_be_moved_to_another_email(
+    profile, new_primary_index, delete_old_primary
+):
+    emails = [EmailFactory(profile=profile, primary=False) for _ in range(2)]
+    old_primary = emails[1 - new_primary_index]
+    old_primary.primary = True
+    old_primary.save()
+    email_formset = inlineformset_factory(
+        Profile,
+        Email,
+        formset=PrimaryContactFormSet,
+        fields=["email", "email_type", "primary"],
+        can_delete=True,
+    )
+    data = {
+        "emails-TOTAL_FORMS": "2",
+        "emails-INITIAL_FORMS": "2",
+        "emails-MAX_NUM_FORMS": "",
+    }
+    for index, email in enumerate(profile.emails.order_by("pk")):
+        data.update(
+            {
+                f"emails-{index}-id": email.pk,
+                f"emails-{index}-email": email.email,
+                f"emails-{index}-email_type": email.email_type,
+            }
+        )
+        if index == new_primary_index:
+            data[f"emails-{index}-primary"] = True
+        elif delete_old_primary:
+            data[f"emails-{index}-DELETE"] = True
+
+    formset = email_formset(
+        data, prefix="emails", instance=profile, queryset=profile.emails.order_by("pk")
+    )
+    assert formset.is_valid(), formset.errors
+    formset.save()
+
+    assert [email.pk for email in profile.emails.filter(primary=True)] == [
+        emails[new_primary_index].pk
+    ]
+    assert profile.emails.filter(pk=old_primary.pk).exists() is not delete_old_primary
+
+
 def test_admin_profile_change_view_query_count_not_too_big(
     admin_client, django_assert_max_num_queries, profile
 ):
@@ -392,7 +392,14 @@ def test_audit_log_update(live_server, profile_with_related):
     # We ignore the READ events in this test for now.
     log_entries = discard_audit_logs(log_entries, "READ")
 
-    for profile_part_name in profile_with_related.all_profile_part_names:
+    if related_name and related_name.startswith("verified_personal_information__"):
+        # Only the address changes, so the verified personal information itself
+        # isn't updated.
+        updated_profile_part_names = [profile_with_related.profile_part_name]
+    else:
+        updated_profile_part_names = profile_with_related.all_profile_part_names
+
+    for profile_part_name in updated_profile_part_names:
         related_log_entries, log_entries = partition_logs_by_target_type(
             log_entries, profile_part_name
         )
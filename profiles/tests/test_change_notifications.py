@@ -0,0 +1,355 @@
+import json
+import threading
+import uuid
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.utils import timezone
+from guardian.shortcuts import assign_perm
+
+from profiles.change_notifications import (
+    DISPATCH_LOCK_KEY,
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    dispatch_profile_changes,
+    enqueue_profile_change,
+    get_changed_parts,
+    sign_payload,
+)
+from profiles.models import ProfileChangeNotification
+from services.models import AllowedDataField
+from services.tests.factories import ServiceConnectionFactory, ServiceFactory
+
+from .factories import ProfileFactory
+
+WEBHOOK_SECRET = "webhook-secret"
+
+
+class WebhookReceiver:
+    """
+    Local HTTP server which verifies the signatures of the posted notifications
+    and records the valid ones. Responds with the queued failure statuses of the
+    path first.
+    """
+
+    def __init__(self):
+        self.received = []
+        self.failure_statuses = {}
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                signature = sign_payload(
+                    WEBHOOK_SECRET, self.headers[TIMESTAMP_HEADER], body
+                )
+                failure_statuses = receiver.failure_statuses.get(self.path)
+                if failure_statuses:
+                    status = failure_statuses.pop(0)
+                elif self.headers[SIGNATURE_HEADER] != signature:
+                    status = 401
+                else:
+                    receiver.received.append((self.path, json.loads(body)))
+                    status = 204
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def payloads(self, path):
+        return [
+            payload for received_path, payload in self.received if received_path == path
+        ]
+
+
+@pytest.fixture
+def webhook_receiver():
+    receiver = WebhookReceiver()
+    thread = threading.Thread(target=receiver.server.serve_forever, daemon=True)
+    thread.start()
+    yield receiver
+    receiver.server.shutdown()
+    receiver.server.server_close()
+
+
+def create_webhook_service(webhook_receiver, path="/a", **kwargs):
+    service = ServiceFactory(
+        webhook_url=f"{webhook_receiver.url}{path}",
+        webhook_secret=WEBHOOK_SECRET,
+        **kwargs,
+    )
+    service.allowed_data_fields.add(
+        AllowedDataField.objects.get_or_create(field_name="name")[0]
+    )
+    return service
+
+
+def connected_profile(*services):
+    profile = ProfileFactory()
+    for service in services:
+        ServiceConnectionFactory(profile=profile, service=service)
+    return profile
+
+
+def test_changed_parts_are_the_changed_profile_fields():
+    assert get_changed_parts(
+        {"nickname": "Nick", "add_emails": [], "remove_emails": [], "image": None}
+    ) == ["emails", "nickname"]
+
+
+def test_update_my_profile_enqueues_notifications_to_connected_services_with_webhook(
+    user_gql_client, service, webhook_receiver
+):
+    webhook_service = create_webhook_service(webhook_receiver)
+    ServiceFactory(webhook_url=f"{webhook_receiver.url}/not-connected")
+    profile = ProfileFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=service)
+    ServiceConnectionFactory(profile=profile, service=webhook_service)
+    query = """
+        mutation {
+            updateMyProfile(input: {profile: {nickname: "Nick"}}) {
+                profile { id }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, service=service)
+
+    assert "errors" not in executed
+    notification = ProfileChangeNotification.objects.get()
+    assert notification.service == webhook_service
+    assert notification.profile_id == profile.pk
+    assert notification.changed_parts == ["nickname"]
+
+
+def test_create_or_update_user_profiles_enqueues_notifications(
+    user_gql_client, service_client_id_factory, webhook_receiver
+):
+    assign_perm("profiles.manage_verified_personal_information", user_gql_client.user)
+    connected_service = create_webhook_service(webhook_receiver, path="/a")
+    connecting_service = create_webhook_service(webhook_receiver, path="/b")
+    client_id = service_client_id_factory(service=connecting_service).client_id
+    profile = connected_profile(connected_service)
+    query = """
+        mutation ($input: CreateOrUpdateUserProfilesMutationInput!) {
+            createOrUpdateUserProfiles(input: $input) {
+                results { errors { code } }
+            }
+        }
+    """
+    inputs = [
+        {"userId": str(profile.user.uuid), "profile": {"firstName": "Updated"}},
+        {
+            "userId": str(uuid.uuid4()),
+            "serviceClientId": client_id,
+            "profile": {"primaryEmail": {"email": "new@example.com"}},
+        },
+    ]
+
+    executed = user_gql_client.execute(query, variables={"input": {"profiles": inputs}})
+
+    assert "errors" not in executed
+    assert sorted(
+        (notification.service.name, notification.changed_parts)
+        for notification in ProfileChangeNotification.objects.all()
+    ) == sorted(
+        [
+            (connected_service.name, ["first_name"]),
+            (connecting_service.name, ["emails", "service_connections"]),
+        ]
+    )
+
+
+def test_create_or_update_user_profile_enqueues_notifications(
+    user_gql_client, service_client_id_factory, webhook_receiver
+):
+    assign_perm("profiles.manage_verified_personal_information", user_gql_client.user)
+    service = create_webhook_service(webhook_receiver)
+    client_id = service_client_id_factory(service=service).client_id
+    query = """
+        mutation ($input: CreateOrUpdateUserProfileMutationInput!) {
+            createOrUpdateUserProfile(input: $input) {
+                profile { id }
+            }
+        }
+    """
+    variables = {
+        "input": {
+            "userId": str(uuid.uuid4()),
+            "serviceClientId": client_id,
+            "profile": {
+                "lastName": "Smith",
+                "verifiedPersonalInformation": {"lastName": "Smith"},
+            },
+        }
+    }
+
+    executed = user_gql_client.execute(query, variables=variables)
+
+    assert "errors" not in executed
+    notification = ProfileChangeNotification.objects.get()
+    assert notification.service == service
+    assert notification.changed_parts == [
+        "last_name",
+        "service_connections",
+        "verified_personal_information",
+    ]
+
+
+def test_add_service_connection_enqueues_notifications(
+    user_gql_client, service, webhook_receiver
+):
+    webhook_service = create_webhook_service(webhook_receiver)
+    profile = ProfileFactory(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=webhook_service)
+    query = """
+        mutation {
+            addServiceConnection(input: {serviceConnection: {enabled: true}}) {
+                serviceConnection { enabled }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(query, service=service)
+
+    assert "errors" not in executed
+    notification = ProfileChangeNotification.objects.get()
+    assert notification.service == webhook_service
+    assert notification.changed_parts == ["service_connections"]
+
+
+def test_profile_deletion_is_notified(webhook_receiver):
+    service = create_webhook_service(webhook_receiver)
+    profile = connected_profile(service)
+    profile_id = profile.pk
+    enqueue_profile_change(profile, ["first_name"])
+
+    profile.delete()
+    dispatch_profile_changes()
+
+    [payload] = webhook_receiver.payloads("/a")
+    assert payload["profileId"] == str(profile_id)
+    assert payload["deleted"] is True
+    assert payload["changedFields"] == ["firstName"]
+
+
+def test_notifications_are_delivered_signed_and_coalesced_in_order(webhook_receiver):
+    service = create_webhook_service(webhook_receiver)
+    profiles = [connected_profile(service) for _ in range(2)]
+    enqueue_profile_change(profiles[0], ["first_name"])
+    enqueue_profile_change(profiles[1], ["emails"])
+    enqueue_profile_change(profiles[0], ["nickname", "sensitivedata"])
+
+    result = dispatch_profile_changes()
+
+    assert (result.delivered, result.failed) == (2, 0)
+    assert [
+        (payload["profileId"], payload["changedFields"])
+        for payload in webhook_receiver.payloads("/a")
+    ] == [
+        # The service isn't allowed to see the changes of emails or sensitive data
+        (str(profiles[0].pk), ["firstName", "nickname"]),
+        (str(profiles[1].pk), []),
+    ]
+    assert not ProfileChangeNotification.objects.exists()
+
+
+def test_failed_notification_is_retried_before_the_later_ones(webhook_receiver):
+    failing_service = create_webhook_service(webhook_receiver, path="/a")
+    other_service = create_webhook_service(webhook_receiver, path="/b")
+    profiles = [connected_profile(failing_service, other_service) for _ in range(2)]
+    for profile in profiles:
+        enqueue_profile_change(profile, ["first_name"])
+    webhook_receiver.failure_statuses = {"/a": [500]}
+
+    result = dispatch_profile_changes()
+
+    assert result.failed == 1
+    assert webhook_receiver.payloads("/a") == []
+    assert len(webhook_receiver.payloads("/b")) == 2
+    failed, waiting = ProfileChangeNotification.objects.filter(service=failing_service)
+    assert failed.attempts == 1
+    assert failed.next_attempt_at > timezone.now()
+    assert "500" in failed.last_error
+    assert waiting.attempts == 0
+
+    assert dispatch_profile_changes().delivered == 0
+
+    ProfileChangeNotification.objects.update(next_attempt_at=timezone.now())
+    dispatch_profile_changes()
+    assert [payload["profileId"] for payload in webhook_receiver.payloads("/a")] == [
+        str(profile.pk) for profile in profiles
+    ]
+    assert not ProfileChangeNotification.objects.exists()
+
+
+def test_notification_is_given_up_after_max_attempts(webhook_receiver):
+    service = create_webhook_service(webhook_receiver)
+    enqueue_profile_change(connected_profile(service), ["first_name"])
+    webhook_receiver.failure_statuses = {"/a": [500, 500]}
+
+    dispatch_profile_changes(max_attempts=2)
+    ProfileChangeNotification.objects.update(next_attempt_at=timezone.now())
+    dispatch_profile_changes(max_attempts=2)
+
+    notification = ProfileChangeNotification.objects.get()
+    assert notification.attempts == 2
+    assert notification.next_attempt_at is None
+
+
+def test_service_locked_by_another_dispatcher_is_skipped(webhook_receiver):
+    locked_service = create_webhook_service(webhook_receiver, path="/a")
+    other_service = create_webhook_service(webhook_receiver, path="/b")
+    enqueue_profile_change(
+        connected_profile(locked_service, other_service), ["first_name"]
+    )
+    other_dispatcher = connections.create_connection("default")
+    try:
+        with other_dispatcher.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_lock(%s, %s)",
+                [DISPATCH_LOCK_KEY, locked_service.pk],
+            )
+
+        result = dispatch_profile_changes()
+    finally:
+        other_dispatcher.close()
+
+    assert result.delivered == 1
+    assert webhook_receiver.payloads("/a") == []
+    assert ProfileChangeNotification.objects.get().service == locked_service
+
+    assert dispatch_profile_changes().delivered == 1
+    assert len(webhook_receiver.payloads("/a")) == 1
+
+
+def test_dispatch_command_deletes_old_notifications_given_up(webhook_receiver):
+    service = create_webhook_service(webhook_receiver)
+    profile = connected_profile(service)
+    for days in (31, 29):
+        enqueue_profile_change(profile, ["first_name"])
+        ProfileChangeNotification.objects.filter(next_attempt_at__isnull=False).update(
+            created_at=timezone.now() - timedelta(days=days), next_attempt_at=None
+        )
+
+    call_command("dispatch_profile_changes", "--once", "--keep-given-up-days=30")
+
+    remaining = ProfileChangeNotification.objects.get()
+    assert remaining.created_at > timezone.now() - timedelta(days=30)
+
+
+def test_dispatch_command_delivers_pending_notifications_once(webhook_receiver):
+    service = create_webhook_service(webhook_receiver)
+    enqueue_profile_change(connected_profile(service), ["first_name"])
+
+    call_command("dispatch_profile_changes", "--once")
+
+    assert len(webhook_receiver.payloads("/a")) == 1
+    assert not ProfileChangeNotification.objects.exists()
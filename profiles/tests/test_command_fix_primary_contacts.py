@@ -0,0 +1,58 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+
+from profiles.models import Address, Email, Phone
+
+from .factories import AddressFactory, EmailFactory, PhoneFactory, ProfileFactory
+
+
+def drop_unique_primary_constraint(model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DROP INDEX {model._meta.app_label}_{model._meta.model_name}_unique_primary"
+        )
+
+
+def create_profile_with_two_primary_contacts_of_each_type():
+    profile = ProfileFactory()
+    for model, factory in (
+        (Email, EmailFactory),
+        (Phone, PhoneFactory),
+        (Address, AddressFactory),
+    ):
+        drop_unique_primary_constraint(model)
+        factory(profile=profile, primary=True)
+        factory(profile=profile, primary=False)
+        factory(profile=profile, primary=True)
+    return profile
+
+
+def test_clears_the_primary_flag_of_all_but_the_first_primary_contact():
+    profile = create_profile_with_two_primary_contacts_of_each_type()
+    other_profile = ProfileFactory()
+    EmailFactory(profile=other_profile, primary=True)
+    out = io.StringIO()
+
+    call_command("fix_primary_contacts", stdout=out)
+
+    assert "Cleared the primary flag of 1 emails" in out.getvalue()
+    for related_name in ("emails", "phones", "addresses"):
+        contacts = getattr(profile, related_name).order_by("id")
+        assert list(contacts.values_list("primary", flat=True)) == [
+            True,
+            False,
+            False,
+        ]
+    assert other_profile.emails.get().primary
+
+
+def test_dry_run_does_not_change_anything():
+    profile = create_profile_with_two_primary_contacts_of_each_type()
+    out = io.StringIO()
+
+    call_command("fix_primary_contacts", "--dry-run", stdout=out)
+
+    assert "Would clear the primary flag of 1 phones" in out.getvalue()
+    assert profile.phones.filter(primary=True).count() == 2
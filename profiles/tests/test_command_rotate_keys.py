@@ -4,6 +4,7 @@ import math
 import pytest
 from django.core.management import CommandError, call_command
 from django.db.models import Model
+from encrypted_fields.fields import EncryptedFieldMixin
 
 from profiles.management.commands.rotate_keys import Command as RotateKeysCommand
 from profiles.models import (
@@ -24,6 +25,23 @@ OLD_ENCRYPTION_KEY = "0123456789abcdef0123456789abcdef0123456789abcdef0123456789
 NEW_ENCRYPTION_KEY = "fedcba9876543210fedcba9876543210fedcba9876543210fedcba9876543210"
 
 
+def decrypt_all(queryset):
+    """
+    Load the objects and decrypt all of their encrypted fields.
+
+    Encrypted fields are decrypted lazily on access, so the values
+    need to be read to find out whether they can be decrypted.
+    """
+    encrypted_fields = [
+        field
+        for field in queryset.model._meta.get_fields(include_parents=True)
+        if isinstance(field, EncryptedFieldMixin)
+    ]
+    for obj in queryset:
+        for field in encrypted_fields:
+            getattr(obj, field.attname)
+
+
 @pytest.fixture(autouse=True)
 def setup(settings):
     # Need at least two encryption keys for the checks to pass.
@@ -151,7 +169,7 @@ def test_command_happy_day(
 
     # These should NOT cause any errors.
     for model in all_encrypted_models:
-        list(model.objects.all())
+        decrypt_all(model.objects.all())
 
     # Try the other way around and use the old key instead.
     new_keys = reset_field_encryption_keys(OLD_ENCRYPTION_KEY)
@@ -160,7 +178,7 @@ def test_command_happy_day(
     # These SHOULD cause a ValueError.
     for model in all_encrypted_models:
         with pytest.raises(ValueError, match="AES Key incorrect or data is corrupted"):
-            list(model.objects.all())
+            decrypt_all(model.objects.all())
 
 
 @pytest.mark.django_db
@@ -194,11 +212,11 @@ def test_command_dry_run_mode(
     # No changes should've been made, so only the old encryption key should work.
     reset_field_encryption_keys(OLD_ENCRYPTION_KEY)
     for model in all_encrypted_models:
-        list(model.objects.all())
+        decrypt_all(model.objects.all())
     reset_field_encryption_keys(NEW_ENCRYPTION_KEY)
     for model in all_encrypted_models:
         with pytest.raises(ValueError, match="AES Key incorrect or data is corrupted"):
-            list(model.objects.all())
+            decrypt_all(model.objects.all())
 
 
 @pytest.mark.django_db
@@ -279,13 +297,13 @@ def test_rotate_keys_for_model(reset_field_encryption_keys, command):
     reset_field_encryption_keys(NEW_ENCRYPTION_KEY)
 
     # This should NOT cause any errors.
-    list(SensitiveData.objects.all())
+    decrypt_all(SensitiveData.objects.all())
 
     reset_field_encryption_keys(OLD_ENCRYPTION_KEY)
 
     # This SHOULD cause a ValueError.
     with pytest.raises(ValueError, match="AES Key incorrect or data is corrupted"):
-        list(SensitiveData.objects.all())
+        decrypt_all(SensitiveData.objects.all())
 
 
 @pytest.mark.parametrize("batch_size", [1, 7, 10, 100])
@@ -341,15 +359,15 @@ def test_process_batch(reset_field_encryption_keys, command):
     # The processed objects should decrypt just fine with the new encryption key
     # while the non-processed ones should cause an error.
     reset_field_encryption_keys(NEW_ENCRYPTION_KEY)
-    list(SensitiveData.objects.filter(pk__in=ids_to_process))
+    decrypt_all(SensitiveData.objects.filter(pk__in=ids_to_process))
     with pytest.raises(ValueError, match="AES Key incorrect or data is corrupted"):
-        list(SensitiveData.objects.filter(pk__in=ids_to_ignore))
+        decrypt_all(SensitiveData.objects.filter(pk__in=ids_to_ignore))
 
     # Do the same assertion but inverted, with the old encryption key.
     reset_field_encryption_keys(OLD_ENCRYPTION_KEY)
-    list(SensitiveData.objects.filter(pk__in=ids_to_ignore))
+    decrypt_all(SensitiveData.objects.filter(pk__in=ids_to_ignore))
     with pytest.raises(ValueError, match="AES Key incorrect or data is corrupted"):
-        list(SensitiveData.objects.filter(pk__in=ids_to_process))
+        decrypt_all(SensitiveData.objects.filter(pk__in=ids_to_process))
 
 
 @pytest.mark.django_db
@@ -374,11 +392,11 @@ def test_process_batch_dry_run(reset_field_encryption_keys, command):
     # No changes should've been made, to the processed objects should
     # decrypt with the old encryption key only.
     reset_field_encryption_keys(OLD_ENCRYPTION_KEY)
-    list(SensitiveData.objects.filter(pk__in=ids))
+    decrypt_all(SensitiveData.objects.filter(pk__in=ids))
 
     reset_field_encryption_keys(NEW_ENCRYPTION_KEY)
     with pytest.raises(ValueError, match="AES Key incorrect or data is corrupted"):
-        list(SensitiveData.objects.filter(pk__in=ids))
+        decrypt_all(SensitiveData.objects.filter(pk__in=ids))
 
 
 @pytest.mark.parametrize(
@@ -1,6 +1,8 @@
 import uuid
 
 import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 from graphql_relay.node.node import from_global_id
 from guardian.shortcuts import assign_perm
 
@@ -14,7 +16,7 @@ from profiles.models import (
     VerifiedPersonalInformationPermanentForeignAddress,
     VerifiedPersonalInformationTemporaryAddress,
 )
-from profiles.tests.factories import EmailFactory
+from profiles.tests.factories import EmailFactory, VerifiedPersonalInformationFactory
 
 from .conftest import (
     VERIFIED_PERSONAL_INFORMATION_ADDRESS_FIELD_NAMES,
@@ -169,6 +171,33 @@ def test_existing_profile_with_verified_personal_information_is_updated(
     )
 
 
+def test_unchanged_profile_and_verified_personal_information_are_not_written(
+    user_gql_client,
+):
+    input_data = generate_input_data(uuid.uuid1())
+    execute_successful_mutation(input_data, user_gql_client)
+    input_data["profile"]["verifiedPersonalInformation"]["permanentAddress"][
+        "postOffice"
+    ] = "New City"
+
+    with CaptureQueriesContext(connection) as context:
+        profile = execute_successful_mutation(input_data, user_gql_client)
+
+    writes = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith(('INSERT INTO "profiles_', 'UPDATE "profiles_'))
+    ]
+    assert len(writes) == 1
+    assert writes[0].startswith(
+        'UPDATE "profiles_verifiedpersonalinformationpermanentaddress" '
+        'SET "post_office" = '
+    )
+    permanent_address = profile.verified_personal_information.permanent_address
+    assert permanent_address.post_office == "New City"
+    assert permanent_address.street_address == "Permanent Street 1"
+
+
 def test_all_basic_fields_can_be_set_to_null(user_gql_client):
     input_data = {
         "userId": "03117666-117D-4F6B-80B1-A3A92B389711",
@@ -460,6 +489,33 @@ def test_enable_existing_disabled_service_connection(
     )
 
 
+def test_national_identification_number_used_by_another_profile_causes_a_data_conflict_error(  # noqa: E501
+    user_gql_client,
+):
+    VerifiedPersonalInformationFactory(national_identification_number="220202A1234")
+    input_data = generate_input_data(uuid.uuid1())
+
+    executed = execute_mutation(input_data, user_gql_client)
+
+    assert_match_error_code(executed, "DATA_CONFLICT_ERROR")
+    assert Profile.objects.count() == 1
+
+
+def test_other_integrity_errors_are_not_reported_as_data_conflicts(
+    user_gql_client, mocker
+):
+    mocker.patch.object(
+        VerifiedPersonalInformation.objects,
+        "update_or_create_if_changed",
+        side_effect=IntegrityError("other constraint"),
+    )
+    input_data = generate_input_data(uuid.uuid1())
+
+    executed = execute_mutation(input_data, user_gql_client)
+
+    assert_match_error_code(executed, "GENERAL_ERROR")
+
+
 @pytest.mark.parametrize(
     "field_name",
     [
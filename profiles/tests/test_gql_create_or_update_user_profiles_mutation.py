@@ -0,0 +1,215 @@
+import uuid
+
+from django.db import IntegrityError
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.tests.asserts import assert_match_error_code
+from profiles.helpers import to_global_id
+from profiles.models import Profile, VerifiedPersonalInformation
+
+from .factories import (
+    EmailFactory,
+    ProfileFactory,
+    VerifiedPersonalInformationFactory,
+)
+
+QUERY = """
+    mutation createOrUpdateUserProfiles(
+        $input: CreateOrUpdateUserProfilesMutationInput!
+    ) {
+        createOrUpdateUserProfiles(input: $input) {
+            results {
+                userId
+                profile {
+                    id
+                }
+                errors {
+                    code
+                    message
+                }
+            }
+        }
+    }
+"""
+
+
+def execute_mutation(inputs, gql_client, permission=True):
+    if permission:
+        assign_perm("profiles.manage_verified_personal_information", gql_client.user)
+
+    return gql_client.execute(QUERY, variables={"input": {"profiles": inputs}})
+
+
+def execute_successful_mutation(inputs, gql_client):
+    executed = execute_mutation(inputs, gql_client)
+
+    assert "errors" not in executed
+    return executed["data"]["createOrUpdateUserProfiles"]["results"]
+
+
+def generate_input_data(user_id, index=0, **overrides):
+    return {
+        "userId": str(user_id),
+        "profile": {
+            "firstName": f"John {index}",
+            "lastName": "Smith",
+            "verifiedPersonalInformation": {
+                "firstName": f"John VPI {index}",
+                "lastName": "Smith VPI",
+                "nationalIdentificationNumber": f"010199-{index:03}X",
+                "permanentAddress": {
+                    "streetAddress": f"Permanent Street {index}",
+                    "postalCode": "12345",
+                    "postOffice": "Helsinki",
+                },
+            },
+            "primaryEmail": {"email": f"john{index}@example.com", "verified": True},
+        },
+        **overrides,
+    }
+
+
+def test_manage_verified_personal_information_permission_is_needed(user_gql_client):
+    executed = execute_mutation(
+        [generate_input_data(uuid.uuid1())], user_gql_client, permission=False
+    )
+
+    assert_match_error_code(executed, "PERMISSION_DENIED_ERROR")
+    assert Profile.objects.count() == 0
+
+
+def test_profiles_are_created_and_updated(
+    user_gql_client, service, service_client_id_factory
+):
+    service_client_id = service_client_id_factory(service=service)
+    existing_profile = ProfileFactory()
+    VerifiedPersonalInformationFactory(profile=existing_profile)
+    old_email = EmailFactory(profile=existing_profile, primary=True)
+    user_ids = [uuid.uuid1(), existing_profile.user.uuid, uuid.uuid1()]
+    inputs = [
+        generate_input_data(user_id, index, serviceClientId=service_client_id.client_id)
+        for index, user_id in enumerate(user_ids)
+    ]
+
+    results = execute_successful_mutation(inputs, user_gql_client)
+
+    assert [result["userId"] for result in results] == [str(i) for i in user_ids]
+    for index, (result, user_id) in enumerate(zip(results, user_ids, strict=True)):
+        assert result["errors"] == []
+        profile = Profile.objects.get(user__uuid=user_id)
+        assert result["profile"]["id"] == to_global_id("ProfileNode", profile.pk)
+        assert profile.first_name == f"John {index}"
+        assert profile.last_name == "Smith"
+        vpi = profile.verified_personal_information
+        assert vpi.first_name == f"John VPI {index}"
+        assert vpi.national_identification_number == f"010199-{index:03}X"
+        assert vpi.permanent_address.street_address == f"Permanent Street {index}"
+        assert profile.get_primary_email().email == f"john{index}@example.com"
+        assert profile.get_primary_email().verified is True
+        assert profile.service_connections.get().service == service
+
+    old_email.refresh_from_db()
+    assert old_email.primary is False
+    assert Profile.objects.count() == 3
+
+
+def test_unchanged_verified_personal_information_is_not_rewritten(user_gql_client):
+    user_id = uuid.uuid1()
+    execute_successful_mutation([generate_input_data(user_id)], user_gql_client)
+    vpi = VerifiedPersonalInformation.objects.get()
+    encrypted_nin = VerifiedPersonalInformation.objects.values_list(
+        "_national_identification_number_data", flat=True
+    ).get()
+
+    results = execute_successful_mutation(
+        [generate_input_data(user_id)], user_gql_client
+    )
+
+    assert results[0]["errors"] == []
+    assert VerifiedPersonalInformation.objects.get().pk == vpi.pk
+    assert (
+        VerifiedPersonalInformation.objects.values_list(
+            "_national_identification_number_data", flat=True
+        ).get()
+        == encrypted_nin
+    )
+
+
+def test_invalid_inputs_get_errors_and_the_others_are_saved(user_gql_client):
+    user_id = uuid.uuid1()
+    inputs = [
+        generate_input_data(uuid.uuid1(), 0, serviceClientId="not_existing"),
+        generate_input_data(user_id, 1),
+        generate_input_data(user_id, 2),
+        generate_input_data(uuid.uuid1(), 3),
+    ]
+    inputs[3]["profile"]["primaryEmail"]["email"] = "not_an_email"
+
+    results = execute_successful_mutation(inputs, user_gql_client)
+
+    assert [[error["code"] for error in result["errors"]] for result in results] == [
+        ["OBJECT_DOES_NOT_EXIST_ERROR"],
+        [],
+        ["DATA_CONFLICT_ERROR"],
+        ["VALIDATION_ERROR"],
+    ]
+    assert [result["profile"] is None for result in results] == [
+        True,
+        False,
+        True,
+        True,
+    ]
+    assert Profile.objects.get().user.uuid == user_id
+
+
+def test_failing_input_does_not_prevent_saving_the_rest_of_the_chunk(
+    user_gql_client, settings
+):
+    settings.CREATE_OR_UPDATE_USER_PROFILES_CHUNK_SIZE = 2
+    # The national identification number is already used by another profile
+    VerifiedPersonalInformationFactory(national_identification_number="010199-001X")
+    user_ids = [uuid.uuid1() for _ in range(3)]
+    inputs = [
+        generate_input_data(user_id, index) for index, user_id in enumerate(user_ids)
+    ]
+
+    results = execute_successful_mutation(inputs, user_gql_client)
+
+    assert [[error["code"] for error in result["errors"]] for result in results] == [
+        [],
+        ["DATA_CONFLICT_ERROR"],
+        [],
+    ]
+    assert set(
+        Profile.objects.filter(user__uuid__in=user_ids).values_list(
+            "user__uuid", flat=True
+        )
+    ) == {user_ids[0], user_ids[2]}
+
+
+def test_too_many_inputs_cause_a_validation_error(user_gql_client, settings):
+    settings.CREATE_OR_UPDATE_USER_PROFILES_MAX_INPUTS = 1
+    inputs = [generate_input_data(uuid.uuid1(), index) for index in range(2)]
+
+    executed = execute_mutation(inputs, user_gql_client)
+
+    assert_match_error_code(executed, "VALIDATION_ERROR")
+    assert Profile.objects.count() == 0
+
+
+def test_other_integrity_errors_are_not_reported_as_data_conflicts(
+    user_gql_client, mocker
+):
+    mocker.patch(
+        "profiles.schema.upsert_user_profiles",
+        side_effect=IntegrityError("other constraint"),
+    )
+    mocker.patch.object(
+        VerifiedPersonalInformation.objects,
+        "update_or_create_if_changed",
+        side_effect=IntegrityError("other constraint"),
+    )
+
+    executed = execute_mutation([generate_input_data(uuid.uuid1())], user_gql_client)
+
+    assert_match_error_code(executed, "GENERAL_ERROR")
@@ -0,0 +1,77 @@
+import pytest
+from guardian.shortcuts import assign_perm
+
+from services.tests.factories import AllowedDataFieldFactory, ServiceConnectionFactory
+
+from .factories import VerifiedPersonalInformationFactory
+
+QUERY = """
+    query getProfiles($nins: [String!]!) {
+        profilesByNationalIdentificationNumbers(nins: $nins) {
+            firstName
+        }
+    }
+"""
+
+
+@pytest.fixture
+def staff_gql_client(user_gql_client, group, service):
+    service.allowed_data_fields.add(AllowedDataFieldFactory(field_name="name"))
+    user_gql_client.user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    return user_gql_client
+
+
+def test_normal_user_can_not_query_profiles_by_nins(user_gql_client, service):
+    executed = user_gql_client.execute(
+        QUERY, variables={"nins": ["010199-123A"]}, service=service
+    )
+
+    assert executed["errors"][0]["extensions"]["code"] == "PERMISSION_DENIED_ERROR"
+
+
+@pytest.mark.parametrize("has_needed_permission", [True, False])
+def test_staff_user_can_query_profiles_by_nins(
+    has_needed_permission, staff_gql_client, group, service
+):
+    vpis = VerifiedPersonalInformationFactory.create_batch(3)
+    for vpi in vpis:
+        ServiceConnectionFactory(profile=vpi.profile, service=service)
+    if has_needed_permission:
+        assign_perm("can_view_verified_personal_information", group, service)
+
+    nins = [
+        vpis[2].national_identification_number,
+        "010199-123A",
+        vpis[0].national_identification_number,
+        vpis[2].national_identification_number,
+    ]
+    executed = staff_gql_client.execute(
+        QUERY, variables={"nins": nins}, service=service
+    )
+
+    assert "errors" not in executed
+    if has_needed_permission:
+        assert executed["data"] == {
+            "profilesByNationalIdentificationNumbers": [
+                {"firstName": vpis[2].profile.first_name},
+                {"firstName": vpis[0].profile.first_name},
+            ]
+        }
+    else:
+        assert executed["data"] == {"profilesByNationalIdentificationNumbers": []}
+
+
+def test_profiles_without_connection_to_service_are_not_returned(
+    staff_gql_client, group, service
+):
+    assign_perm("can_view_verified_personal_information", group, service)
+    vpi = VerifiedPersonalInformationFactory()
+
+    executed = staff_gql_client.execute(
+        QUERY,
+        variables={"nins": [vpi.national_identification_number]},
+        service=service,
+    )
+
+    assert executed["data"] == {"profilesByNationalIdentificationNumbers": []}
@@ -0,0 +1,80 @@
+import uuid
+
+import pytest
+from guardian.shortcuts import assign_perm
+
+from services.tests.factories import AllowedDataFieldFactory, ServiceConnectionFactory
+
+from .factories import ProfileFactory
+
+QUERY = """
+    query getProfiles($userIds: [UUID!]!) {
+        profilesByUserIds(userIds: $userIds) {
+            firstName
+        }
+    }
+"""
+
+
+@pytest.fixture
+def staff_gql_client(user_gql_client, group, service):
+    service.allowed_data_fields.add(AllowedDataFieldFactory(field_name="name"))
+    user_gql_client.user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    return user_gql_client
+
+
+def test_normal_user_can_not_query_profiles_by_user_ids(user_gql_client, service):
+    executed = user_gql_client.execute(
+        QUERY, variables={"userIds": [str(uuid.uuid4())]}, service=service
+    )
+
+    assert executed["errors"][0]["extensions"]["code"] == "PERMISSION_DENIED_ERROR"
+
+
+def test_staff_user_can_query_profiles_by_user_ids(staff_gql_client, service):
+    profiles = ProfileFactory.create_batch(3)
+    for profile in profiles:
+        ServiceConnectionFactory(profile=profile, service=service)
+
+    user_ids = [
+        str(profiles[2].user.uuid),
+        str(uuid.uuid4()),
+        str(profiles[0].user.uuid),
+        str(profiles[2].user.uuid),
+    ]
+    executed = staff_gql_client.execute(
+        QUERY, variables={"userIds": user_ids}, service=service
+    )
+
+    assert executed["data"] == {
+        "profilesByUserIds": [
+            {"firstName": profiles[2].first_name},
+            {"firstName": profiles[0].first_name},
+        ]
+    }
+
+
+def test_profiles_without_connection_to_service_are_not_returned(
+    staff_gql_client, service
+):
+    profile = ProfileFactory()
+
+    executed = staff_gql_client.execute(
+        QUERY, variables={"userIds": [str(profile.user.uuid)]}, service=service
+    )
+
+    assert executed["data"] == {"profilesByUserIds": []}
+
+
+def test_number_of_user_ids_is_limited(staff_gql_client, service, settings):
+    settings.QUERY_BY_USER_IDS_MAX_INPUTS = 2
+
+    executed = staff_gql_client.execute(
+        QUERY,
+        variables={"userIds": [str(uuid.uuid4()) for _ in range(3)]},
+        service=service,
+    )
+
+    assert executed["errors"][0]["extensions"]["code"] == "VALIDATION_ERROR"
+    assert executed["data"] == {"profilesByUserIds": None}
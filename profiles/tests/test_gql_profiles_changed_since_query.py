@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.tests.asserts import assert_match_error_code
+from services.tests.factories import ServiceConnectionFactory
+
+from ..helpers import to_global_id
+from .factories import EmailFactory, ProfileFactory
+
+QUERY = """
+    query getChangedProfiles($since: DateTime!, $after: String, $first: Int) {
+        profilesChangedSince(since: $since, after: $after, first: $first) {
+            edges {
+                node {
+                    id
+                }
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_lag(settings):
+    settings.PROFILES_CHANGED_SINCE_LAG_SECONDS = 0
+
+
+@pytest.fixture
+def staff_gql_client(user_gql_client, group, service):
+    user_gql_client.user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+    return user_gql_client
+
+
+def query_changed_profiles(gql_client, service, since, **variables):
+    executed = gql_client.execute(
+        QUERY,
+        variables={"since": since.isoformat(), **variables},
+        service=service,
+    )
+    assert "errors" not in executed
+    return executed["data"]["profilesChangedSince"]
+
+
+def node_ids(result):
+    return [edge["node"]["id"] for edge in result["edges"]]
+
+
+def test_normal_user_can_not_query_changed_profiles(user_gql_client, service):
+    executed = user_gql_client.execute(
+        QUERY, variables={"since": timezone.now().isoformat()}, service=service
+    )
+
+    assert_match_error_code(executed, "PERMISSION_DENIED_ERROR")
+
+
+def test_changed_profiles_are_paged_in_order(staff_gql_client, service):
+    profiles = sorted(ProfileFactory.create_batch(5), key=lambda profile: profile.pk)
+    for profile in profiles:
+        ServiceConnectionFactory(profile=profile, service=service)
+    ServiceConnectionFactory()
+    since = timezone.now() - timedelta(minutes=1)
+
+    first_page = query_changed_profiles(staff_gql_client, service, since, first=3)
+    second_page = query_changed_profiles(
+        staff_gql_client,
+        service,
+        since,
+        first=3,
+        after=first_page["pageInfo"]["endCursor"],
+    )
+    last_page = query_changed_profiles(
+        staff_gql_client, service, since, after=second_page["pageInfo"]["endCursor"]
+    )
+
+    expected_ids = [to_global_id("ProfileNode", profile.pk) for profile in profiles]
+    assert node_ids(first_page) == expected_ids[:3]
+    assert first_page["pageInfo"]["hasNextPage"] is True
+    assert node_ids(second_page) == expected_ids[3:]
+    assert second_page["pageInfo"]["hasNextPage"] is False
+    assert node_ids(last_page) == []
+    assert last_page["pageInfo"]["endCursor"] == second_page["pageInfo"]["endCursor"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_only_profiles_changed_after_since_are_returned(staff_gql_client, service):
+    profiles = ProfileFactory.create_batch(2)
+    for profile in profiles:
+        ServiceConnectionFactory(profile=profile, service=service)
+    since = timezone.now()
+
+    EmailFactory(profile=profiles[1])
+    result = query_changed_profiles(staff_gql_client, service, since)
+
+    assert node_ids(result) == [to_global_id("ProfileNode", profiles[1].pk)]
+
+
+def test_changes_are_returned_only_after_the_lag(staff_gql_client, service, settings):
+    settings.PROFILES_CHANGED_SINCE_LAG_SECONDS = 60
+    profile = ProfileFactory()
+    ServiceConnectionFactory(profile=profile, service=service)
+    since = timezone.now() - timedelta(minutes=5)
+
+    result = query_changed_profiles(staff_gql_client, service, since)
+    assert node_ids(result) == []
+    assert result["pageInfo"]["endCursor"] is None
+
+    settings.PROFILES_CHANGED_SINCE_LAG_SECONDS = 0
+    result = query_changed_profiles(staff_gql_client, service, since)
+    assert node_ids(result) == [to_global_id("ProfileNode", profile.pk)]
+
+
+def test_invalid_cursor_is_a_validation_error(staff_gql_client, service):
+    executed = staff_gql_client.execute(
+        QUERY,
+        variables={"since": timezone.now().isoformat(), "after": "invalid"},
+        service=service,
+    )
+
+    assert_match_error_code(executed, "VALIDATION_ERROR")
@@ -8,8 +8,11 @@ from guardian.shortcuts import assign_perm
 from open_city_profile.tests import to_graphql_name
 from open_city_profile.tests.asserts import assert_match_error_code
 from profiles.enums import AddressType, EmailType, PhoneType
+from profiles.models import Profile
+from profiles.schema import ProfileFilter, is_connected_to_service
 from services.tests.factories import AllowedDataFieldFactory, ServiceConnectionFactory
 
+from ..helpers import to_global_id
 from .factories import (
     AddressFactory,
     EmailFactory,
@@ -694,6 +697,70 @@ def test_staff_user_can_filter_profiles_by_addresses(user_gql_client, group, ser
     assert executed["data"] == expected_data
 
 
+def test_staff_user_can_combine_contact_filters_without_duplicate_profiles(
+    user_gql_client, group, service
+):
+    profile_1, profile_2, profile_3 = ProfileFactory.create_batch(3)
+    # Every filter matches any contact of the profile, not necessarily the same one
+    EmailFactory(profile=profile_1, primary=True, email="first@example.com")
+    EmailFactory(profile=profile_1, primary=False, email="second@example.com")
+    PhoneFactory(profile=profile_1, primary=True)
+    PhoneFactory(profile=profile_1, primary=False)
+    EmailFactory(profile=profile_2, primary=True, email="other@example.com")
+    PhoneFactory(profile=profile_2, primary=True)
+    EmailFactory(profile=profile_3, primary=True, email="first@example.org")
+    for profile in (profile_1, profile_2, profile_3):
+        ServiceConnectionFactory(profile=profile, service=service)
+    user = user_gql_client.user
+    user.groups.add(group)
+    assign_perm("can_view_profiles", group, service)
+
+    query = """
+        query getProfiles($email: String, $emailPrimary: Boolean) {
+            profiles(
+                emails_Email: $email
+                emails_Primary: $emailPrimary
+                phones_Primary: false
+            ) {
+                count
+                totalCount
+                edges {
+                    node {
+                        id
+                    }
+                }
+            }
+        }
+    """
+
+    executed = user_gql_client.execute(
+        query,
+        variables={"email": "second@example.com", "emailPrimary": True},
+        service=service,
+    )
+
+    assert executed["data"]["profiles"]["count"] == 1
+    assert executed["data"]["profiles"]["totalCount"] == 3
+    assert [edge["node"]["id"] for edge in executed["data"]["profiles"]["edges"]] == [
+        to_global_id("ProfileNode", profile_1.pk)
+    ]
+
+
+def test_contact_filters_and_service_scoping_do_not_join(service):
+    queryset = ProfileFilter(
+        data={
+            "emails__email": "example",
+            "phones__primary": True,
+            "addresses__city": "Helsinki",
+        },
+        queryset=Profile.objects.filter(is_connected_to_service(service)),
+    ).qs
+
+    sql = str(queryset.query)
+    assert "JOIN" not in sql
+    assert sql.count("EXISTS") == 4
+
+
 # Profiles are ordered by their id field if no other ordering is requested
 @pytest.mark.parametrize(
     "order_by,expected_order",
@@ -6,6 +6,7 @@ from guardian.shortcuts import assign_perm
 from open_city_profile.tests.asserts import assert_match_error_code
 
 from ..helpers import to_global_id
+from .factories import ProfileFactory
 
 QUERY = """
     query ($userId: UUID!, $serviceClientId: String!)
@@ -142,3 +143,112 @@ def test_requires_view_service_connection_permission(
 
     assert executed["data"] == {"serviceConnectionWithUserId": None}
     assert_match_error_code(executed, "PERMISSION_DENIED_ERROR")
+
+
+MULTIPLE_QUERY = """
+    query ($userIds: [UUID!]!, $serviceClientId: String!)
+    {
+        serviceConnectionsWithUserIds(
+            userIds: $userIds, serviceClientId: $serviceClientId
+        ) {
+            userId
+            serviceConnection {
+                id
+                enabled
+                service {
+                    name
+                }
+            }
+        }
+    }
+"""
+
+
+def test_service_connections_of_several_users_are_returned(
+    service_client_id, service_connection_factory, user_gql_client
+):
+    assign_perm("services.view_serviceconnection", user_gql_client.user)
+    service = service_client_id.service
+    connected_profile = ProfileFactory()
+    service_connection = service_connection_factory(
+        profile=connected_profile, service=service, enabled=False
+    )
+    unconnected_profile = ProfileFactory()
+    service_connection_factory(profile=unconnected_profile)
+    user_ids = [
+        str(unconnected_profile.user.uuid),
+        str(connected_profile.user.uuid),
+        str(uuid.uuid4()),
+        str(connected_profile.user.uuid),
+    ]
+
+    executed = user_gql_client.execute(
+        MULTIPLE_QUERY,
+        variables={
+            "userIds": user_ids,
+            "serviceClientId": service_client_id.client_id,
+        },
+    )
+
+    assert executed["data"] == {
+        "serviceConnectionsWithUserIds": [
+            {"userId": user_ids[0], "serviceConnection": None},
+            {
+                "userId": user_ids[1],
+                "serviceConnection": {
+                    "id": to_global_id("ServiceConnectionType", service_connection.id),
+                    "enabled": False,
+                    "service": {"name": service.name},
+                },
+            },
+            {"userId": user_ids[2], "serviceConnection": None},
+        ]
+    }
+
+
+def test_service_connections_with_unknown_service_is_an_error(profile, user_gql_client):
+    assign_perm("services.view_serviceconnection", user_gql_client.user)
+
+    executed = user_gql_client.execute(
+        MULTIPLE_QUERY,
+        variables={
+            "userIds": [str(profile.user.uuid)],
+            "serviceClientId": "unknown-client-id",
+        },
+    )
+
+    assert executed["data"] == {"serviceConnectionsWithUserIds": None}
+    assert_match_error_code(executed, "SERVICE_DOES_NOT_EXIST_ERROR")
+
+
+def test_service_connections_require_view_service_connection_permission(
+    profile, service_client_id, user_gql_client
+):
+    executed = user_gql_client.execute(
+        MULTIPLE_QUERY,
+        variables={
+            "userIds": [str(profile.user.uuid)],
+            "serviceClientId": service_client_id.client_id,
+        },
+    )
+
+    assert executed["data"] == {"serviceConnectionsWithUserIds": None}
+    assert_match_error_code(executed, "PERMISSION_DENIED_ERROR")
+
+
+def test_number_of_service_connection_user_ids_is_limited(
+    service_client_id, user_gql_client, settings
+):
+    settings.QUERY_BY_USER_IDS_MAX_INPUTS = 2
+    assign_perm("services.view_serviceconnection", user_gql_client.user)
+
+    executed = user_gql_client.execute(
+        MULTIPLE_QUERY,
+        variables={
+            "userIds": [str(uuid.uuid4()) for _ in range(3)],
+            "serviceClientId": service_client_id.client_id,
+        },
+    )
+
+    assert executed["data"] == {"serviceConnectionsWithUserIds": None}
+    assert_match_error_code(executed, "VALIDATION_ERROR")
@@ -928,6 +928,62 @@ def test_can_not_remove_phone_of_another_profile(user_gql_client):
     assert Phone.objects.filter(id=another_phone.id).exists()
 
 
+def test_the_last_phone_set_primary_becomes_the_primary_phone(user_gql_client):
+    profile = ProfileWithPrimaryEmailFactory(user=user_gql_client.user)
+    old_primary_phone = PhoneFactory(profile=profile, primary=True)
+    phone = PhoneFactory(profile=profile, primary=False)
+    removed_phone = PhoneFactory(profile=profile, primary=False)
+
+    executed = user_gql_client.execute(
+        PHONES_MUTATION,
+        variables={
+            "profileInput": {
+                "addPhones": [
+                    {"phone": "0401111111", "phoneType": "HOME", "primary": True},
+                    {"phone": "0402222222", "phoneType": "WORK", "primary": False},
+                ],
+                "updatePhones": [
+                    {"id": to_global_id("PhoneNode", phone.id), "primary": True},
+                    {
+                        "id": to_global_id("PhoneNode", old_primary_phone.id),
+                        "phone": "0403333333",
+                    },
+                ],
+                "removePhones": [to_global_id("PhoneNode", removed_phone.id)],
+            }
+        },
+        allowed_data_fields=["phone"],
+    )
+
+    assert "errors" not in executed
+    assert set(profile.phones.values_list("phone", "primary")) == {
+        ("0401111111", False),
+        ("0402222222", False),
+        (phone.phone, True),
+        ("0403333333", False),
+    }
+
+
+def test_can_not_remove_an_email_set_primary_in_the_same_mutation(user_gql_client):
+    profile = ProfileWithPrimaryEmailFactory(user=user_gql_client.user)
+    email = EmailFactory(profile=profile, primary=False)
+    email_id = to_global_id(type="EmailNode", id=email.id)
+
+    executed = user_gql_client.execute(
+        EMAILS_MUTATION,
+        variables={
+            "profileInput": {
+                "updateEmails": [{"id": email_id, "primary": True}],
+                "removeEmails": [email_id],
+            }
+        },
+        allowed_data_fields=["email"],
+    )
+
+    assert_match_error_code(executed, "PROFILE_MUST_HAVE_PRIMARY_EMAIL")
+    assert profile.emails.filter(primary=True).count() == 1
+
+
 class TestProfileInputValidation(ExistingProfileInputValidationBase):
     def create_profile(self, user):
         return ProfileFactory(user=user)
@@ -1,4 +1,7 @@
+import uuid
+
 import pytest
+from django.db import connection
 
 app = "profiles"
 
@@ -161,3 +164,55 @@ def test_phone_number_to_not_null_migration(execute_migration_test):
         create_data,
         verify_migration,
     )
+
+
+def test_unique_national_identification_number_migration_refuses_duplicates(
+    execute_migration_test,
+):
+    def create_data(apps):
+        Profile = apps.get_model(app, "Profile")
+        VerifiedPersonalInformation = apps.get_model(app, "VerifiedPersonalInformation")
+        for _ in range(2):
+            VerifiedPersonalInformation.objects.create(
+                profile=Profile.objects.create(id=uuid.uuid4()),
+                national_identification_number="010199-001X",
+            )
+
+    with pytest.raises(RuntimeError, match="2 profiles share"):
+        execute_migration_test(
+            "0059_sensitivedata_ssn_lazy_decryption__noop",
+            "0060_unique_national_identification_number",
+            create_data,
+            lambda apps: None,
+        )
+
+    # Resolve the duplicates so that the rest of the migrations can be applied
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM profiles_verifiedpersonalinformation")
+
+
+def test_unique_primary_contacts_migration(execute_migration_test):
+    def create_data(apps):
+        Profile = apps.get_model(app, "Profile")
+        profile = Profile.objects.create(id=uuid.uuid4())
+        for model_name in ("Email", "Phone", "Address"):
+            model = apps.get_model(app, model_name)
+            for primary in (True, False, True):
+                model.objects.create(profile=profile, primary=primary)
+        return (profile.pk,)
+
+    def verify_migration(apps, profile_pk):
+        for model_name in ("Email", "Phone", "Address"):
+            model = apps.get_model(app, model_name)
+            assert list(
+                model.objects.filter(profile_id=profile_pk)
+                .order_by("id")
+                .values_list("primary", flat=True)
+            ) == [True, False, False]
+
+    execute_migration_test(
+        "0060_unique_national_identification_number",
+        "0061_unique_primary_contacts",
+        create_data,
+        verify_migration,
+    )
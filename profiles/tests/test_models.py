@@ -3,11 +3,20 @@ from datetime import timedelta
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
 from django.test import override_settings
 
 from services.tests.factories import ServiceConnectionFactory
 
-from ..models import Email, Profile, TemporaryReadAccessToken
+from ..models import (
+    NATIONAL_IDENTIFICATION_NUMBER_UNIQUE_CONSTRAINT,
+    Email,
+    Profile,
+    SensitiveData,
+    TemporaryReadAccessToken,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+)
 from .factories import (
     AddressFactory,
     EmailFactory,
@@ -372,16 +381,98 @@ def test_import_customer_data_with_missing_email():
     assert Profile.objects.count() == 1
 
 
+def test_get_profiles_by_national_identification_numbers(
+    django_assert_num_queries,
+):
+    vpi_1, vpi_2, _ = VerifiedPersonalInformationFactory.create_batch(3)
+    nins = [
+        vpi_1.national_identification_number,
+        vpi_2.national_identification_number,
+        "010199-123A",
+        "",
+    ]
+
+    with django_assert_num_queries(1):
+        result = Profile.get_by_national_identification_numbers(nins)
+
+    assert result == {
+        vpi_1.national_identification_number: vpi_1.profile,
+        vpi_2.national_identification_number: vpi_2.profile,
+    }
+
+
+def test_get_profiles_by_national_identification_numbers_within_queryset():
+    vpi_1, vpi_2 = VerifiedPersonalInformationFactory.create_batch(2)
+    nins = [vpi_1.national_identification_number, vpi_2.national_identification_number]
+
+    result = Profile.get_by_national_identification_numbers(
+        nins, queryset=Profile.objects.exclude(pk=vpi_1.profile.pk)
+    )
+
+    assert result == {vpi_2.national_identification_number: vpi_2.profile}
+
+
+def test_national_identification_number_must_be_unique():
+    vpi = VerifiedPersonalInformationFactory()
+
+    with pytest.raises(IntegrityError):
+        VerifiedPersonalInformationFactory(
+            national_identification_number=vpi.national_identification_number
+        )
+
+
+def test_empty_national_identification_numbers_are_allowed_for_many_profiles():
+    VerifiedPersonalInformationFactory.create_batch(
+        2, national_identification_number=""
+    )
+
+    assert (
+        VerifiedPersonalInformation.objects.filter(
+            national_identification_number__isnull=True
+        ).count()
+        == 2
+    )
+
+
+def test_empty_national_identification_number_is_looked_up_as_null():
+    empty_vpi = VerifiedPersonalInformationFactory(national_identification_number="")
+    vpi = VerifiedPersonalInformationFactory()
+
+    assert list(
+        VerifiedPersonalInformation.objects.filter(national_identification_number="")
+    ) == [empty_vpi]
+    assert list(
+        VerifiedPersonalInformation.objects.exclude(national_identification_number="")
+    ) == [vpi]
+    assert list(
+        Profile.objects.filter(
+            verified_personal_information__national_identification_number=""
+        )
+    ) == [empty_vpi.profile]
+
+
+def test_national_identification_number_unique_constraint_name():
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, VerifiedPersonalInformation._meta.db_table
+        )
+
+    assert constraints[NATIONAL_IDENTIFICATION_NUMBER_UNIQUE_CONSTRAINT]["columns"] == [
+        "national_identification_number"
+    ]
+
+
 def test_validation_should_fail_with_invalid_email():
     e = Email("!dsdsd{}{}{}{}{}{")
     with pytest.raises(ValidationError):
         e.save()
 
 
-def test_should_not_allow_two_primary_emails(profile):
-    EmailFactory(profile=profile, primary=True)
-    with pytest.raises(ValidationError):
-        EmailFactory(profile=profile, primary=True)
+@pytest.mark.parametrize("factory", [EmailFactory, PhoneFactory, AddressFactory])
+def test_should_not_allow_two_primary_contacts(profile, factory):
+    factory(profile=profile, primary=True)
+    with pytest.raises(IntegrityError):
+        factory(profile=profile, primary=True)
 
 
 def test_should_allow_changing_fields_of_an_existing_primary_email():
@@ -609,3 +700,132 @@ class TestTemporaryReadAccessTokenValidityDuration:
     def test_validity_duration_can_be_controlled_with_a_setting(self):
         token = TemporaryReadAccessToken()
         assert token.validity_duration == timedelta(minutes=60)
+
+
+def test_loaded_instance_has_no_changed_fields_when_assigned_the_same_values():
+    vpi = VerifiedPersonalInformationFactory()
+    vpi = VerifiedPersonalInformation.objects.track_changes().get(pk=vpi.pk)
+
+    vpi.first_name = vpi.first_name
+    vpi.given_name = str(vpi.given_name)
+    vpi.national_identification_number = vpi.national_identification_number
+
+    assert vpi.get_changed_fields() == []
+    assert vpi.save_if_changed() is False
+
+
+def test_only_changed_fields_are_saved(django_assert_num_queries):
+    vpi = VerifiedPersonalInformationFactory(given_name="Old")
+    vpi = VerifiedPersonalInformation.objects.track_changes().get(pk=vpi.pk)
+    vpi.given_name = "New"
+    vpi.national_identification_number = "010199-1234"
+    vpi.municipality_of_residence = vpi.municipality_of_residence
+
+    assert vpi.get_changed_fields() == [
+        "given_name",
+        "_national_identification_number_data",
+        "national_identification_number",
+    ]
+    with django_assert_num_queries(1):
+        assert vpi.save_if_changed() is True
+    assert vpi.get_changed_fields() == []
+
+    vpi = VerifiedPersonalInformation.objects.get(
+        national_identification_number="010199-1234"
+    )
+    assert vpi.given_name == "New"
+
+
+def test_changes_are_unknown_without_track_changes():
+    vpi = VerifiedPersonalInformationFactory(given_name="Old")
+    vpi = VerifiedPersonalInformation.objects.get(pk=vpi.pk)
+    vpi.given_name = "New"
+
+    assert vpi.get_changed_fields() is None
+    assert vpi.save_if_changed() is True
+    assert VerifiedPersonalInformation.objects.get(pk=vpi.pk).given_name == "New"
+
+
+def test_select_related_instances_are_tracked():
+    vpi = VerifiedPersonalInformationFactory(given_name="Old")
+    profile = (
+        Profile.objects.track_changes()
+        .select_related("verified_personal_information")
+        .get(pk=vpi.profile_id)
+    )
+    profile.verified_personal_information.given_name = "New"
+
+    assert profile.get_changed_fields() == []
+    assert profile.verified_personal_information.get_changed_fields() == ["given_name"]
+
+
+def test_new_instance_is_saved_by_save_if_changed(profile):
+    sensitive_data = SensitiveData(profile=profile, ssn="010199-1234")
+
+    assert sensitive_data.get_changed_fields() is None
+    assert sensitive_data.save_if_changed() is True
+    assert SensitiveData.objects.get(profile=profile).ssn == "010199-1234"
+
+
+def _profile_updated_at(profile):
+    return Profile.objects.values_list("updated_at", flat=True).get(pk=profile.pk)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    "factory",
+    [
+        EmailFactory,
+        PhoneFactory,
+        AddressFactory,
+        SensitiveDataFactory,
+        VerifiedPersonalInformationFactory,
+        ServiceConnectionFactory,
+    ],
+)
+def test_profile_updated_at_changes_with_related_data(profile, factory):
+    updated_at = _profile_updated_at(profile)
+
+    related = factory(profile=profile)
+    assert _profile_updated_at(profile) > updated_at
+    updated_at = _profile_updated_at(profile)
+
+    related.save()
+    assert _profile_updated_at(profile) > updated_at
+    updated_at = _profile_updated_at(profile)
+
+    related.delete()
+    assert _profile_updated_at(profile) > updated_at
+
+
+@pytest.mark.django_db(transaction=True)
+def test_profile_updated_at_changes_with_verified_personal_information_address(
+    profile,
+):
+    vpi = VerifiedPersonalInformationFactory(profile=profile)
+    updated_at = _profile_updated_at(profile)
+
+    VerifiedPersonalInformationPermanentAddress.objects.filter(
+        verified_personal_information=vpi
+    ).update(street_address="New street 1")
+
+    assert _profile_updated_at(profile) > updated_at
+
+
+@pytest.mark.django_db(transaction=True)
+def test_profile_updated_at_changes_with_the_profile(profile):
+    updated_at = _profile_updated_at(profile)
+
+    Profile.objects.filter(pk=profile.pk).update(first_name="New")
+
+    assert _profile_updated_at(profile) > updated_at
+
+
+def test_profile_updated_at_changes_once_per_transaction(profile):
+    updated_at = _profile_updated_at(profile)
+
+    EmailFactory.create_batch(3, profile=profile, primary=False)
+    profile.first_name = "New"
+    profile.save()
+
+    assert _profile_updated_at(profile) == updated_at
@@ -0,0 +1,401 @@
+import uuid
+
+import pytest
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.tests.query_budget import QueryBudgetExceededError
+from profiles.helpers import to_global_id
+from profiles.tests.gdpr.utils import patch_keycloak_token_exchange
+from services.models import Service
+from services.tests.factories import AllowedDataFieldFactory, ServiceConnectionFactory
+
+from .factories import (
+    AddressFactory,
+    EmailFactory,
+    PhoneFactory,
+    ProfileFactory,
+    SensitiveDataFactory,
+    VerifiedPersonalInformationFactory,
+)
+
+CONTACT_FIELDS = """
+    primaryEmail { email }
+    primaryPhone { phone }
+    primaryAddress { address }
+    emails { edges { node { email primary } } }
+    phones { edges { node { phone primary } } }
+    addresses { edges { node { address primary } } }
+"""
+
+
+def create_profile_with_contacts(**kwargs):
+    profile = ProfileFactory(**kwargs)
+    EmailFactory(profile=profile, primary=True)
+    EmailFactory(profile=profile, primary=False)
+    PhoneFactory(profile=profile, primary=True)
+    AddressFactory(profile=profile, primary=True)
+    SensitiveDataFactory(profile=profile)
+    VerifiedPersonalInformationFactory(profile=profile)
+    return profile
+
+
+@pytest.fixture
+def request_service(service):
+    """
+    The service of the request as it's loaded by `set_service_to_request`, with its
+    allowed data fields prefetched.
+    """
+    for field_name in ("name", "email", "phone", "address", "personalidentitycode"):
+        service.allowed_data_fields.add(AllowedDataFieldFactory(field_name=field_name))
+
+    return Service.objects.prefetch_related("allowed_data_fields").get(pk=service.pk)
+
+
+@pytest.fixture
+def staff_user_gql_client(user_gql_client, group, request_service):
+    user_gql_client.user.groups.add(group)
+    for permission in (
+        "can_view_profiles",
+        "can_manage_profiles",
+        "can_view_sensitivedata",
+        "can_manage_sensitivedata",
+        "can_view_verified_personal_information",
+    ):
+        assign_perm(permission, group, request_service)
+    return user_gql_client
+
+
+@pytest.mark.xfail(
+    strict=True,
+    raises=QueryBudgetExceededError,
+    reason="Contact connections, verified personal information and the user of "
+    "every profile in the page are queried separately",
+)
+def test_profiles_page(
+    execution_context_class, staff_user_gql_client, request_service, query_budget
+):
+    for _ in range(50):
+        ServiceConnectionFactory(
+            profile=create_profile_with_contacts(), service=request_service
+        )
+    query = f"""
+        {{
+            profiles(first: 50) {{
+                edges {{
+                    node {{
+                        firstName
+                        {CONTACT_FIELDS}
+                        verifiedPersonalInformation {{ firstName }}
+                    }}
+                }}
+            }}
+        }}
+    """
+
+    with query_budget("profiles page of 50", max_queries=8):
+        executed = staff_user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            service=request_service,
+        )
+
+    assert len(executed["data"]["profiles"]["edges"]) == 50
+
+
+def test_my_profile(
+    execution_context_class, user_gql_client, request_service, query_budget
+):
+    profile = create_profile_with_contacts(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=request_service)
+    query = f"""
+        {{
+            myProfile {{
+                firstName
+                {CONTACT_FIELDS}
+                sensitivedata {{ ssn }}
+                verifiedPersonalInformation {{
+                    firstName
+                    permanentAddress {{ streetAddress }}
+                }}
+                serviceConnections {{ edges {{ node {{ service {{ name }} }} }} }}
+            }}
+        }}
+    """
+
+    with query_budget("myProfile", max_queries=18):
+        executed = user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            service=request_service,
+            auth_token_payload={"loa": "substantial"},
+        )
+
+    assert "errors" not in executed
+
+
+@pytest.mark.xfail(
+    strict=True,
+    raises=QueryBudgetExceededError,
+    reason="Every entity is loaded and access checked with separate queries",
+)
+def test_profile_entities(
+    execution_context_class, staff_user_gql_client, request_service, query_budget
+):
+    profiles = [create_profile_with_contacts() for _ in range(10)]
+    for profile in profiles:
+        ServiceConnectionFactory(profile=profile, service=request_service)
+    query = """
+        query ($representations: [_Any!]!) {
+            _entities(representations: $representations) {
+                ... on ProfileNode {
+                    firstName
+                    primaryEmail { email }
+                }
+            }
+        }
+    """
+    variables = {
+        "representations": [
+            {"__typename": "ProfileNode", "id": to_global_id("ProfileNode", profile.pk)}
+            for profile in profiles
+        ]
+    }
+
+    with query_budget("_entities of 10 profiles", max_queries=6):
+        executed = staff_user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            variables=variables,
+            service=request_service,
+        )
+
+    assert len(executed["data"]["_entities"]) == 10
+
+
+@pytest.mark.xfail(
+    strict=True,
+    raises=QueryBudgetExceededError,
+    reason="The service of every service connection is loaded separately, and "
+    "the contacts are read twice",
+)
+def test_download_my_profile(
+    execution_context_class,
+    user_gql_client,
+    profile_service,
+    service_factory,
+    settings,
+    mocker,
+    requests_mock,
+    query_budget,
+):
+    settings.KEYCLOAK_BASE_URL = "https://localhost/auth"
+    settings.KEYCLOAK_REALM = "keycloak-realm"
+    settings.KEYCLOAK_GDPR_CLIENT_ID = "profile-gdpr-test"
+    settings.KEYCLOAK_GDPR_CLIENT_SECRET = "secret"
+    patch_keycloak_token_exchange(mocker)
+    profile = create_profile_with_contacts(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=profile_service)
+    for index in range(3):
+        service = service_factory(
+            name=f"service-{index}",
+            gdpr_url=f"https://example-{index}.com/",
+            gdpr_query_scope="gdprquery",
+            gdpr_audience=f"service-{index}",
+        )
+        service_connection = ServiceConnectionFactory(profile=profile, service=service)
+        requests_mock.get(service_connection.get_gdpr_url(), json={"key": "DATA"})
+    query = '{ downloadMyProfile(authorizationCode: "code") }'
+
+    with query_budget("downloadMyProfile", max_queries=20):
+        executed = user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            service=profile_service,
+            auth_token_payload={"loa": "substantial"},
+        )
+
+    assert "errors" not in executed
+
+
+def test_profiles_by_user_ids(
+    execution_context_class, staff_user_gql_client, request_service, query_budget
+):
+    profiles = [ProfileFactory() for _ in range(20)]
+    for profile in profiles:
+        ServiceConnectionFactory(profile=profile, service=request_service)
+    query = """
+        query ($userIds: [UUID!]!) {
+            profilesByUserIds(userIds: $userIds) { firstName }
+        }
+    """
+    user_ids = [str(profile.user.uuid) for profile in profiles]
+
+    with query_budget("profilesByUserIds of 20 profiles", max_queries=4):
+        executed = staff_user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            variables={"userIds": user_ids},
+            service=request_service,
+        )
+
+    assert len(executed["data"]["profilesByUserIds"]) == 20
+
+
+def test_service_connections_with_user_ids(
+    execution_context_class,
+    user_gql_client,
+    request_service,
+    service_client_id_factory,
+    query_budget,
+):
+    assign_perm("services.view_serviceconnection", user_gql_client.user)
+    service_client_id = service_client_id_factory(service=request_service)
+    profiles = [ProfileFactory() for _ in range(20)]
+    for profile in profiles:
+        ServiceConnectionFactory(profile=profile, service=request_service)
+    query = """
+        query ($userIds: [UUID!]!, $serviceClientId: String!) {
+            serviceConnectionsWithUserIds(
+                userIds: $userIds, serviceClientId: $serviceClientId
+            ) {
+                serviceConnection { enabled service { name } }
+            }
+        }
+    """
+    variables = {
+        "userIds": [str(profile.user.uuid) for profile in profiles],
+        "serviceClientId": service_client_id.client_id,
+    }
+
+    with query_budget("serviceConnectionsWithUserIds of 20 users", max_queries=7):
+        executed = user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            variables=variables,
+            service=request_service,
+        )
+
+    assert len(executed["data"]["serviceConnectionsWithUserIds"]) == 20
+
+
+def update_profile_input(profile):
+    return {
+        "firstName": "Updated",
+        "addEmails": [{"email": "new@example.com", "emailType": "WORK"}],
+        "updatePhones": [
+            {"id": to_global_id("PhoneNode", phone.pk), "phone": "0401234567"}
+            for phone in profile.phones.all()
+        ],
+        "removeAddresses": [
+            to_global_id("AddressNode", address.pk)
+            for address in profile.addresses.all()
+        ],
+        "sensitivedata": {"ssn": "010199-1234"},
+    }
+
+
+def test_update_my_profile(
+    execution_context_class, user_gql_client, request_service, query_budget
+):
+    profile = create_profile_with_contacts(user=user_gql_client.user)
+    ServiceConnectionFactory(profile=profile, service=request_service)
+    query = """
+        mutation ($input: UpdateMyProfileMutationInput!) {
+            updateMyProfile(input: $input) {
+                profile { firstName }
+            }
+        }
+    """
+    variables = {"input": {"profile": update_profile_input(profile)}}
+
+    with query_budget("updateMyProfile", max_queries=12):
+        executed = user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            variables=variables,
+            service=request_service,
+        )
+
+    assert "errors" not in executed
+
+
+def test_update_profile(
+    execution_context_class, staff_user_gql_client, request_service, query_budget
+):
+    profile = create_profile_with_contacts()
+    ServiceConnectionFactory(profile=profile, service=request_service)
+    query = """
+        mutation ($input: UpdateProfileMutationInput!) {
+            updateProfile(input: $input) {
+                profile { firstName }
+            }
+        }
+    """
+    variables = {
+        "input": {
+            "profile": {
+                "id": to_global_id("ProfileNode", profile.pk),
+                **update_profile_input(profile),
+            }
+        }
+    }
+
+    with query_budget("updateProfile", max_queries=15):
+        executed = staff_user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            variables=variables,
+            service=request_service,
+        )
+
+    assert "errors" not in executed
+
+
+def test_create_or_update_user_profiles(
+    execution_context_class,
+    user_gql_client,
+    request_service,
+    service_client_id_factory,
+    query_budget,
+):
+    service_client_id = service_client_id_factory(service=request_service)
+    assign_perm("profiles.manage_verified_personal_information", user_gql_client.user)
+    profiles = [ProfileFactory() for _ in range(10)]
+    for profile in profiles[:5]:
+        VerifiedPersonalInformationFactory(profile=profile)
+        EmailFactory(profile=profile, primary=True)
+    query = """
+        mutation ($input: CreateOrUpdateUserProfilesMutationInput!) {
+            createOrUpdateUserProfiles(input: $input) {
+                results { errors { code } }
+            }
+        }
+    """
+    user_ids = [profile.user.uuid for profile in profiles] + [
+        uuid.uuid1() for _ in range(10)
+    ]
+    inputs = [
+        {
+            "userId": str(user_id),
+            "serviceClientId": service_client_id.client_id,
+            "profile": {
+                "firstName": "Updated",
+                "verifiedPersonalInformation": {
+                    "firstName": "Updated",
+                    "permanentAddress": {"streetAddress": "Street 1"},
+                },
+                "primaryEmail": {"email": f"{index}@example.com"},
+            },
+        }
+        for index, user_id in enumerate(user_ids)
+    ]
+
+    with query_budget("createOrUpdateUserProfiles of 20 profiles", max_queries=21):
+        executed = user_gql_client.execute(
+            query,
+            execution_context_class=execution_context_class,
+            variables={"input": {"profiles": inputs}},
+            service=request_service,
+        )
+
+    assert "errors" not in executed
@@ -2,6 +2,9 @@ import functools
 from enum import Enum
 
 from django.conf import settings
+from django.db.models import Min
+
+from open_city_profile.permissions import requester_has_perm
 
 
 def requester_has_service_permission(request, permission):
@@ -10,18 +13,7 @@ def requester_has_service_permission(request, permission):
     if not service:
         return False
 
-    if not hasattr(request, "_service_permission_cache"):
-        request._service_permission_cache = {}
-
-    cache_key = f"{request.user.id}:{service.name}:{permission}"
-
-    result = request._service_permission_cache.get(cache_key)
-
-    if result is None:
-        result = request.user.has_perm(permission, service)
-        request._service_permission_cache[cache_key] = result
-
-    return result
+    return requester_has_perm(request, permission, service)
 
 
 def requester_can_view_verified_personal_information(request):
@@ -53,3 +45,23 @@ def enum_values[EnumType: Enum](enum: EnumType) -> list:
     Return a list of values from the given enum.
     """
     return [e.value for e in enum]
+
+
+def get_extra_primary_contacts(model):
+    """
+    Returns the primary contacts of the model which are not the first primary one of
+    their profile, i.e. the ones violating the single primary contact constraint.
+    """
+    first_primary_ids = (
+        model.objects.filter(primary=True)
+        .order_by()
+        .values("profile")
+        .annotate(first_id=Min("id"))
+        .values("first_id")
+    )
+    return model.objects.filter(primary=True).exclude(pk__in=first_primary_ids)
+
+
+def demote_extra_primary_contacts(model):
+    """Clears the primary flag of all but the first primary contact of each profile"""
+    return get_extra_primary_contacts(model).update(primary=False)
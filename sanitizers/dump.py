@@ -0,0 +1,246 @@
+"""
+Parallel sanitized database dump.
+
+A faster alternative to the `create_sanitized_dump` command of
+`django-sanitized-dump`, using the same `.sanitizerconfig`. The output of `pg_dump`
+is streamed and the rows of the `COPY` statements are sanitized in batches in
+worker processes. The fake values of the sanitizers in `sanitizers.profile` are
+picked from pools of pre-generated values instead of generating them with Faker
+for every value.
+"""
+
+import multiprocessing
+import os
+import random
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from database_sanitizer.dump.postgres import COPY_LINE_PATTERN, parse_column_names
+from database_sanitizer.utils.postgres import decode_copy_value, encode_copy_value
+from faker import Faker
+
+from sanitizers import profile
+
+POOL_SIZE = 10000
+
+_pools = None
+_encryptor = None
+
+
+class FakeValuePools:
+    """Pre-generated fake values for the sanitizers of `sanitizers.profile`"""
+
+    def __init__(self, seed=0, size=POOL_SIZE):
+        faker = Faker("fi_FI")
+        faker.seed_instance(seed)
+        self.seed = seed
+        self._values = {
+            kind: [generate(faker) for _ in range(size)]
+            for kind, generate in profile.FAKE_VALUE_GENERATORS.items()
+        }
+
+    def pick(self, kind, count, rng):
+        return rng.choices(self._values[kind], k=count)
+
+
+class Encryptor:
+    """
+    Encrypts values in the format of `EncryptedFieldMixin.encrypt`, i.e. AES-GCM
+    with the nonce and the tag prepended to the cipher text.
+
+    The key is set up once instead of for every value, which makes this several
+    times faster than `sanitizers.profile.as_encrypted_hex_string`.
+    """
+
+    def __init__(self, key):
+        self._aesgcm = AESGCM(bytes.fromhex(key))
+
+    def encrypt_to_hex_string(self, value):
+        nonce = os.urandom(16)
+        encrypted = self._aesgcm.encrypt(nonce, value.encode(), None)
+        cipher_text, tag = encrypted[:-16], encrypted[-16:]
+        return r"\x" + (nonce + tag + cipher_text).hex()
+
+
+def _get_encryptor():
+    global _encryptor
+    if _encryptor is None:
+        if not profile.dummy_field.keys[0]:
+            raise RuntimeError(
+                "Please set the SANITIZED_DUMP_FIELD_ENCRYPTION_KEYS environment "
+                "variable."
+            )
+        _encryptor = Encryptor(profile.dummy_field.keys[0])
+    return _encryptor
+
+
+def _get_pools(seed):
+    global _pools
+    if _pools is None or _pools.seed != seed:
+        _pools = FakeValuePools(seed)
+    return _pools
+
+
+def _get_column_plan(sanitizer):
+    """
+    Returns how a column is sanitized: None to keep its values, a `(kind,
+    encrypted)` tuple for values picked from the pools, or the sanitizer function
+    to call for every value.
+    """
+    if sanitizer is None:
+        return None
+
+    name = sanitizer.__name__.removeprefix("sanitize_")
+    if sanitizer.__module__ == profile.__name__:
+        kind = name.removeprefix("encrypted_")
+        if kind in profile.FAKE_VALUE_GENERATORS:
+            return (kind, kind != name)
+
+    return sanitizer
+
+
+def get_table_plan(config, table, columns):
+    """Returns the plans of the columns of the table, or None if nothing changes"""
+    plan = [
+        _get_column_plan(config.get_sanitizer_for(table, column)) for column in columns
+    ]
+    if all(column_plan is None for column_plan in plan):
+        return None
+    return plan
+
+
+def sanitize_rows(plan, lines, seed, batch_seed):
+    """Sanitizes the rows of a batch of `COPY` data lines column by column"""
+    pools = _get_pools(seed)
+    rng = random.Random(batch_seed)
+    rows = [line.split("\t") for line in lines]
+    for row in rows:
+        if len(row) != len(plan):
+            raise ValueError("Mismatch between column names and values.")
+
+    for index, column_plan in enumerate(plan):
+        if column_plan is None:
+            continue
+
+        if isinstance(column_plan, tuple):
+            kind, encrypted = column_plan
+            values = pools.pick(kind, len(rows), rng)
+            if encrypted:
+                encrypt = _get_encryptor().encrypt_to_hex_string
+                values = [encrypt(value) for value in values]
+        else:
+            values = [column_plan(decode_copy_value(row[index])) for row in rows]
+
+        for row, value in zip(rows, values, strict=True):
+            row[index] = encode_copy_value(value)
+
+    return ["\t".join(row) for row in rows]
+
+
+def _init_worker(seed):
+    _get_pools(seed)
+
+
+def sanitize_dump_lines(lines, config, workers=1, batch_size=5000, seed=0):
+    """
+    Sanitizes the lines of a plain text `pg_dump` output.
+
+    The rows of every `COPY` statement are sanitized in batches of `batch_size`,
+    in `workers` processes if more than one. The output is identical for the same
+    input, `seed` and `batch_size` regardless of the number of workers.
+    """
+    _get_pools(seed)
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(seed,),
+        )
+    pending = deque()
+    batch = []
+    batch_number = 0
+    table = plan = None
+    skip_table = False
+
+    def submit_batch():
+        nonlocal batch, batch_number
+        batch_seed = f"{seed}:{table}:{batch_number}"
+        if executor:
+            pending.append(
+                executor.submit(sanitize_rows, plan, batch, seed, batch_seed)
+            )
+        else:
+            pending.append(sanitize_rows(plan, batch, seed, batch_seed))
+        batch = []
+        batch_number += 1
+
+    def completed_batches(keep):
+        while len(pending) > keep:
+            result = pending.popleft()
+            yield from result.result() if executor else result
+
+    try:
+        for line in lines:
+            line = line.rstrip("\n")
+
+            if table is not None:
+                if line == "\\.":
+                    if batch:
+                        submit_batch()
+                    yield from completed_batches(keep=0)
+                    if not skip_table:
+                        yield line
+                    table = plan = None
+                    skip_table = False
+                elif skip_table:
+                    pass
+                elif plan is None:
+                    yield line
+                else:
+                    batch.append(line)
+                    if len(batch) >= batch_size:
+                        submit_batch()
+                        yield from completed_batches(keep=2 * workers)
+                continue
+
+            copy_line_match = COPY_LINE_PATTERN.match(line)
+            if not copy_line_match:
+                yield line
+                continue
+
+            table = copy_line_match.group("table")
+            batch_number = 0
+            if table in config.skip_rows_for_tables:
+                skip_table = True
+                continue
+
+            columns = parse_column_names(copy_line_match.group("columns"))
+            plan = get_table_plan(config, table, columns)
+            yield line
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def dump_database(database_url, config, **kwargs):
+    """Yields the lines of a sanitized `pg_dump` of the database"""
+    process = subprocess.Popen(
+        (
+            "pg_dump",
+            "--encoding=utf-8",
+            "--quote-all-identifiers",
+            "--dbname",
+            database_url.replace("postgis://", "postgresql://"),
+            *config.pg_dump_params,
+        ),
+        stdout=subprocess.PIPE,
+        encoding="utf-8",
+    )
+    yield from sanitize_dump_lines(process.stdout, config, **kwargs)
+
+    if process.wait():
+        raise RuntimeError(f"pg_dump failed with exit status {process.returncode}")
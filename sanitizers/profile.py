@@ -17,6 +17,22 @@ class DummyField(EncryptedFieldMixin):
 dummy_field = DummyField()
 fake = Faker("fi_FI")
 
+# Generators of the fake values by the name of their sanitizer function without the
+# "sanitize_" and "encrypted_" prefixes. Used by the pooled values of the parallel
+# sanitized dump, see `sanitizers.dump`.
+FAKE_VALUE_GENERATORS = {
+    "national_identification_number": lambda faker: faker.ssn(),
+    "email": lambda faker: faker.email(),
+    "city": lambda faker: faker.city(),
+    "municipality_number": lambda faker: f"{faker.random_int(1, 999):03}",
+    "first_name": lambda faker: faker.first_name(),
+    "last_name": lambda faker: faker.last_name(),
+    "street_address": lambda faker: faker.street_address(),
+    "country_code": lambda faker: faker.country_code(),
+    "postal_code": lambda faker: faker.postcode(),
+    "phone": lambda faker: faker.phone_number(),
+}
+
 
 def as_encrypted_hex_string(value):
     if not dummy_field.keys[0]:
@@ -0,0 +1,98 @@
+import pytest
+from database_sanitizer.config import Configuration
+
+from sanitizers import dump, profile
+
+KEY = "000111222333444555666777888999aaabbbcccdddeeefff0001112223334445"
+
+DUMP_LINES = [
+    "SET client_encoding = 'UTF8';",
+    'COPY "public"."person" ("id", "first_name", "given_name", "nickname") FROM stdin;',
+    *(f"{index}\tFirst {index}\tGiven {index}\tNick {index}" for index in range(7)),
+    "\\.",
+    'COPY "public"."secret" ("id", "value") FROM stdin;',
+    "1\tsecret",
+    "\\.",
+    'COPY "public"."other" ("id", "value") FROM stdin;',
+    "1\tkept",
+    "\\.",
+    "ALTER TABLE ONLY public.person ADD CONSTRAINT person_pkey PRIMARY KEY (id);",
+]
+
+
+@pytest.fixture(autouse=True)
+def encryption_key(monkeypatch):
+    monkeypatch.setattr(profile.DummyField, "keys", [KEY])
+    monkeypatch.setattr(dump, "_encryptor", None)
+
+
+@pytest.fixture
+def config():
+    config = Configuration()
+    config.load(
+        {
+            "strategy": {
+                "person": {
+                    "first_name": "profile.first_name",
+                    "given_name": "profile.encrypted_first_name",
+                    "nickname": "string.empty",
+                },
+                "secret": "skip_rows",
+            }
+        }
+    )
+    return config
+
+
+def sanitize(config, **kwargs):
+    return list(dump.sanitize_dump_lines(DUMP_LINES, config, **kwargs))
+
+
+def person_rows(lines):
+    start = lines.index(DUMP_LINES[1]) + 1
+    return [line.split("\t") for line in lines[start : start + 7]]
+
+
+def test_configured_columns_are_sanitized(config):
+    lines = sanitize(config, batch_size=3)
+
+    assert lines[0] == DUMP_LINES[0]
+    assert lines[-1] == DUMP_LINES[-1]
+    first_names = dump._get_pools(0)._values["first_name"]
+    for index, (row_id, first_name, given_name, nickname) in enumerate(
+        person_rows(lines)
+    ):
+        assert row_id == str(index)
+        assert first_name in first_names
+        assert profile.dummy_field.decrypt(bytes.fromhex(given_name[3:])) in (
+            first_names
+        )
+        assert nickname == ""
+
+
+def test_rows_of_skipped_tables_are_left_out(config):
+    lines = sanitize(config)
+
+    assert 'COPY "public"."secret" ("id", "value") FROM stdin;' not in lines
+    assert "1\tsecret" not in lines
+    assert lines[-4:-1] == DUMP_LINES[-4:-1]
+
+
+def test_output_is_independent_of_the_number_of_workers(config):
+    def unencrypted_values(lines):
+        return [(row[0], row[1]) for row in person_rows(lines)]
+
+    single = sanitize(config, batch_size=2, workers=1)
+    parallel = sanitize(config, batch_size=2, workers=2)
+
+    assert unencrypted_values(single) == unencrypted_values(parallel)
+    assert unencrypted_values(single) != unencrypted_values(
+        sanitize(config, batch_size=2, seed=1)
+    )
+
+
+def test_encryption_without_a_key_fails(config, monkeypatch):
+    monkeypatch.setattr(profile.DummyField, "keys", [""])
+
+    with pytest.raises(RuntimeError, match="SANITIZED_DUMP_FIELD_ENCRYPTION_KEYS"):
+        sanitize(config)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.17 on 2026-10-19 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0028_remove_service_idp"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="service",
+            name="webhook_secret",
+            field=models.CharField(
+                blank=True,
+                help_text="The secret used for signing the requests to the webhook URL.",
+                max_length=200,
+            ),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="webhook_url",
+            field=models.URLField(
+                blank=True,
+                help_text="The URL to which the changes of the profiles connected to the Service are posted.",
+                max_length=2000,
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.17 on 2026-10-19 04:49
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The indexes are created and removed concurrently, so that the table stays
+    # writable meanwhile. That can't be done in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("services", "0029_service_webhook"),
+    ]
+
+    operations = [
+        # The new index is added before the service index it replaces is removed
+        AddIndexConcurrently(
+            model_name="serviceconnection",
+            index=models.Index(
+                fields=["service", "profile"], name="services_conn_service_idx"
+            ),
+        ),
+        # Only the index of the foreign key is removed, AlterField would recreate
+        # the foreign key constraint too
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="serviceconnection",
+                    name="service",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="services.service",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql='DROP INDEX CONCURRENTLY IF EXISTS "services_serviceconnection_service_id_b181aa02"',  # noqa: E501
+                    reverse_sql='CREATE INDEX CONCURRENTLY "services_serviceconnection_service_id_b181aa02" ON "services_serviceconnection" ("service_id")',  # noqa: E501
+                ),
+            ],
+        ),
+    ]
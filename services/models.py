@@ -70,6 +70,16 @@ class Service(TranslatableModel):
         default=False,
         help_text="Identifies the profile service itself. Only one Service can have this property.",  # noqa: E501
     )
+    webhook_url = models.URLField(
+        max_length=2000,
+        blank=True,
+        help_text="The URL to which the changes of the profiles connected to the Service are posted.",  # noqa: E501
+    )
+    webhook_secret = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="The secret used for signing the requests to the webhook URL.",
+    )
 
     class Meta:
         constraints = [
@@ -146,13 +156,20 @@ class ServiceConnection(SerializableMixin):
     profile = models.ForeignKey(
         "profiles.Profile", on_delete=models.CASCADE, related_name="service_connections"
     )
-    service = models.ForeignKey(Service, on_delete=models.PROTECT)
+    # Indexed by the (service, profile) index
+    service = models.ForeignKey(Service, on_delete=models.PROTECT, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     enabled = models.BooleanField(default=True)
 
     class Meta:
         unique_together = ("profile", "service")
         ordering = ["id"]
+        indexes = [
+            # For finding the profiles connected to a service
+            models.Index(
+                fields=["service", "profile"], name="services_conn_service_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.profile.first_name} {self.profile.last_name} - {self.service}"
@@ -9,6 +9,7 @@ from graphene_django.types import DjangoObjectType
 from open_city_profile.decorators import login_and_service_required, permission_required
 from open_city_profile.exceptions import ServiceAlreadyExistsError
 from open_city_profile.graphene import DjangoParlerObjectType
+from profiles.change_notifications import SERVICE_CONNECTIONS, enqueue_profile_change
 
 from .enums import ServiceType
 from .models import AllowedDataField, Service, ServiceConnection
@@ -121,6 +122,9 @@ class AddServiceConnectionMutation(relay.ClientIDMutation):
             )
         except IntegrityError:
             raise ServiceAlreadyExistsError("Service connection already exists")
+
+        enqueue_profile_change(service_connection.profile, [SERVICE_CONNECTIONS])
+
         return AddServiceConnectionMutation(service_connection=service_connection)
 
 
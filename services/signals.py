@@ -0,0 +1,57 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import AllowedDataField, Service, ServiceClientId
+from .utils import invalidate_service_cache
+
+ServiceTranslation = Service._parler_meta.root_model
+AllowedDataFieldTranslation = AllowedDataField._parler_meta.root_model
+
+
+def _invalidate_service(service):
+    invalidate_service_cache(service.client_ids.values_list("client_id", flat=True))
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def _service_changed(sender, instance, **kwargs):
+    _invalidate_service(instance)
+
+
+@receiver(post_save, sender=ServiceTranslation)
+@receiver(post_delete, sender=ServiceTranslation)
+def _service_translation_changed(sender, instance, **kwargs):
+    _invalidate_service(instance.master)
+
+
+@receiver(pre_save, sender=ServiceClientId)
+def _service_client_id_will_change(sender, instance, **kwargs):
+    if instance.pk:
+        invalidate_service_cache(
+            ServiceClientId.objects.filter(pk=instance.pk).values_list(
+                "client_id", flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=ServiceClientId)
+@receiver(post_delete, sender=ServiceClientId)
+def _service_client_id_changed(sender, instance, **kwargs):
+    invalidate_service_cache([instance.client_id])
+
+
+@receiver(m2m_changed, sender=Service.allowed_data_fields.through)
+def _service_allowed_data_fields_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith("post_"):
+        if reverse:
+            invalidate_service_cache()
+        else:
+            _invalidate_service(instance)
+
+
+@receiver(post_save, sender=AllowedDataField)
+@receiver(post_delete, sender=AllowedDataField)
+@receiver(post_save, sender=AllowedDataFieldTranslation)
+@receiver(post_delete, sender=AllowedDataFieldTranslation)
+def _allowed_data_field_changed(sender, instance, **kwargs):
+    invalidate_service_cache()
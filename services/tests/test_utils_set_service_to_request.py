@@ -1,6 +1,8 @@
 import pytest
 
-from services.utils import set_service_to_request
+from services.models import Service
+from services.tests.factories import AllowedDataFieldFactory
+from services.utils import get_service_by_client_id, set_service_to_request
 
 
 @pytest.fixture
@@ -35,3 +37,122 @@ def test_when_client_id_is_found_then_service_is_added_to_request(
 
     assert req.client_id == client_id
     assert req.service == service_client_id.service
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings, tmp_path):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+
+
+@pytest.fixture
+def cached_service(service_client_id):
+    service = get_service_by_client_id(service_client_id.client_id)
+    assert service == service_client_id.service
+    return service
+
+
+def test_service_is_cached_with_translations_and_allowed_data_fields(
+    service_client_id, django_assert_num_queries
+):
+    service_client_id.service.allowed_data_fields.add(
+        AllowedDataFieldFactory(field_name="name")
+    )
+    get_service_by_client_id(service_client_id.client_id)
+
+    with django_assert_num_queries(0):
+        service = get_service_by_client_id(service_client_id.client_id)
+        assert service.title == service_client_id.service.title
+        assert [field.field_name for field in service.allowed_data_fields.all()] == [
+            "name"
+        ]
+        assert [str(field) for field in service.allowed_data_fields.all()]
+
+
+def test_cached_service_is_invalidated_when_service_changes(
+    cached_service, service_client_id
+):
+    service = service_client_id.service
+    service.gdpr_url = "https://example.com/gdpr/"
+    service.save()
+
+    cached = get_service_by_client_id(service_client_id.client_id)
+    assert cached.gdpr_url == "https://example.com/gdpr/"
+
+
+def test_cached_service_is_invalidated_when_service_translation_changes(
+    cached_service, service_client_id
+):
+    service = Service.objects.get(pk=service_client_id.service.pk)
+    service.set_current_language("fi")
+    service.title = "Palvelu"
+    service.save()
+
+    cached = get_service_by_client_id(service_client_id.client_id)
+    assert cached.safe_translation_getter("title", language_code="fi") == "Palvelu"
+
+
+def test_cached_service_is_invalidated_when_client_id_changes(
+    cached_service, service_client_id
+):
+    old_client_id = service_client_id.client_id
+    service_client_id.client_id = "new client id"
+    service_client_id.save()
+
+    assert get_service_by_client_id(old_client_id) is None
+    assert get_service_by_client_id("new client id") == cached_service
+
+
+def test_cached_service_is_invalidated_when_client_id_is_deleted(
+    cached_service, service_client_id
+):
+    service_client_id.delete()
+
+    assert get_service_by_client_id(service_client_id.client_id) is None
+
+
+@pytest.mark.parametrize("from_service_side", [True, False])
+def test_cached_service_is_invalidated_when_allowed_data_fields_change(
+    from_service_side, cached_service, service_client_id
+):
+    allowed_data_field = AllowedDataFieldFactory(field_name="email")
+    if from_service_side:
+        service_client_id.service.allowed_data_fields.add(allowed_data_field)
+    else:
+        allowed_data_field.service_set.add(service_client_id.service)
+
+    cached = get_service_by_client_id(service_client_id.client_id)
+    assert [field.field_name for field in cached.allowed_data_fields.all()] == ["email"]
+
+
+def test_cached_service_is_invalidated_when_allowed_data_field_changes(
+    service_client_id,
+):
+    allowed_data_field = AllowedDataFieldFactory(field_name="email")
+    service_client_id.service.allowed_data_fields.add(allowed_data_field)
+    get_service_by_client_id(service_client_id.client_id)
+
+    allowed_data_field.label = "Changed label"
+    allowed_data_field.save()
+
+    cached = get_service_by_client_id(service_client_id.client_id)
+    assert str(cached.allowed_data_fields.all()[0]) == "Changed label"
+
+
+def test_service_is_not_cached_in_a_process_local_cache(
+    service_client_id, settings, django_assert_num_queries
+):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    get_service_by_client_id(service_client_id.client_id)
+
+    with django_assert_num_queries(3):
+        assert (
+            get_service_by_client_id(service_client_id.client_id)
+            == service_client_id.service
+        )
@@ -1,8 +1,62 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 
+from open_city_profile.utils import is_cache_shared
 from services.models import AllowedDataField, Service, ServiceClientId
 
 
+def _service_cache_key(client_id):
+    client_id_digest = hashlib.sha256(client_id.encode()).hexdigest()
+    return f"services:service_by_client_id:{client_id_digest}"
+
+
+def get_service_by_client_id(client_id):
+    """
+    Returns the service having the given client id, or None.
+
+    The service is cached together with its translations and allowed data fields
+    for `SERVICE_CACHE_TIMEOUT_SECONDS`. The cache is invalidated by signals when
+    the related models change. A process-local cache can't be invalidated in the
+    other server processes, so then the service is always queried.
+    """
+    cache_key = _service_cache_key(client_id)
+    use_cache = is_cache_shared()
+    service = cache.get(cache_key) if use_cache else None
+
+    if service is None:
+        service = (
+            Service.objects.filter(client_ids__client_id=client_id)
+            .prefetch_related("translations", "allowed_data_fields__translations")
+            .first()
+        )
+        if service is None:
+            return None
+
+        if use_cache:
+            cache.set(cache_key, service, settings.SERVICE_CACHE_TIMEOUT_SECONDS)
+
+    return service
+
+
+def invalidate_service_cache(client_ids=None):
+    """
+    Removes the cached services of the given client ids, or of all client ids if
+    none are given.
+
+    The cache is cleared again after the current transaction has been committed,
+    so that a concurrent request can't cache a service which is about to change.
+    """
+    if client_ids is None:
+        client_ids = ServiceClientId.objects.values_list("client_id", flat=True)
+    cache_keys = [_service_cache_key(client_id) for client_id in client_ids]
+
+    cache.delete_many(cache_keys)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
 def set_service_to_request(request):
     if not hasattr(request, "service"):
         request.service = None
@@ -12,16 +66,12 @@ def set_service_to_request(request):
         if not client_id:
             return
 
-        service_client_id = (
-            ServiceClientId.objects.select_related("service")
-            .filter(client_id=client_id)
-            .first()
-        )
-        if not service_client_id:
+        service = get_service_by_client_id(client_id)
+        if not service:
             return
 
-        request.client_id = service_client_id.client_id
-        request.service = service_client_id.service
+        request.client_id = client_id
+        request.service = service
 
 
 @transaction.atomic
@@ -1,8 +1,138 @@
+import contextvars
 import hashlib
+import threading
+from contextlib import contextmanager
 
 from django.db import models
+from django.db.models import lookups
+from django.db.models.query import ModelIterable
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.functional import SimpleLazyObject, cached_property, empty
 from encrypted_fields import fields
 
+_decryption_cache = threading.local()
+
+# Whether the loaded encrypted values are left to be decrypted on first access
+_lazy_decryption = contextvars.ContextVar("lazy_decryption", default=False)
+
+
+@contextmanager
+def decryption_cache():
+    """Memoize decrypted values inside the block.
+
+    Decrypted values are keyed by a digest of the ciphertext, so the same row
+    loaded several times only gets decrypted once. The cache is discarded when
+    the outermost block exits, so plaintext isn't retained longer than needed.
+    """
+    cache = getattr(_decryption_cache, "values", None)
+    if cache is not None:
+        yield cache
+        return
+
+    _decryption_cache.values = {}
+    try:
+        yield _decryption_cache.values
+    finally:
+        _decryption_cache.values = None
+
+
+class EncryptedValue(SimpleLazyObject):
+    """Value of an encrypted field as loaded from the database.
+
+    The ciphertext is decrypted only when the value is used for the first time.
+    """
+
+    def __init__(self, field, ciphertext):
+        super().__init__(lambda: field.to_python(field.decrypt(ciphertext)))
+
+    def resolve(self):
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
+
+
+class LazyDecryptionAttribute(DeferredAttribute):
+    """Resolves an `EncryptedValue` to plaintext when the attribute is accessed
+
+    Unlike DeferredAttribute this is a data descriptor, so that it takes precedence
+    over the value stored in the instance dict.
+    """
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, EncryptedValue):
+            value = value.resolve()
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class LazyDecryptionModelIterable(ModelIterable):
+    """Loads model instances whose encrypted fields get decrypted on first access"""
+
+    def __iter__(self):
+        instances = super().__iter__()
+        while True:
+            # The rows are converted while fetching the next instance, so the lazy
+            # decryption must not leak to the caller between the instances.
+            token = _lazy_decryption.set(True)
+            try:
+                instance = next(instances)
+            except StopIteration:
+                return
+            finally:
+                _lazy_decryption.reset(token)
+            yield instance
+
+
+class LazyDecryptionQuerySet(models.QuerySet):
+    """
+    QuerySet of a model with lazily decrypted fields. The fields of the model
+    instances are decrypted on first access, while e.g. `values()` and
+    `values_list()` return plaintext strings.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._iterable_class = LazyDecryptionModelIterable
+
+
+class LazyDecryptionMixin(fields.EncryptedFieldMixin):
+    """Encrypted field which decrypts its value on first access instead of on load.
+
+    The value is decrypted lazily only in the model instances loaded through a
+    `LazyDecryptionQuerySet`, other queries get it decrypted. Decrypted values are
+    memoized while a `decryption_cache` block is active.
+    """
+
+    descriptor_class = LazyDecryptionAttribute
+
+    def decrypt(self, value):
+        cache = getattr(_decryption_cache, "values", None)
+        if cache is None:
+            return super().decrypt(value)
+
+        cache_key = hashlib.sha256(value).digest()
+        try:
+            return cache[cache_key]
+        except KeyError:
+            plaintext = cache[cache_key] = super().decrypt(value)
+            return plaintext
+
+    def from_db_value(self, value, expression, connection):
+        if value is not None and _lazy_decryption.get():
+            return EncryptedValue(self, value)
+        return super().from_db_value(value, expression, connection)
+
+    def get_db_prep_save(self, value, connection):
+        # Expressions, e.g. the CASE statements of bulk_update, are compiled by the
+        # query instead. Their values get encrypted separately.
+        if hasattr(value, "as_sql"):
+            return value
+        return super().get_db_prep_save(value, connection)
+
 
 class NullToEmptyValueMixin(models.Field):
     def to_python(self, value):
@@ -19,8 +149,33 @@ class NullToEmptyValueMixin(models.Field):
         return value
 
 
+class LazySearchFieldDescriptor(fields.SearchFieldDescriptor):
+    """SearchFieldDescriptor which copes with lazily decrypted data fields"""
+
+    def __get__(self, instance, owner):
+        if (
+            instance is not None
+            and self.field.encrypted_field_name in instance.__dict__
+        ):
+            # SearchFieldDescriptor reads the data field from the instance dict
+            # directly, so make sure it has been decrypted first.
+            getattr(instance, self.field.encrypted_field_name)
+        return super().__get__(instance, owner)
+
+
 class CallableHashKeyEncryptedSearchField(fields.SearchField):
-    """encrypted_fields.fields.SearchField but modified to support callable hash_key"""
+    """encrypted_fields.fields.SearchField but modified to support callable hash_key
+
+    A callable hash_key is resolved only once per process.
+    """
+
+    descriptor_class = LazySearchFieldDescriptor
+
+    @cached_property
+    def resolved_hash_key(self):
+        if callable(self.hash_key):
+            return self.hash_key()
+        return self.hash_key
 
     def get_prep_value(self, value):
         if value is None:
@@ -33,26 +188,74 @@ class CallableHashKeyEncryptedSearchField(fields.SearchField):
             # if we have hashed this previously, don't do it again
             return value
 
-        # Callable hash key custom code start
-        if callable(self.hash_key):
-            hash_key = self.hash_key()
-        else:
-            hash_key = self.hash_key
-        # Callable hash key custom code end
+        return self._hash(value, self.resolved_hash_key)
 
+    def get_prep_values(self, values):
+        """Hash several values in one go. Returns a dict from hash to value."""
+        hash_key = self.resolved_hash_key
+        return {self._hash(str(value), hash_key): value for value in values}
+
+    @staticmethod
+    def _hash(value, hash_key):
         v = value + hash_key
         return fields.SEARCH_HASH_PREFIX + hashlib.sha256(v.encode()).hexdigest()
 
 
+# encrypted_fields only allows exact lookups on search fields, but matching against
+# a set of hashes is as safe as matching against a single one.
+CallableHashKeyEncryptedSearchField.register_lookup(lookups.In)
+
+
 class NullToEmptyCharField(NullToEmptyValueMixin, models.CharField):
     """CharField with automatic null-to-empty-string functionality"""
 
 
-class NullToEmptyEncryptedCharField(NullToEmptyValueMixin, fields.EncryptedCharField):
+class EncryptedCharField(LazyDecryptionMixin, fields.EncryptedCharField):
+    """EncryptedCharField with lazy and memoized decryption"""
+
+
+class NullToEmptyEncryptedCharField(
+    NullToEmptyValueMixin, LazyDecryptionMixin, fields.EncryptedCharField
+):
     """EncryptedCharField with automatic null-to-empty-string functionality"""
 
 
+class EmptyAsNullExact(lookups.Exact):
+    """Exact lookup which matches an empty value to the nulls it's stored as"""
+
+    can_use_none_as_rhs = True
+
+    def as_sql(self, compiler, connection):
+        if self.rhs is None:
+            return compiler.compile(lookups.IsNull(self.lhs, True))
+        return super().as_sql(compiler, connection)
+
+
 class NullToEmptyEncryptedSearchField(
     NullToEmptyValueMixin, CallableHashKeyEncryptedSearchField
 ):
-    """EncryptedSearchField with automatic null-to-empty-string functionality"""
+    """EncryptedSearchField with automatic null-to-empty-string functionality
+
+    Empty values are stored as null instead of as the hash of an empty string, so
+    that the search field can be unique. Exact lookups of an empty value match the
+    nulls.
+    """
+
+    @cached_property
+    def empty_value_hash(self):
+        return self._hash("", self.resolved_hash_key)
+
+    def get_prep_value(self, value):
+        if value == "" or value == self.empty_value_hash:
+            return None
+        return super().get_prep_value(value)
+
+    def from_db_value(self, value, expression, connection):
+        # SearchFieldDescriptor copies any value which isn't a hash to the data
+        # field, so a null must not be handed to it.
+        if value is None:
+            return self.empty_value_hash
+        return value
+
+
+NullToEmptyEncryptedSearchField.register_lookup(EmptyAsNullExact)
@@ -1,6 +1,10 @@
+import re
+from urllib.parse import urlsplit
+
 import requests
 from django.utils.functional import cached_property
 
+from open_city_profile.metrics import KEYCLOAK_ADMIN_REQUEST_DURATION
 from utils.auth import BearerAuth
 
 
@@ -116,12 +120,20 @@ class KeycloakAdminClient:
 
         return self._handle_request_common_errors(reauth_requester)
 
+    def _metrics_endpoint(self, url):
+        """URL path without the realm and the user id, e.g. `users/{id}/credentials`"""
+        path = urlsplit(url).path.removeprefix(f"/admin/realms/{self._realm_name}/")
+        return re.sub(r"^users/[^/]+", "users/{id}", path)
+
     def request(self, method, url, validator, **kwargs) -> requests.Response:
         kwargs.setdefault("timeout", self._timeout)
 
-        response = self._handle_request_with_auth(
-            lambda auth: self._session.request(method, url, auth=auth, **kwargs)
-        )
+        with KEYCLOAK_ADMIN_REQUEST_DURATION.labels(
+            method=method, endpoint=self._metrics_endpoint(url)
+        ).time():
+            response = self._handle_request_with_auth(
+                lambda auth: self._session.request(method, url, auth=auth, **kwargs)
+            )
 
         if validator:
             validator(response)
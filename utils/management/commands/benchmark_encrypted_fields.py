@@ -0,0 +1,115 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from encrypted_fields.fields import EncryptedFieldMixin
+
+from profiles.models import Profile, VerifiedPersonalInformation
+from utils.utils import generate_national_identification_number
+
+
+def _pk_scan():
+    list(VerifiedPersonalInformation.objects.values_list("pk", flat=True))
+
+
+def _load_unencrypted_fields():
+    for vpi in VerifiedPersonalInformation.objects.all():
+        _ = (vpi.first_name, vpi.last_name)
+
+
+def _load_encrypted_fields():
+    encrypted_fields = [
+        field.attname
+        for field in VerifiedPersonalInformation._meta.get_fields()
+        if isinstance(field, EncryptedFieldMixin)
+    ]
+    for vpi in VerifiedPersonalInformation.objects.all():
+        _ = [getattr(vpi, attname) for attname in encrypted_fields]
+
+
+SCENARIOS = (
+    ("pk scan (rotate_keys)", _pk_scan),
+    ("rows, unencrypted fields only (admin changelist)", _load_unencrypted_fields),
+    ("rows, all encrypted fields read (eager decryption)", _load_encrypted_fields),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the CPU time spent loading VerifiedPersonalInformation rows "
+        "with and without reading their encrypted fields. The generated data "
+        "is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-c",
+            "--count",
+            type=int,
+            default=10000,
+            help="Number of VerifiedPersonalInformation rows to generate (default: 10000).",  # noqa: E501
+        )
+        parser.add_argument(
+            "-r",
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of times each scenario is run, the best run is reported (default: 3).",  # noqa: E501
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        repeat = options["repeat"]
+
+        with transaction.atomic():
+            self.stdout.write(f"Generating {count} VerifiedPersonalInformation rows...")
+            self.generate_data(count)
+
+            self.stdout.write(f"CPU time, best of {repeat} runs:")
+            results = {}
+            for name, scenario in SCENARIOS:
+                results[name] = self.measure(scenario, repeat)
+                self.stdout.write(f"  {name}: {results[name]:.3f} s")
+
+            transaction.set_rollback(True)
+
+        lazy, eager = results[SCENARIOS[1][0]], results[SCENARIOS[2][0]]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Not reading the encrypted fields saved {eager - lazy:.3f} s "
+                f"of CPU time for {count} rows."
+            )
+        )
+
+    @staticmethod
+    def generate_data(count):
+        profiles = Profile.objects.bulk_create(
+            [Profile(id=uuid.uuid4()) for _ in range(count)], batch_size=1000
+        )
+        VerifiedPersonalInformation.objects.bulk_create(
+            [
+                VerifiedPersonalInformation(
+                    profile=profile,
+                    first_name="First",
+                    last_name=f"Last {index}",
+                    given_name="Given",
+                    national_identification_number=generate_national_identification_number(
+                        index
+                    ),
+                    municipality_of_residence="Helsinki",
+                    municipality_of_residence_number="091",
+                )
+                for index, profile in enumerate(profiles)
+            ],
+            batch_size=1000,
+        )
+
+    @staticmethod
+    def measure(scenario, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.process_time()
+            scenario()
+            timings.append(time.process_time() - start)
+        return min(timings)
@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed profiles and replay a mix of GraphQL operations against the API "
+        "in-process, reporting the latency percentiles, throughput and database "
+        "queries of each operation. Keycloak and the GDPR APIs of the services "
+        "are stubbed and the generated data is rolled back afterwards. Needs the "
+        "development dependencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-p",
+            "--profiles",
+            type=int,
+            default=200,
+            help="Number of profiles to seed (default: 200).",
+        )
+        parser.add_argument(
+            "-n",
+            "--requests",
+            type=int,
+            default=500,
+            help="Number of operations to replay (default: 500).",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Number of operations replayed before measuring (default: 20).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed for the generated data and the operation mix (default: 0).",  # noqa: E501
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Write the results as JSON to this file, for comparing runs.",
+        )
+
+    def handle(self, *args, **options):
+        if options["profiles"] < 1 or options["requests"] < 1:
+            raise CommandError("At least one profile and one request are needed.")
+
+        # The benchmark uses the test factories, which aren't installed in the
+        # production image, so it's only imported when the command is run
+        try:
+            from utils.tests.graphql_api_benchmark import GraphQLAPIBenchmark
+        except ImportError as e:
+            raise CommandError(
+                f"The benchmark needs the development dependencies: {e}"
+            ) from e
+
+        results = GraphQLAPIBenchmark(options["seed"]).run(
+            options["profiles"],
+            options["warmup"],
+            options["requests"],
+            log=self.stdout.write,
+        )
+
+        self.write_report(results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def write_report(self, results):
+        header = (
+            f"{'operation':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'ops/s':>9}{'queries':>9}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, result in results["operations"].items():
+            self.stdout.write(
+                f"{name:<28}{result['count']:>7}"
+                f"{result['p50'] * 1000:>10.1f}{result['p95'] * 1000:>10.1f}"
+                f"{result['p99'] * 1000:>10.1f}{result['throughput']:>9.1f}"
+                f"{result['queries']:>9.1f}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{results['requests']} operations in {results['duration']:.2f} s, "
+                f"{results['requests'] / results['duration']:.1f} operations/s."
+            )
+        )
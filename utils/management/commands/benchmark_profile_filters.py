@@ -0,0 +1,203 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from profiles.models import Address, Email, Phone, Profile
+from profiles.schema import ProfileFilter, is_connected_to_service
+from services.models import Service
+
+PAGE_SIZE = 20
+
+# Filters of the staff profiles search, combined one more at a time, as
+# (filter name, lookup, value)
+FILTERS = (
+    ("emails__email", "icontains", "user_0001"),
+    ("phones__primary", "exact", True),
+    ("addresses__city", "icontains", "a"),
+    ("emails__primary", "exact", True),
+    ("addresses__primary", "exact", True),
+    ("phones__phone", "icontains", "0"),
+)
+
+
+def _join_queryset(service, filters):
+    """The profiles search as it was filtered with a join for every filter"""
+    queryset = Profile.objects.filter(service_connections__service=service)
+    for name, lookup, value in filters:
+        queryset = queryset.filter(**{f"{name}__{lookup}": value})
+    return queryset
+
+
+def _exists_queryset(service, filters):
+    """The profiles search as it's filtered by the profiles query"""
+    return ProfileFilter(
+        data={name: value for name, _, value in filters},
+        queryset=Profile.objects.filter(is_connected_to_service(service)),
+    ).qs
+
+
+STRATEGIES = (("join", _join_queryset), ("exists", _exists_queryset))
+
+# The copied columns of the contacts, and the one made unique for every copy
+CONTACT_COPY_COLUMNS = (
+    (Email, ("email_type",), "email"),
+    (Phone, ("phone_type",), "phone"),
+    (Address, ("address_type", "postal_code", "city", "country_code"), "address"),
+)
+
+
+def _add_contacts(service, count):
+    """
+    Adds copies of the primary contacts as non-primary contacts to the profiles of
+    the service, as many profiles have several contacts of a type.
+    """
+    with connection.cursor() as cursor:
+        for model, columns, unique_column in CONTACT_COPY_COLUMNS:
+            column_list = ", ".join(columns)
+            copied_list = ", ".join(f"contact.{column}" for column in columns)
+            cursor.execute(
+                f"""
+                INSERT INTO {model._meta.db_table}
+                    (profile_id, "primary", {unique_column}, {column_list}
+                    {", verified" if model is Email else ""})
+                SELECT contact.profile_id, false,
+                    n || '.' || contact.{unique_column}, {copied_list}
+                    {", false" if model is Email else ""}
+                FROM {model._meta.db_table} contact
+                JOIN services_serviceconnection connection
+                    ON connection.profile_id = contact.profile_id
+                CROSS JOIN generate_series(1, %s) n
+                WHERE connection.service_id = %s AND contact."primary"
+                """,
+                [count, service.pk],
+            )
+            cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+
+def _explain_analyze(sql, params):
+    """Returns the execution time of the query in milliseconds"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Execution Time"]
+
+
+def _measure(queryset, repeat):
+    """
+    Measures the queries of the profiles connection: the first page and the total
+    count. Returns their best execution times and the number of rows, which the
+    joins multiply.
+    """
+    page_sql, page_params = queryset.order_by("id")[:PAGE_SIZE].query.sql_with_params()
+    ids_sql, ids_params = queryset.values("pk").query.sql_with_params()
+    count_sql = f"SELECT COUNT(*) FROM ({ids_sql}) profiles"
+
+    page_timings, count_timings = [], []
+    for _ in range(repeat):
+        page_timings.append(_explain_analyze(page_sql, page_params))
+        count_timings.append(_explain_analyze(count_sql, ids_params))
+    total = queryset.values("pk").count()
+    return min(page_timings), min(count_timings), total
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the database execution time of the staff profiles search with "
+        "more and more filters combined, with the filters as joins and as EXISTS "
+        "subqueries. Uses the profiles in the database, e.g. ones generated with "
+        "seed_development_data --bulk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--service",
+            help="Name of the service whose profiles are searched (default: the "
+            "service with the most connected profiles).",
+        )
+        parser.add_argument(
+            "-r",
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of times each query is run, the best run is reported (default: 3).",  # noqa: E501
+        )
+        parser.add_argument(
+            "--extra-contacts",
+            type=int,
+            default=0,
+            help="Number of non-primary contacts of each type temporarily added to "
+            "the searched profiles. They are rolled back afterwards (default: 0).",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Write the results as JSON to this file, for comparing runs.",
+        )
+
+    def handle(self, *args, **options):
+        service = self.get_service(options["service"])
+
+        with transaction.atomic():
+            if options["extra_contacts"] > 0:
+                self.stdout.write(
+                    f"Adding {options['extra_contacts']} contacts of each type to "
+                    "the profiles..."
+                )
+                _add_contacts(service, options["extra_contacts"])
+
+            results = self.run_benchmark(service, options["repeat"])
+
+            transaction.set_rollback(True)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"service": service.name, "results": results}, f, indent=2)
+
+    def run_benchmark(self, service, repeat):
+        self.stdout.write(
+            f"Searching the profiles of service {service.name}, best of {repeat} runs:"
+        )
+        self.stdout.write(
+            f"{'filters':>7} {'strategy':>8} {'page ms':>9} {'count ms':>9} {'total':>9}"  # noqa: E501
+        )
+
+        results = []
+        for filter_count in range(len(FILTERS) + 1):
+            filters = FILTERS[:filter_count]
+            for strategy, get_queryset in STRATEGIES:
+                page_ms, count_ms, total = _measure(
+                    get_queryset(service, filters), repeat
+                )
+                results.append(
+                    {
+                        "filters": [name for name, _, _ in filters],
+                        "strategy": strategy,
+                        "page_ms": page_ms,
+                        "count_ms": count_ms,
+                        "total": total,
+                    }
+                )
+                self.stdout.write(
+                    f"{filter_count:>7} {strategy:>8} {page_ms:>9.2f} "
+                    f"{count_ms:>9.2f} {total:>9}"
+                )
+
+        return results
+
+    @staticmethod
+    def get_service(name):
+        services = Service.objects.all()
+        if name:
+            services = services.filter(name=name)
+        service = (
+            services.annotate(profile_count=Count("serviceconnection"))
+            .order_by("-profile_count")
+            .first()
+        )
+        if service is None:
+            raise CommandError("No service to search the profiles of.")
+        return service
@@ -0,0 +1,94 @@
+import os
+import time
+
+from database_sanitizer.config import Configuration
+from database_sanitizer.dump.postgres import get_value_line_sanitizer
+from django.core.management.base import BaseCommand, CommandError
+
+from sanitizers import profile
+from sanitizers.dump import sanitize_dump_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the rows per second sanitized by create_sanitized_dump and by "
+        "create_parallel_sanitized_dump, using generated rows of a table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-c",
+            "--count",
+            type=int,
+            default=50000,
+            help="Number of rows to sanitize (default: 50000).",
+        )
+        parser.add_argument(
+            "--table",
+            default="profiles_verifiedpersonalinformation",
+            help="Table whose sanitizer configuration is used (default: profiles_verifiedpersonalinformation).",  # noqa: E501
+        )
+        parser.add_argument(
+            "--config",
+            default=".sanitizerconfig",
+            help="Sanitizer configuration file (default: .sanitizerconfig).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes of the parallel dump (default: number of CPUs).",  # noqa: E501
+        )
+
+    def handle(self, *args, **options):
+        if not profile.dummy_field.keys[0]:
+            raise CommandError(
+                "Please set the SANITIZED_DUMP_FIELD_ENCRYPTION_KEYS environment "
+                "variable."
+            )
+
+        config = Configuration.from_file(options["config"])
+        table = options["table"]
+        columns = [
+            key.split(".", 1)[1]
+            for key in config.sanitizers
+            if key.split(".", 1)[0] == table
+        ]
+        if not columns:
+            raise CommandError(f"No sanitizers are configured for table {table}.")
+
+        count = options["count"]
+        lines = ["\t".join(["value"] * len(columns))] * count
+        copy_statement = (
+            f'COPY "public"."{table}" '
+            f"({', '.join(f'"{column}"' for column in columns)}) FROM stdin;"
+        )
+
+        self.stdout.write(f"Sanitizing {count} rows of {len(columns)} columns...")
+
+        sanitize_line = get_value_line_sanitizer(config, table, columns)
+        start = time.perf_counter()
+        for line in lines:
+            sanitize_line(line)
+        current_duration = time.perf_counter() - start
+        self.stdout.write(
+            f"  create_sanitized_dump: {count / current_duration:.0f} rows/s"
+        )
+
+        start = time.perf_counter()
+        for _ in sanitize_dump_lines(
+            [copy_statement, *lines, "\\."], config, workers=options["workers"]
+        ):
+            pass
+        parallel_duration = time.perf_counter() - start
+        self.stdout.write(
+            f"  create_parallel_sanitized_dump ({options['workers']} workers): "
+            f"{count / parallel_duration:.0f} rows/s"
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"The parallel dump was {current_duration / parallel_duration:.1f} "
+                "times as fast."
+            )
+        )
@@ -1,3 +1,6 @@
+import os
+import time
+
 import factory
 from django.core import management
 from django.core.management.base import BaseCommand
@@ -10,6 +13,7 @@ from utils.utils import (
     generate_group_admins,
     generate_groups_for_services,
     generate_profiles,
+    generate_profiles_in_bulk,
     generate_service_connections,
     generate_services,
 )
@@ -87,6 +91,33 @@ class Command(BaseCommand):
         parser.add_argument(
             "--superuser", help="Add admin/admin superuser", action="store_true"
         )
+        parser.add_argument(
+            "--bulk",
+            help="Generate the profiles in bulk, for large performance testing data sets",  # noqa: E501
+            action="store_true",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of worker processes generating profiles in bulk mode",
+            default=os.cpu_count(),
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Number of profiles created per transaction in bulk mode",
+            default=5000,
+        )
+        parser.add_argument(
+            "--with-vpi",
+            help="Add verified personal information to the profiles in bulk mode",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--with-sensitive-data",
+            help="Add sensitive data to the profiles in bulk mode",
+            action="store_true",
+        )
 
     def handle(self, *args, **kwargs):
         no_clear = kwargs["no_clear"]
@@ -123,8 +154,33 @@ class Command(BaseCommand):
             self.stdout.write("Generating group admins...")
             generate_group_admins(groups=groups, faker=faker)
             self.stdout.write(f"Generating profiles ({profile_count})...")
-            generate_profiles(profile_count, faker=faker)
-            self.stdout.write("Generating service connections...")
-            generate_service_connections()
+            if kwargs["bulk"]:
+                self.generate_profiles_in_bulk(profile_count, faker, kwargs)
+            else:
+                generate_profiles(profile_count, faker=faker)
+                self.stdout.write("Generating service connections...")
+                generate_service_connections()
 
         self.stdout.write(self.style.SUCCESS("Done - Development fake data"))
+
+    def generate_profiles_in_bulk(self, profile_count, faker, kwargs):
+        start_time = time.monotonic()
+
+        def report_progress(created):
+            self.stdout.write(f"  {created}/{profile_count} profiles")
+
+        generate_profiles_in_bulk(
+            profile_count,
+            faker=faker,
+            chunk_size=kwargs["chunk_size"],
+            workers=kwargs["workers"],
+            verified_personal_information=kwargs["with_vpi"],
+            sensitive_data=kwargs["with_sensitive_data"],
+            on_progress=report_progress,
+        )
+
+        duration = time.monotonic() - start_time
+        self.stdout.write(
+            f"Generated {profile_count} profiles in {duration:.1f} s "
+            f"({profile_count / duration:.0f} profiles/s)"
+        )
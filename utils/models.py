@@ -1,7 +1,43 @@
+import contextvars
+import functools
 import uuid
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models.fields.reverse_related import OneToOneRel
+from django.db.models.query import ModelIterable
+from encrypted_fields.fields import SearchField
+
+from utils.fields import EncryptedValue
+
+# Whether the instances being loaded keep their loaded values
+_track_changes = contextvars.ContextVar("track_changes", default=False)
+
+
+class ChangeTrackingIterableMixin:
+    """Loads model instances which keep the values they were loaded with"""
+
+    def __iter__(self):
+        instances = super().__iter__()
+        while True:
+            # The related instances of select_related are loaded while fetching the
+            # next instance, so they keep their values too.
+            token = _track_changes.set(True)
+            try:
+                instance = next(instances)
+            except StopIteration:
+                return
+            finally:
+                _track_changes.reset(token)
+            yield instance
+
+
+@functools.cache
+def _change_tracking_iterable(iterable_class):
+    return type(
+        f"ChangeTracking{iterable_class.__name__}",
+        (ChangeTrackingIterableMixin, iterable_class),
+        {},
+    )
 
 
 class UUIDModel(models.Model):
@@ -84,11 +120,123 @@ class SerializableMixin(models.Model):
                 for obj in self.get_queryset().all()
             ]
 
+        def update_or_create_if_changed(self, defaults=None, **kwargs):
+            """
+            Like `update_or_create`, but an existing object is updated only if the
+            defaults change it, and then only the changed fields are written.
+            """
+            with transaction.atomic(using=self.db):
+                obj, created = (
+                    self.track_changes()
+                    .select_for_update()
+                    .get_or_create(defaults=defaults, **kwargs)
+                )
+                if not created:
+                    for field, value in (defaults or {}).items():
+                        setattr(obj, field, value)
+                    obj.save_if_changed(using=self.db)
+            return obj, created
+
+        def track_changes(self):
+            """
+            Returns a queryset whose model instances, and the ones loaded with
+            `select_related`, keep the values they were loaded with, so that
+            `get_changed_fields` can tell which fields have changed.
+            """
+            queryset = self.get_queryset()
+            if issubclass(queryset._iterable_class, ModelIterable):
+                queryset._iterable_class = _change_tracking_iterable(
+                    queryset._iterable_class
+                )
+            return queryset
+
     class Meta:
         abstract = True
 
     objects = SerializableManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if _track_changes.get():
+            instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_changed_fields(self):
+        """
+        Returns the names of the fields whose values differ from the ones loaded from
+        the database, or None if they are unknown because the instance wasn't loaded
+        with `track_changes` or wasn't loaded from the database at all.
+
+        Encrypted values are compared as plaintext. They are decrypted for the
+        comparison only if the field has been assigned a value. A search field is
+        changed when its encrypted data field is.
+        """
+        loaded_values = getattr(self, "_loaded_values", None)
+        if loaded_values is None:
+            return None
+
+        changed_fields = []
+        search_fields = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key:
+                continue
+            if isinstance(field, SearchField):
+                search_fields.append(field)
+                continue
+
+            if field.attname not in loaded_values:
+                # A deferred field is changed if it has been assigned a value
+                if field.attname in self.__dict__:
+                    changed_fields.append(field.name)
+                continue
+
+            current_value = self.__dict__.get(field.attname)
+            loaded_value = loaded_values[field.attname]
+            if current_value is loaded_value:
+                continue
+            if isinstance(loaded_value, EncryptedValue):
+                loaded_value = loaded_value.resolve()
+            if field.to_python(current_value) != loaded_value:
+                changed_fields.append(field.name)
+
+        for field in search_fields:
+            if field.encrypted_field_name in changed_fields:
+                changed_fields.append(field.name)
+
+        return changed_fields
+
+    def save_if_changed(self, **kwargs):
+        """
+        Saves a new instance. Otherwise updates only the fields which have changed
+        since the instance was loaded, or nothing at all if none have, to avoid
+        needless writes and encryption.
+
+        Returns True if the instance was saved.
+        """
+        changed_fields = None if self._state.adding else self.get_changed_fields()
+        if changed_fields is not None:
+            if not changed_fields:
+                return False
+            kwargs["update_fields"] = changed_fields
+
+        self.save(**kwargs)
+
+        saved_fields = [
+            field
+            for field in self._meta.concrete_fields
+            if changed_fields is None or field.name in changed_fields
+        ]
+        self._loaded_values = {
+            **getattr(self, "_loaded_values", {}),
+            **{
+                field.attname: self.__dict__[field.attname]
+                for field in saved_fields
+                if field.attname in self.__dict__
+            },
+        }
+        return True
+
     def _resolve_field(self, model, field):
         def _resolve_value(data, field):
             if "accessor" in field:
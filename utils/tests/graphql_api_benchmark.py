@@ -0,0 +1,371 @@
+import json
+import random
+import re
+import statistics
+import time
+import uuid
+
+import jwt
+import requests_mock
+from django.contrib.auth.models import Group
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from faker import Faker
+from guardian.shortcuts import assign_perm
+
+from open_city_profile.tests.factories import UserFactory
+from open_city_profile.tests.keys import rsa_key
+from profiles.models import Profile
+from profiles.tests.factories import (
+    EmailFactory,
+    PhoneFactory,
+    SensitiveDataFactory,
+    VerifiedPersonalInformationFactory,
+)
+from services.models import AllowedDataField
+from services.tests.factories import ServiceClientIdFactory, ServiceConnectionFactory
+from utils.utils import generate_profiles
+
+ISSUER = "https://oidc.benchmark.invalid"
+AUDIENCE = "benchmark-audience"
+KEYCLOAK_BASE_URL = "https://keycloak.benchmark.invalid"
+KEYCLOAK_REALM = "benchmark"
+GDPR_URL = "https://gdpr.benchmark.invalid/profiles/$profile_id"
+
+BENCHMARK_SETTINGS = {
+    # The host name used by the in-process test client
+    "ALLOWED_HOSTS": ["testserver"],
+    "OIDC_API_TOKEN_AUTH": {
+        "AUDIENCE": AUDIENCE,
+        "ISSUER": ISSUER,
+        "REQUIRE_API_SCOPE_FOR_AUTHENTICATION": False,
+    },
+    "KEYCLOAK_BASE_URL": KEYCLOAK_BASE_URL,
+    "KEYCLOAK_REALM": KEYCLOAK_REALM,
+    "KEYCLOAK_CLIENT_ID": "benchmark-client",
+    "KEYCLOAK_CLIENT_SECRET": "secret",
+    "KEYCLOAK_GDPR_CLIENT_ID": "benchmark-gdpr-client",
+    "KEYCLOAK_GDPR_CLIENT_SECRET": "secret",
+    "GDPR_AUTH_CALLBACK_URL": "https://profile.benchmark.invalid/callback",
+}
+
+ALLOWED_DATA_FIELDS = ("name", "email", "phone", "address", "personalidentitycode")
+
+STAFF_PERMISSIONS = (
+    "can_view_profiles",
+    "can_manage_profiles",
+    "can_view_sensitivedata",
+    "can_view_verified_personal_information",
+)
+
+MY_PROFILE_QUERY = """
+    query MyProfile {
+        myProfile {
+            firstName
+            lastName
+            primaryEmail { email }
+            primaryPhone { phone }
+            primaryAddress { address city }
+            emails { edges { node { email primary } } }
+            phones { edges { node { phone primary } } }
+            addresses { edges { node { address primary } } }
+            verifiedPersonalInformation {
+                firstName
+                nationalIdentificationNumber
+                permanentAddress { streetAddress postalCode }
+            }
+        }
+    }
+"""
+
+PROFILES_QUERY = """
+    query Profiles($lastName: String, $after: String) {
+        profiles(first: 20, lastName: $lastName, after: $after) {
+            totalCount
+            pageInfo { endCursor hasNextPage }
+            edges {
+                node {
+                    firstName
+                    lastName
+                    primaryEmail { email }
+                    primaryPhone { phone }
+                }
+            }
+        }
+    }
+"""
+
+UPDATE_MY_PROFILE_MUTATION = """
+    mutation UpdateMyProfile($input: UpdateMyProfileMutationInput!) {
+        updateMyProfile(input: $input) {
+            profile { firstName nickname }
+        }
+    }
+"""
+
+CREATE_OR_UPDATE_USER_PROFILE_MUTATION = """
+    mutation CreateOrUpdateUserProfile(
+        $input: CreateOrUpdateUserProfileMutationInput!
+    ) {
+        createOrUpdateUserProfile(input: $input) {
+            profile { id }
+        }
+    }
+"""
+
+DOWNLOAD_MY_PROFILE_QUERY = """
+    query DownloadMyProfile {
+        downloadMyProfile(authorizationCode: "benchmark")
+    }
+"""
+
+
+def _percentile(sorted_values, percent):
+    """Returns the given percentile of the values using linear interpolation"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[percent - 1]
+
+
+class GraphQLAPIBenchmark:
+    """
+    Seeds profiles and replays a mix of GraphQL operations against the API
+    in-process, with Keycloak and the GDPR APIs of the services stubbed.
+
+    Uses the test factories and requests-mock, so it's kept with the tests and
+    needs the development dependencies.
+    """
+
+    # (operation name, relative weight)
+    OPERATION_MIX = (
+        ("myProfile", 50),
+        ("profiles", 20),
+        ("updateMyProfile", 15),
+        ("createOrUpdateUserProfile", 10),
+        ("downloadMyProfile", 5),
+    )
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        random.seed(seed)
+        self.faker = Faker()
+        self.faker.seed_instance(seed)
+
+    def run(self, profile_count, warmup, request_count, log):
+        """
+        Returns the results of replaying the operations. The generated data is
+        rolled back afterwards.
+        """
+        with (
+            override_settings(**BENCHMARK_SETTINGS),
+            requests_mock.Mocker() as mocker,
+            transaction.atomic(),
+        ):
+            self.stub_external_services(mocker)
+
+            log(f"Seeding {profile_count} profiles...")
+            self.seed_data(profile_count)
+
+            self.client = Client()
+            self.replay(warmup)
+            results = self.replay(request_count)
+
+            transaction.set_rollback(True)
+
+        return results
+
+    @staticmethod
+    def stub_external_services(mocker):
+        mocker.get(
+            f"{ISSUER}/.well-known/openid-configuration",
+            json={"issuer": ISSUER, "jwks_uri": f"{ISSUER}/jwks"},
+        )
+        mocker.get(f"{ISSUER}/jwks", json={"keys": [rsa_key.public_key_jwk]})
+
+        keycloak_realm_url = f"{KEYCLOAK_BASE_URL}/realms/{KEYCLOAK_REALM}"
+        token_endpoint = f"{keycloak_realm_url}/protocol/openid-connect/token"
+        mocker.get(
+            f"{keycloak_realm_url}/.well-known/openid-configuration",
+            json={"token_endpoint": token_endpoint},
+        )
+        mocker.post(
+            token_endpoint,
+            json={"access_token": "token", "token_type": "bearer", "expires_in": 300},
+        )
+        mocker.register_uri(
+            requests_mock.ANY,
+            re.compile(
+                re.escape(f"{KEYCLOAK_BASE_URL}/admin/realms/{KEYCLOAK_REALM}/users/")
+            ),
+            json={},
+        )
+
+        mocker.get(
+            re.compile(re.escape(GDPR_URL.split("$")[0])),
+            json={
+                "key": "BENCHMARK",
+                "children": [{"key": "CUSTOMERID", "value": "123"}],
+            },
+        )
+
+    def seed_data(self, profile_count):
+        service_client_id = ServiceClientIdFactory(
+            service__name="benchmark",
+            service__gdpr_url=GDPR_URL,
+            service__gdpr_query_scope="benchmark.gdprquery",
+            service__gdpr_delete_scope="benchmark.gdprdelete",
+            service__gdpr_audience="benchmark",
+        )
+        self.service = service_client_id.service
+        self.service_client_id = service_client_id.client_id
+        for field_name in ALLOWED_DATA_FIELDS:
+            field, created = AllowedDataField.objects.get_or_create(
+                field_name=field_name, defaults={"label": field_name}
+            )
+            self.service.allowed_data_fields.add(field)
+
+        existing_profiles = set(Profile.objects.values_list("pk", flat=True))
+        generate_profiles(k=profile_count, faker=self.faker)
+        self.profiles = list(
+            Profile.objects.exclude(pk__in=existing_profiles).select_related("user")
+        )
+        for profile in self.profiles:
+            EmailFactory(profile=profile, primary=False)
+            PhoneFactory(profile=profile, primary=False)
+            SensitiveDataFactory(profile=profile)
+            VerifiedPersonalInformationFactory(profile=profile)
+            ServiceConnectionFactory(profile=profile, service=self.service)
+
+        group = Group.objects.create(name=f"benchmark staff {uuid.uuid4()}")
+        for permission in STAFF_PERMISSIONS:
+            assign_perm(permission, group, self.service)
+        self.staff_user = UserFactory()
+        self.staff_user.groups.add(group)
+
+        self.system_user = UserFactory()
+        assign_perm("profiles.manage_verified_personal_information", self.system_user)
+
+        self.tokens = {}
+
+    def get_token(self, user):
+        """Returns an access token of the user, reused like a real client would"""
+        if user.pk not in self.tokens:
+            now = int(time.time())
+            claims = {
+                "iss": ISSUER,
+                "aud": AUDIENCE,
+                "sub": str(user.uuid),
+                "sid": str(uuid.uuid4()),
+                "azp": self.service_client_id,
+                "loa": "substantial",
+                "iat": now,
+                "exp": now + 3600,
+            }
+            self.tokens[user.pk] = jwt.encode(
+                claims, key=rsa_key.private_key_pem, algorithm=rsa_key.jose_algorithm
+            )
+        return self.tokens[user.pk]
+
+    def build_operation(self, name):
+        """Returns the user, query and variables of a random operation"""
+        profile = self.random.choice(self.profiles)
+
+        if name == "myProfile":
+            return profile.user, MY_PROFILE_QUERY, {}
+        if name == "profiles":
+            variables = {"lastName": profile.last_name[:3] or None}
+            if self.random.random() < 0.5:
+                variables["after"] = self.get_next_page_cursor(variables)
+            return self.staff_user, PROFILES_QUERY, variables
+        if name == "updateMyProfile":
+            variables = {
+                "input": {
+                    "profile": {
+                        "nickname": self.faker.first_name(),
+                        "addEmails": [
+                            {"email": self.faker.email(), "emailType": "WORK"}
+                        ],
+                    }
+                }
+            }
+            return profile.user, UPDATE_MY_PROFILE_MUTATION, variables
+        if name == "createOrUpdateUserProfile":
+            variables = {
+                "input": {
+                    "userId": str(
+                        profile.user.uuid
+                        if self.random.random() < 0.5
+                        else uuid.uuid4()
+                    ),
+                    "serviceClientId": self.service_client_id,
+                    "profile": {
+                        "firstName": self.faker.first_name(),
+                        "lastName": self.faker.last_name(),
+                        "primaryEmail": {"email": self.faker.email()},
+                        "verifiedPersonalInformation": {
+                            "firstName": self.faker.first_name(),
+                            "lastName": self.faker.last_name(),
+                            "municipalityOfResidence": self.faker.city(),
+                            "permanentAddress": {
+                                "streetAddress": self.faker.street_address(),
+                                "postalCode": "00100",
+                                "postOffice": "Helsinki",
+                            },
+                        },
+                    },
+                }
+            }
+            return self.system_user, CREATE_OR_UPDATE_USER_PROFILE_MUTATION, variables
+        if name == "downloadMyProfile":
+            return profile.user, DOWNLOAD_MY_PROFILE_QUERY, {}
+
+        raise ValueError(f"Unknown operation {name}")
+
+    def get_next_page_cursor(self, variables):
+        data = self.run_operation(self.staff_user, PROFILES_QUERY, variables)
+        return data["profiles"]["pageInfo"]["endCursor"]
+
+    def run_operation(self, user, query, variables):
+        response = self.client.post(
+            "/graphql/",
+            json.dumps({"query": query, "variables": variables}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.get_token(user)}",
+        )
+        body = response.json()
+        if response.status_code != 200 or body.get("errors"):
+            raise CommandError(f"Operation failed: {body.get('errors') or body}")
+        return body["data"]
+
+    def replay(self, count):
+        names = [name for name, weight in self.OPERATION_MIX]
+        weights = [weight for name, weight in self.OPERATION_MIX]
+        measurements = {name: {"durations": [], "queries": []} for name in names}
+
+        total_start = time.perf_counter()
+        for name in self.random.choices(names, weights, k=count):
+            user, query, variables = self.build_operation(name)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                self.run_operation(user, query, variables)
+                duration = time.perf_counter() - start
+            measurements[name]["durations"].append(duration)
+            measurements[name]["queries"].append(len(queries))
+        total_duration = time.perf_counter() - total_start
+
+        results = {"requests": count, "duration": total_duration, "operations": {}}
+        for name, measurement in measurements.items():
+            durations = sorted(measurement["durations"])
+            if not durations:
+                continue
+            results["operations"][name] = {
+                "count": len(durations),
+                "p50": _percentile(durations, 50),
+                "p95": _percentile(durations, 95),
+                "p99": _percentile(durations, 99),
+                "throughput": len(durations) / sum(durations),
+                "queries": statistics.mean(measurement["queries"]),
+            }
+        return results
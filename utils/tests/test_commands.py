@@ -1,9 +1,16 @@
+import json
+from io import StringIO
+
 import pytest
 from django.contrib.auth.models import Group
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 
-from profiles.models import Profile
+from profiles.models import Email, Profile, VerifiedPersonalInformation
+from profiles.tests.factories import EmailFactory, ProfileFactory
+from sanitizers import dump as sanitizer_dump
+from sanitizers import profile as sanitizer_profile
 from services.models import AllowedDataField, Service
+from services.tests.factories import ServiceConnectionFactory, ServiceFactory
 from users.models import User
 from utils.management.commands.seed_development_data import DATA_FIELD_VALUES
 from utils.utils import SERVICES
@@ -40,3 +47,101 @@ def test_command_seed_development_data_with_more_arguments():
     call_command("seed_development_data", *args)
     assert Profile.objects.count() == 20
     assert User.objects.filter(is_superuser=True).count() == 1
+
+
+def test_command_seed_development_data_in_bulk():
+    args = [
+        "--no-clear",  # Flushing not needed in tests + it caused test failures
+        "--profilecount=20",
+        "--bulk",
+        # Worker processes wouldn't see the data of the test transaction
+        "--workers=1",
+        "--chunk-size=8",
+        "--with-vpi",
+        "--with-sensitive-data",
+    ]
+    call_command("seed_development_data", *args)
+
+    assert Profile.objects.count() == 20
+    assert VerifiedPersonalInformation.objects.count() == 20
+    assert Profile.objects.filter(service_connections__isnull=True).count() == 0
+
+
+def test_command_benchmark_encrypted_fields_rolls_back_generated_data():
+    out = StringIO()
+    call_command("benchmark_encrypted_fields", "--count=5", "--repeat=1", stdout=out)
+
+    assert "Not reading the encrypted fields saved" in out.getvalue()
+    assert Profile.objects.count() == 0
+    assert VerifiedPersonalInformation.objects.count() == 0
+
+
+def test_command_benchmark_graphql_api_reports_operations_and_rolls_back(tmp_path):
+    out = StringIO()
+    output_file = tmp_path / "results.json"
+    call_command(
+        "benchmark_graphql_api",
+        "--profiles=5",
+        "--requests=20",
+        "--warmup=0",
+        f"--output={output_file}",
+        stdout=out,
+    )
+
+    assert "operations/s" in out.getvalue()
+    results = json.loads(output_file.read_text())
+    assert results["requests"] == 20
+    assert sum(result["count"] for result in results["operations"].values()) == 20
+    for result in results["operations"].values():
+        assert result["p50"] <= result["p95"] <= result["p99"]
+    assert Profile.objects.count() == 0
+    assert Service.objects.count() == 0
+
+
+def test_command_benchmark_sanitized_dump_reports_both_dumps(monkeypatch):
+    monkeypatch.setattr(
+        sanitizer_profile.DummyField,
+        "keys",
+        ["000111222333444555666777888999aaabbbcccdddeeefff0001112223334445"],
+    )
+    monkeypatch.setattr(sanitizer_dump, "_encryptor", None)
+    out = StringIO()
+    call_command("benchmark_sanitized_dump", "--count=20", "--workers=1", stdout=out)
+
+    output = out.getvalue()
+    assert "create_sanitized_dump:" in output
+    assert "create_parallel_sanitized_dump (1 workers):" in output
+
+
+def test_command_benchmark_profile_filters_reports_both_strategies(tmp_path):
+    service = ServiceFactory()
+    for profile in ProfileFactory.create_batch(2):
+        ServiceConnectionFactory(profile=profile, service=service)
+        EmailFactory(profile=profile, primary=True, email="user_0001@example.com")
+    out = StringIO()
+    output_file = tmp_path / "results.json"
+
+    call_command(
+        "benchmark_profile_filters",
+        "--repeat=1",
+        "--extra-contacts=1",
+        f"--output={output_file}",
+        stdout=out,
+    )
+
+    assert f"Searching the profiles of service {service.name}" in out.getvalue()
+    results = json.loads(output_file.read_text())["results"]
+    totals = {
+        (len(result["filters"]), result["strategy"]): result["total"]
+        for result in results
+    }
+    assert totals[(1, "exists")] == 2
+    # The join returns a row for both emails of the profiles
+    assert totals[(1, "join")] == 4
+    # The extra contacts are rolled back
+    assert Email.objects.count() == 2
+
+
+def test_command_benchmark_profile_filters_requires_a_service():
+    with pytest.raises(CommandError):
+        call_command("benchmark_profile_filters")
@@ -1,6 +1,11 @@
-from encrypted_fields.fields import SearchField
+import json
 
-from utils.fields import CallableHashKeyEncryptedSearchField
+import pytest
+from encrypted_fields.fields import EncryptedFieldMixin, SearchField
+
+from profiles.models import Profile, VerifiedPersonalInformation
+from profiles.tests.factories import VerifiedPersonalInformationFactory
+from utils.fields import CallableHashKeyEncryptedSearchField, decryption_cache
 
 
 def test_callable_hash_key():
@@ -26,3 +31,112 @@ def test_callable_hash_key():
     ]
 
     assert len(set(return_values)) == 1, f"Values should be the same {return_values}"
+
+
+def test_callable_hash_key_is_resolved_once(mocker):
+    get_test_hash_key = mocker.Mock(return_value="testing")
+    field = CallableHashKeyEncryptedSearchField(
+        encrypted_field_name="insignificant", hash_key=get_test_hash_key
+    )
+
+    field.get_prep_value("first")
+    field.get_prep_value("second")
+
+    get_test_hash_key.assert_called_once()
+
+
+def test_get_prep_values_hashes_like_get_prep_value():
+    field = CallableHashKeyEncryptedSearchField(
+        encrypted_field_name="insignificant", hash_key="testing"
+    )
+
+    assert field.get_prep_values(["first", "second"]) == {
+        field.get_prep_value("first"): "first",
+        field.get_prep_value("second"): "second",
+    }
+
+
+@pytest.fixture
+def decrypt_spy(mocker):
+    return mocker.spy(EncryptedFieldMixin, "decrypt")
+
+
+def test_encrypted_field_is_decrypted_on_first_access(decrypt_spy):
+    vpi = VerifiedPersonalInformationFactory(given_name="Kalle")
+
+    vpi = VerifiedPersonalInformation.objects.get(pk=vpi.pk)
+    assert decrypt_spy.call_count == 0
+
+    assert vpi.given_name == "Kalle"
+    assert type(vpi.given_name) is str
+    assert decrypt_spy.call_count == 1
+
+
+def test_search_field_value_is_decrypted_on_first_access(decrypt_spy):
+    vpi = VerifiedPersonalInformationFactory(
+        national_identification_number="010199-1234"
+    )
+
+    vpi = VerifiedPersonalInformation.objects.get(pk=vpi.pk)
+    assert decrypt_spy.call_count == 0
+
+    assert vpi.national_identification_number == "010199-1234"
+    assert decrypt_spy.call_count == 1
+
+
+def test_related_instance_is_decrypted_on_first_access(decrypt_spy):
+    vpi = VerifiedPersonalInformationFactory(given_name="Kalle")
+
+    vpi = Profile.objects.get(pk=vpi.profile_id).verified_personal_information
+    assert decrypt_spy.call_count == 0
+
+    assert vpi.given_name == "Kalle"
+    assert decrypt_spy.call_count == 1
+
+
+def test_values_of_encrypted_fields_are_plaintext_strings():
+    vpi = VerifiedPersonalInformationFactory(given_name="Kalle")
+
+    values = VerifiedPersonalInformation.objects.values("given_name").get()
+    given_name = VerifiedPersonalInformation.objects.values_list(
+        "given_name", flat=True
+    ).get()
+    related_given_name = Profile.objects.values_list(
+        "verified_personal_information__given_name", flat=True
+    ).get(pk=vpi.profile_id)
+
+    for value in (values["given_name"], given_name, related_given_name):
+        assert type(value) is str
+    assert json.dumps(values) == '{"given_name": "Kalle"}'
+
+
+def test_lazily_decrypted_value_is_saved_unchanged():
+    vpi = VerifiedPersonalInformationFactory(given_name="Kalle")
+
+    VerifiedPersonalInformation.objects.get(pk=vpi.pk).save()
+
+    vpi.refresh_from_db()
+    assert vpi.given_name == "Kalle"
+
+
+def test_decrypted_values_are_memoized_inside_decryption_cache(decrypt_spy):
+    vpi = VerifiedPersonalInformationFactory(given_name="Kalle")
+
+    with decryption_cache():
+        for _ in range(3):
+            assert (
+                VerifiedPersonalInformation.objects.get(pk=vpi.pk).given_name == "Kalle"
+            )
+
+    assert decrypt_spy.call_count == 1
+
+
+def test_decrypted_values_are_not_memoized_outside_decryption_cache(decrypt_spy):
+    vpi = VerifiedPersonalInformationFactory(given_name="Kalle")
+
+    with decryption_cache():
+        assert VerifiedPersonalInformation.objects.get(pk=vpi.pk).given_name == "Kalle"
+
+    assert VerifiedPersonalInformation.objects.get(pk=vpi.pk).given_name == "Kalle"
+
+    assert decrypt_spy.call_count == 2
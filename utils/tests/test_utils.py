@@ -5,16 +5,19 @@ from faker import Faker
 from guardian.shortcuts import get_group_perms
 
 from open_city_profile.tests.factories import GroupFactory
-from profiles.models import Profile
+from profiles.models import Profile, VerifiedPersonalInformation
+from profiles.validators import validate_finnish_national_identification_number
 from services.models import Service, ServiceConnection
 from users.models import User
 from utils.utils import (
+    BULK_USERNAME_PREFIX,
     SERVICES,
     assign_permissions,
     create_user,
     generate_group_admins,
     generate_groups_for_services,
     generate_profiles,
+    generate_profiles_in_bulk,
     generate_service_connections,
     generate_services,
 )
@@ -117,3 +120,53 @@ def test_generate_service_connections(profiles):
         .count()
         == profiles
     )
+
+
+def test_generates_profiles_in_bulk_in_chunks():
+    generate_services()
+    progress = []
+
+    generate_profiles_in_bulk(
+        k=7, faker=Faker(), chunk_size=3, on_progress=progress.append
+    )
+
+    assert progress == [3, 6, 7]
+    assert Profile.objects.count() == 7
+    assert ServiceConnection.objects.count() == 7
+    for profile in Profile.objects.select_related("user"):
+        assert profile.emails.get().email == profile.user.email
+        assert profile.phones.get().primary
+        assert profile.addresses.get().primary
+        assert profile.user.check_password("password")
+
+
+def test_bulk_generated_usernames_continue_from_previous_ones():
+    generate_profiles_in_bulk(k=2, faker=Faker())
+    generate_profiles_in_bulk(k=2, faker=Faker())
+
+    assert sorted(
+        User.objects.filter(username__startswith=BULK_USERNAME_PREFIX).values_list(
+            "username", flat=True
+        )
+    ) == [f"{BULK_USERNAME_PREFIX}{index:07d}" for index in range(4)]
+
+
+def test_generates_profiles_in_bulk_with_encrypted_data():
+    generate_profiles_in_bulk(
+        k=3, faker=Faker(), verified_personal_information=True, sensitive_data=True
+    )
+
+    for profile in Profile.objects.all():
+        vpi = profile.verified_personal_information
+        validate_finnish_national_identification_number(
+            vpi.national_identification_number
+        )
+        assert vpi.permanent_address.street_address
+        assert profile.sensitivedata.ssn == vpi.national_identification_number
+        # The search hash is stored too
+        assert (
+            VerifiedPersonalInformation.objects.get(
+                national_identification_number=vpi.national_identification_number
+            )
+            == vpi
+        )
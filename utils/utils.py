@@ -1,14 +1,26 @@
+import datetime
+import multiprocessing
 import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
-from django.db import transaction
+from django.db import connections, transaction
 from django.utils.timezone import get_current_timezone, make_aware
 from guardian.shortcuts import assign_perm
 
 from profiles.enums import AddressType, EmailType, PhoneType
-from profiles.models import Address, Email, Phone, Profile
+from profiles.models import (
+    Address,
+    Email,
+    Phone,
+    Profile,
+    SensitiveData,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+)
 from services.models import AllowedDataField, Service, ServiceConnection
 from users.models import User
 
@@ -212,3 +224,218 @@ def generate_service_connections():
         ServiceConnection.objects.create(
             profile=profile, service=random.choice(services)
         )
+
+
+BULK_USERNAME_PREFIX = "seeded_user_"
+
+_NIN_CHECK_CHARACTERS = "0123456789ABCDEFHJKLMNPRSTUVWXY"
+_NIN_FIRST_DATE = datetime.date(1900, 1, 1)
+_NIN_DAYS = (datetime.date(2000, 1, 1) - _NIN_FIRST_DATE).days
+
+
+def generate_national_identification_number(index):
+    """Returns a valid Finnish national identification number unique per index"""
+    birth_date = _NIN_FIRST_DATE + datetime.timedelta(days=index % _NIN_DAYS)
+    individual_number = 2 + index // _NIN_DAYS
+    digits = f"{birth_date:%d%m%y}{individual_number:03d}"
+    check_character = _NIN_CHECK_CHARACTERS[int(digits) % 31]
+    return f"{digits[:6]}-{digits[6:]}{check_character}"
+
+
+def _generate_fake_values(faker, size=1000):
+    """
+    Generates pools of fake values to pick from.
+
+    Calling Faker for every value of millions of rows takes far longer than
+    inserting the rows, so the bulk generation picks values from these pools.
+    """
+    timezone = get_current_timezone()
+    return {
+        "first_name": [faker.first_name() for _ in range(size)],
+        "last_name": [faker.last_name() for _ in range(size)],
+        "phone": [faker.phone_number() for _ in range(size)],
+        "street_address": [faker.street_address() for _ in range(size)],
+        "city": [faker.city() for _ in range(size)],
+        "postal_code": [faker.postcode() for _ in range(size)],
+        "country_code": [faker.country_code() for _ in range(size)],
+        "date_joined": [
+            make_aware(
+                faker.date_time_between(start_date="-10y", end_date="now"), timezone
+            )
+            for _ in range(size)
+        ],
+    }
+
+
+def _generate_profile_chunk(start, stop, options):
+    """Creates the users and profiles numbered from start to stop in bulk"""
+    values = options["fake_values"]
+    rng = random.Random(start)
+
+    def pick(name):
+        return rng.choice(values[name])
+
+    with transaction.atomic():
+        users = []
+        for index in range(start, stop):
+            username = f"{BULK_USERNAME_PREFIX}{index:07d}"
+            users.append(
+                User(
+                    uuid=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    username=username,
+                    first_name=pick("first_name"),
+                    last_name=pick("last_name"),
+                    email=f"{username}@example.com",
+                    password=options["password"],
+                    is_active=True,
+                    is_staff=True,
+                    date_joined=pick("date_joined"),
+                )
+            )
+        User.objects.bulk_create(users)
+
+        profiles = Profile.objects.bulk_create(
+            Profile(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                user=user,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                language=rng.choice(settings.LANGUAGES)[0],
+                contact_method=rng.choice(settings.CONTACT_METHODS)[0],
+            )
+            for user in users
+        )
+
+        Email.objects.bulk_create(
+            Email(
+                profile=profile,
+                primary=True,
+                email_type=EmailType.NONE,
+                email=profile.user.email,
+            )
+            for profile in profiles
+        )
+        Phone.objects.bulk_create(
+            Phone(
+                profile=profile,
+                primary=True,
+                phone_type=PhoneType.NONE,
+                phone=pick("phone"),
+            )
+            for profile in profiles
+        )
+        Address.objects.bulk_create(
+            Address(
+                profile=profile,
+                primary=True,
+                address=pick("street_address"),
+                city=pick("city"),
+                postal_code=pick("postal_code"),
+                country_code=pick("country_code"),
+                address_type=AddressType.NONE,
+            )
+            for profile in profiles
+        )
+
+        if options["service_ids"]:
+            ServiceConnection.objects.bulk_create(
+                ServiceConnection(
+                    profile=profile, service_id=rng.choice(options["service_ids"])
+                )
+                for profile in profiles
+            )
+
+        if options["verified_personal_information"]:
+            vpis = VerifiedPersonalInformation.objects.bulk_create(
+                VerifiedPersonalInformation(
+                    profile=profile,
+                    first_name=profile.first_name,
+                    last_name=profile.last_name,
+                    given_name=profile.first_name,
+                    national_identification_number=generate_national_identification_number(
+                        index
+                    ),
+                    municipality_of_residence="Helsinki",
+                    municipality_of_residence_number="091",
+                )
+                for index, profile in enumerate(profiles, start)
+            )
+            VerifiedPersonalInformationPermanentAddress.objects.bulk_create(
+                VerifiedPersonalInformationPermanentAddress(
+                    verified_personal_information=vpi,
+                    street_address=pick("street_address"),
+                    postal_code=pick("postal_code"),
+                    post_office=pick("city"),
+                )
+                for vpi in vpis
+            )
+
+        if options["sensitive_data"]:
+            SensitiveData.objects.bulk_create(
+                SensitiveData(
+                    profile=profile, ssn=generate_national_identification_number(index)
+                )
+                for index, profile in enumerate(profiles, start)
+            )
+
+    return stop - start
+
+
+def _close_database_connections():
+    # The forked workers must not share the database connection of the parent
+    connections.close_all()
+
+
+def generate_profiles_in_bulk(
+    k=50,
+    faker=None,
+    chunk_size=5000,
+    workers=1,
+    verified_personal_information=False,
+    sensitive_data=False,
+    on_progress=None,
+):
+    """
+    Create fake profiles and users in bulk for performance testing purposes.
+
+    The users get deterministic unique usernames continuing from the previously
+    bulk generated ones, and they all share one password. The profiles are
+    connected to random services. The profiles are created in chunks of
+    `chunk_size`, in parallel worker processes if `workers` is more than one.
+    `on_progress` is called with the number of created profiles after every chunk.
+    """
+    start = User.objects.filter(username__startswith=BULK_USERNAME_PREFIX).count()
+    options = {
+        "password": make_password("password"),
+        "fake_values": _generate_fake_values(faker),
+        "service_ids": list(Service.objects.values_list("pk", flat=True)),
+        "verified_personal_information": verified_personal_information,
+        "sensitive_data": sensitive_data,
+    }
+    chunks = [
+        (chunk_start, min(chunk_start + chunk_size, start + k))
+        for chunk_start in range(start, start + k, chunk_size)
+    ]
+
+    created = 0
+    if workers <= 1:
+        for chunk_start, chunk_stop in chunks:
+            created += _generate_profile_chunk(chunk_start, chunk_stop, options)
+            if on_progress:
+                on_progress(created)
+        return
+
+    _close_database_connections()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_close_database_connections,
+    ) as executor:
+        futures = [
+            executor.submit(_generate_profile_chunk, chunk_start, chunk_stop, options)
+            for chunk_start, chunk_stop in chunks
+        ]
+        for future in as_completed(futures):
+            created += future.result()
+            if on_progress:
+                on_progress(created)